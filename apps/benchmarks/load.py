@@ -0,0 +1,263 @@
+"""
+Closed-loop HTTP load driver.
+
+``run()`` starts ``concurrency`` virtual users against a running server. Each
+one loops: pick an operation from ``OPERATIONS`` by weight, send its
+requests, record latency and status per endpoint, repeat. Operations cover
+the feeds, search, post and profile pages, notifications and the common
+writes. Write operations undo themselves (bookmark then remove it, follow
+then unfollow) so a long run does not drift away from the seeded data.
+
+Every virtual user is a different ``seed_benchmark_data`` account with an
+access token minted directly, so no login requests are made and per-user
+rate limits are spread the way real traffic spreads them. 429 responses are
+still reported separately, since they mean the run measured the throttles
+rather than the endpoint. ``seed`` fixes which users, posts and operations
+are chosen, so runs against the same data are comparable.
+"""
+import asyncio
+from collections import defaultdict
+import json
+import math
+import random
+import time
+
+import httpx
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.blogs.models import Comment, Post
+from apps.core.models import User
+
+from .seed import WORDS
+
+SAMPLE_SIZE = 5000
+
+
+class Sample:
+    """Ids and slugs the operations pick from, read once before the run."""
+
+    def __init__(self, rng, virtual_users):
+        users = list(
+            User.objects.filter(email__startswith='bench', email__endswith='@example.com')
+            .order_by('pk')
+            .values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        if len(users) < 2:
+            raise ValueError("No benchmark users found; run seed_benchmark_data first.")
+        self.user_ids = users
+        self.posts = list(
+            Post.objects.active()
+            .filter(status=Post.PUBLISHED)
+            .order_by('-created_at')
+            .values_list('pk', 'slug')[:SAMPLE_SIZE]
+        )
+        if not self.posts:
+            raise ValueError("No published posts found; run seed_benchmark_data first.")
+        self.comment_ids = list(
+            Comment.objects.filter(post_id__in=[pk for pk, _ in self.posts[:500]])
+            .values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        self.tokens = [
+            (user.pk, str(RefreshToken.for_user(user).access_token))
+            for user in User.objects.filter(pk__in=rng.sample(users, min(virtual_users, len(users))))
+        ]
+
+
+def get(name, path):
+    return (name, 'GET', path, None)
+
+
+def trending(rng, sample, user_id):
+    return [get('feeds.trending', '/api/feeds/trending/')]
+
+
+def recent(rng, sample, user_id):
+    return [get('feeds.recent', '/api/feeds/recent/')]
+
+
+def personalized(rng, sample, user_id):
+    return [get('feeds.personalized', '/api/feeds/personalized/')]
+
+
+def combined(rng, sample, user_id):
+    return [get('feeds.combined', '/api/feeds/combined/')]
+
+
+def search_posts(rng, sample, user_id):
+    return [get('search.posts', f'/api/search/posts/?q={rng.choice(WORDS)}')]
+
+
+def search_users(rng, sample, user_id):
+    return [get('search.users', f'/api/search/users/?q={rng.choice(["ada", "grace", "linus", "hopper"])}')]
+
+
+def post_detail(rng, sample, user_id):
+    _, slug = rng.choice(sample.posts)
+    return [get('posts.detail', f'/api/posts/{slug}/')]
+
+
+def post_comments(rng, sample, user_id):
+    post_id, _ = rng.choice(sample.posts)
+    return [get('posts.comments', f'/api/posts/{post_id}/comments/')]
+
+
+def user_profile(rng, sample, user_id):
+    other = rng.choice(sample.user_ids)
+    return [get('users.detail', f'/api/users/{other}/'), get('users.posts', f'/api/users/{other}/posts/')]
+
+
+def notifications(rng, sample, user_id):
+    return [get('notifications.list', '/api/notifications/')]
+
+
+def comment(rng, sample, user_id):
+    post_id, _ = rng.choice(sample.posts)
+    body = {'content': ' '.join(rng.choices(WORDS, k=12))}
+    return [('posts.comment', 'POST', f'/api/posts/{post_id}/comments/', body)]
+
+
+def react(rng, sample, user_id):
+    if sample.comment_ids and rng.random() < 0.3:
+        name, path = 'comments.react', f'/api/comments/{rng.choice(sample.comment_ids)}/reactions/'
+    else:
+        name, path = 'posts.react', f'/api/posts/{rng.choice(sample.posts)[0]}/reactions/'
+    return [(name, 'POST', path, {'reaction_type': 'upvote' if rng.random() < 0.85 else 'downvote'})]
+
+
+def bookmark(rng, sample, user_id):
+    post_id, _ = rng.choice(sample.posts)
+    return [
+        ('posts.bookmark', 'POST', f'/api/posts/{post_id}/bookmark/', {}),
+        ('posts.unbookmark', 'DELETE', f'/api/posts/{post_id}/bookmark/delete/', None),
+    ]
+
+
+def follow(rng, sample, user_id):
+    other = rng.choice(sample.user_ids)
+    if other == user_id:
+        return []
+    return [
+        ('users.follow', 'POST', f'/api/users/{other}/follow/', {}),
+        ('users.unfollow', 'DELETE', f'/api/users/{other}/follow/', None),
+    ]
+
+
+# (operation, relative weight); roughly nine reads to every write.
+OPERATIONS = [
+    (trending, 10),
+    (recent, 8),
+    (personalized, 14),
+    (combined, 6),
+    (search_posts, 8),
+    (search_users, 4),
+    (post_detail, 16),
+    (post_comments, 8),
+    (user_profile, 6),
+    (notifications, 6),
+    (comment, 4),
+    (react, 5),
+    (bookmark, 3),
+    (follow, 2),
+]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, status, seconds):
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted ``values``."""
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+
+def summarize(results, elapsed):
+    """Per-endpoint count, error counts, latency percentiles (ms) and RPS."""
+    rows = []
+    for name in sorted(results.latencies):
+        latencies = sorted(results.latencies[name])
+        statuses = results.statuses[name]
+        throttled = statuses.get(429, 0)
+        ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 400)
+        rows.append({
+            'endpoint': name,
+            'count': len(latencies),
+            'errors': len(latencies) - ok - throttled,
+            'throttled': throttled,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'rps': round(len(latencies) / elapsed, 1),
+            'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        })
+    return rows
+
+
+async def virtual_user(client, rng, sample, user_id, token, results, warmup_until, stop_at):
+    names = [operation for operation, _ in OPERATIONS]
+    weights = [weight for _, weight in OPERATIONS]
+    headers = {'Cookie': f'access_token={token}'}
+    while time.monotonic() < stop_at:
+        operation = rng.choices(names, weights)[0]
+        for name, method, path, body in operation(rng, sample, user_id):
+            start = time.monotonic()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                status = response.status_code
+            except httpx.TimeoutException:
+                status = 'timeout'
+            except httpx.TransportError:
+                status = 'connection error'
+            if start >= warmup_until:
+                results.record(name, status, time.monotonic() - start)
+
+
+async def drive(base_url, sample, concurrency, duration, warmup, seed, timeout):
+    results = Results()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        start = time.monotonic()
+        warmup_until = start + warmup
+        stop_at = warmup_until + duration
+        await asyncio.gather(*(
+            virtual_user(
+                client, random.Random(f'{seed}:{index}'), sample,
+                *sample.tokens[index % len(sample.tokens)],
+                results, warmup_until, stop_at,
+            )
+            for index in range(concurrency)
+        ))
+        elapsed = time.monotonic() - warmup_until
+    return results, elapsed
+
+
+def run(base_url, concurrency=20, duration=60, warmup=5, seed=0, timeout=30):
+    """Run the load test and return the ``summarize()`` rows."""
+    sample = Sample(random.Random(seed), concurrency)
+    results, elapsed = asyncio.run(drive(base_url, sample, concurrency, duration, warmup, seed, timeout))
+    return summarize(results, elapsed), elapsed
+
+
+def format_table(rows, elapsed):
+    header = f"{'endpoint':<22} {'count':>7} {'errors':>6} {'429':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>7}"
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['endpoint']:<22} {row['count']:>7} {row['errors']:>6} {row['throttled']:>5} "
+            f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['rps']:>7}"
+        )
+    total = sum(row['count'] for row in rows)
+    lines.append('-' * len(header))
+    lines.append(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s; latencies in ms")
+    return '\n'.join(lines)
+
+
+def write_json(path, rows, elapsed, options):
+    with open(path, 'w') as f:
+        json.dump({'options': options, 'elapsed_seconds': elapsed, 'endpoints': rows}, f, indent=2)
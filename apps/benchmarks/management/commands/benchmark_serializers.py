@@ -0,0 +1,93 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.benchmarks import serialization
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'apps', 'benchmarks', 'serializer_baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the API serializers over pages of prefetched instances (CPU only) and "
+        "compare the results with a recorded baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=list(serialization.SIZES),
+            help="Page sizes to time.",
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Timing rounds; the best one counts.")
+        parser.add_argument(
+            '--serializer', action='append', dest='only',
+            help="Only time this serializer (repeatable), e.g. PostSerializer.",
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline file to compare with.")
+        parser.add_argument(
+            '--threshold', type=float, default=serialization.DEFAULT_THRESHOLD,
+            help="Relative slowdown that counts as a regression (0.2 = 20%%).",
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help="Write the results to the baseline file instead of comparing.",
+        )
+
+    def handle(self, *args, **options):
+        def log(name, seconds, size):
+            self.stdout.write(
+                f"  {name:<32} {seconds * 1000:9.3f} ms/call {seconds / size * 1e6:9.2f} us/instance"
+            )
+
+        results = serialization.run(
+            sizes=options['sizes'], repeat=options['repeat'], only=options['only'], log=log,
+        )
+        path = options['baseline']
+
+        if options['update_baseline']:
+            baseline = {'environment': serialization.environment(), 'results': {}}
+            if os.path.exists(path):
+                with open(path) as f:
+                    previous = json.load(f)
+                # Results from another environment are not comparable with these,
+                # so keep them only when the environment is unchanged.
+                if previous['environment'] == baseline['environment']:
+                    baseline['results'] = previous['results']
+                else:
+                    self.stdout.write(self.style.WARNING(
+                        f"Environment changed since {previous['environment']}; "
+                        f"replacing all {len(previous['results'])} baseline results."
+                    ))
+            baseline['results'].update(results)
+            with open(path, 'w') as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {path}"))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(f"No baseline at {path}; record one with --update-baseline.")
+            return
+
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline['environment'] != serialization.environment():
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded on {baseline['environment']}; timings may not be comparable."
+            ))
+        rows, regressions = serialization.compare(results, baseline['results'], options['threshold'])
+        self.stdout.write(f"\n  {'benchmark':<32} {'ms/call':>9} {'baseline':>9} {'change':>8}")
+        for name, seconds, previous, change in rows:
+            if previous is None:
+                self.stdout.write(f"  {name:<32} {seconds * 1000:9.3f} {'-':>9} {'new':>8}")
+                continue
+            line = f"  {name:<32} {seconds * 1000:9.3f} {previous * 1000:9.3f} {change:+8.1%}"
+            self.stdout.write(self.style.ERROR(line) if name in regressions else line)
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) slower than the baseline by more than "
+                f"{options['threshold']:.0%}: {', '.join(regressions)}"
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.benchmarks import load
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of feed, search, detail and write traffic against a running "
+        "server and report per-endpoint p50/p95/p99 latency and RPS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="Server to load.")
+        parser.add_argument('--concurrency', type=int, default=20, help="Number of virtual users.")
+        parser.add_argument('--duration', type=float, default=60, help="Seconds to measure for.")
+        parser.add_argument('--warmup', type=float, default=5, help="Seconds to run before measuring.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for users, targets and operations.")
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Loading {options['base_url']} with {options['concurrency']} virtual users "
+            f"for {options['warmup']:g}s warm-up + {options['duration']:g}s..."
+        )
+        try:
+            rows, elapsed = load.run(
+                options['base_url'],
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(load.format_table(rows, elapsed))
+        if options['json_path']:
+            load.write_json(options['json_path'], rows, elapsed, {
+                name: options[name]
+                for name in ('base_url', 'concurrency', 'duration', 'warmup', 'seed', 'timeout')
+            })
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['json_path']}"))
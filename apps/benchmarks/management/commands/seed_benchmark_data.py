@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.benchmarks.seed import PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a reproducible synthetic data set for load testing: users, follows, "
+        "posts, tags, comments, reactions, bookmarks and notifications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help="Number of users to create.")
+        parser.add_argument('--follows-per-user', type=int, default=20, help="Average follows per user.")
+        parser.add_argument('--posts-per-user', type=int, default=5, help="Average posts per user.")
+        parser.add_argument('--comments-per-post', type=int, default=4, help="Average comments per post.")
+        parser.add_argument('--reactions-per-post', type=int, default=8, help="Average reactions per post.")
+        parser.add_argument('--bookmarks-per-user', type=int, default=5, help="Average bookmarks per user.")
+        parser.add_argument(
+            '--notifications-per-user', type=int, default=20, help="Average notifications per user."
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT or COPY.")
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        counts = seed(
+            users=options['users'],
+            follows_per_user=options['follows_per_user'],
+            posts_per_user=options['posts_per_user'],
+            comments_per_post=options['comments_per_post'],
+            reactions_per_post=options['reactions_per_post'],
+            bookmarks_per_user=options['bookmarks_per_user'],
+            notifications_per_user=options['notifications_per_user'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {sum(counts.values())} rows in {elapsed:.1f}s. "
+            f"Seeded users log in as bench<id>@example.com / {PASSWORD}"
+        ))
@@ -0,0 +1,363 @@
+"""
+Synthetic data for load tests.
+
+``seed()`` adds users, follows, categories, tags, posts, comments, reactions,
+bookmarks and notifications shaped roughly like production: a minority of
+users attract most follows, engagement per post is heavy-tailed, and posts
+and notifications are spread over the last ``DAYS`` days. The same ``seed``
+value always produces the same data.
+
+Rows get explicit ids continuing after the table's current maximum, so later
+tables can point at earlier ones without reading them back. They are written
+``batch_size`` at a time with ``bulk_create``, or with ``COPY`` on PostgreSQL.
+Denormalized counters are recomputed at the end with the same set-based
+updates account deletion uses.
+
+Every seeded user can log in as ``bench<id>@example.com`` / ``PASSWORD``.
+"""
+from collections import Counter
+import csv
+from datetime import timedelta
+import io
+from itertools import chain
+import random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.blogs.counters import recount_categories, recount_comments, recount_posts
+from apps.blogs.models import Bookmark, Category, Comment, Post, Reaction, Tag, make_excerpt
+from apps.core.deletion import recount_follows
+from apps.core.models import Follow, User
+from apps.notifications import partitioning
+from apps.notifications.models import Notification
+
+PASSWORD = 'benchmark'
+DAYS = 30
+CATEGORIES = 20
+TAGS = 200
+RECOUNT_CHUNK_SIZE = 5000
+
+WORDS = (
+    'python django api cache query index latency queue worker shard replica '
+    'feed search follow post comment reaction bookmark notification token '
+    'design review deploy rollback incident metric trace profile benchmark '
+    'throughput memory thread async socket stream batch schema migration '
+    'garden coffee travel music film book recipe running climbing weekend '
+    'city river mountain ocean morning evening story idea lesson mistake'
+).split()
+FIRST_NAMES = ['Ada', 'Grace', 'Linus', 'Guido', 'Barbara', 'Ken', 'Margaret', 'Dennis', 'Radia', 'Tim']
+LAST_NAMES = ['Lovelace', 'Hopper', 'Torvalds', 'Rossum', 'Liskov', 'Thompson', 'Hamilton', 'Ritchie', 'Perlman', 'Berners']
+
+
+def skewed(rng, n):
+    """An index below ``n``, heavily biased towards 0."""
+    return int(n * rng.random() ** 3)
+
+
+def heavy_tailed(rng, mean, cap):
+    """A count with the given mean but a long tail (Pareto, alpha 1.5)."""
+    return min(int(rng.paretovariate(1.5) * mean / 3), cap)
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def next_id(model):
+    return (model._base_manager.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Writer:
+    """Writes model instances in batches with ``bulk_create`` or ``COPY``."""
+
+    def __init__(self, batch_size, log=None):
+        self.batch_size = batch_size
+        self.use_copy = connection.vendor == 'postgresql'
+        self.log = log or (lambda message: None)
+        self.counts = Counter()
+
+    def write(self, model, objects, keep_created_at=False):
+        """
+        Write ``objects``. ``keep_created_at`` preserves their ``created_at``,
+        which ``bulk_create`` would otherwise replace with the current time.
+        """
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self._flush(model, batch, keep_created_at)
+                batch = []
+        if batch:
+            self._flush(model, batch, keep_created_at)
+        self.log(f"{model._meta.label}: {self.counts[model._meta.label]} rows")
+
+    def _flush(self, model, batch, keep_created_at):
+        if self.use_copy:
+            self._copy(model, batch)
+        else:
+            created_at = [obj.created_at for obj in batch] if keep_created_at else None
+            model._base_manager.bulk_create(batch)
+            if created_at:
+                for obj, value in zip(batch, created_at):
+                    obj.created_at = value
+                model._base_manager.bulk_update(batch, ['created_at'])
+        self.counts[model._meta.label] += len(batch)
+
+    def _copy(self, model, batch):
+        fields = model._meta.concrete_fields
+        now = timezone.now()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            row = []
+            for field in fields:
+                value = getattr(obj, field.attname)
+                if value is None and (getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)):
+                    value = now
+                value = field.get_db_prep_save(value, connection)
+                row.append('\\N' if value is None else value)
+            writer.writerow(row)
+        buffer.seek(0)
+
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {qn(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+    def reset_sequences(self, models):
+        if not self.use_copy:
+            return
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+
+def seed(
+    users=10000,
+    follows_per_user=20,
+    posts_per_user=5,
+    comments_per_post=4,
+    reactions_per_post=8,
+    bookmarks_per_user=5,
+    notifications_per_user=20,
+    seed=0,
+    batch_size=5000,
+    log=None,
+):
+    """Generate and write the data set. Returns row counts per model."""
+    log = log or (lambda message: None)
+    writer = Writer(batch_size, log)
+    now = timezone.now()
+    post_type = ContentType.objects.get_for_model(Post)
+    comment_type = ContentType.objects.get_for_model(Comment)
+    user_type = ContentType.objects.get_for_model(User)
+
+    def rng_for(table):
+        return random.Random(f'{seed}:{table}')
+
+    def created_at(rng):
+        return now - timedelta(seconds=rng.random() * DAYS * 86400)
+
+    first_user = next_id(User)
+    password = make_password(PASSWORD)
+
+    def generate_users():
+        rng = rng_for('users')
+        for i in range(users):
+            user_id = first_user + i
+            yield User(
+                id=user_id,
+                email=f'bench{user_id}@example.com',
+                password=password,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                bio=words(rng, 12),
+                about=words(rng, 40),
+            )
+
+    writer.write(User, generate_users())
+
+    def generate_follows():
+        rng = rng_for('follows')
+        first_follow = next_id(Follow)
+        count = 0
+        for i in range(users):
+            wanted = min(rng.randint(0, 2 * follows_per_user), users - 1)
+            targets = set()
+            for _ in range(wanted * 3):
+                if len(targets) >= wanted:
+                    break
+                target = skewed(rng, users)
+                if target != i:
+                    targets.add(target)
+            for target in sorted(targets):
+                yield Follow(
+                    id=first_follow + count,
+                    follower_id=first_user + i,
+                    following_id=first_user + target,
+                )
+                count += 1
+
+    writer.write(Follow, generate_follows())
+
+    first_category = next_id(Category)
+    writer.write(Category, (
+        Category(id=first_category + i, name=f'Topic {first_category + i}', slug=f'topic-{first_category + i}')
+        for i in range(CATEGORIES)
+    ))
+    first_tag = next_id(Tag)
+    writer.write(Tag, (
+        Tag(id=first_tag + i, name=f'tag{first_tag + i}', slug=f'tag-{first_tag + i}')
+        for i in range(TAGS)
+    ))
+
+    first_post = next_id(Post)
+    post_count = users * posts_per_user
+
+    def generate_posts():
+        rng = rng_for('posts')
+        for i in range(post_count):
+            post_id = first_post + i
+            paragraphs = rng.randint(1, 8)
+            body = '\n\n'.join(words(rng, rng.randint(20, 80)) for _ in range(paragraphs))
+            word_count = len(body.split())
+            yield Post(
+                id=post_id,
+                author_id=first_user + skewed(rng, users),
+                category_id=first_category + rng.randrange(CATEGORIES),
+                title=words(rng, rng.randint(3, 9)).capitalize(),
+                subtitle=words(rng, 10),
+                slug=f'post-{post_id}',
+                content=body,
+                excerpt=make_excerpt(body),
+                status=Post.PUBLISHED if rng.random() < 0.5 else Post.DRAFT,
+                word_count=word_count,
+                paragraph_count=paragraphs,
+                read_time=max(1, word_count // 200),
+                created_at=created_at(rng),
+            )
+
+    writer.write(Post, generate_posts(), keep_created_at=True)
+
+    PostTag = Post.tags.through
+
+    def generate_post_tags():
+        rng = rng_for('post_tags')
+        first_post_tag = next_id(PostTag)
+        count = 0
+        for i in range(post_count):
+            for tag in sorted(rng.sample(range(TAGS), rng.randint(0, 3))):
+                yield PostTag(id=first_post_tag + count, post_id=first_post + i, tag_id=first_tag + tag)
+                count += 1
+
+    writer.write(PostTag, generate_post_tags())
+
+    first_comment = next_id(Comment)
+    comment_count = 0
+
+    def generate_comments():
+        nonlocal comment_count
+        rng = rng_for('comments')
+        for i in range(post_count):
+            top_level = []
+            for _ in range(heavy_tailed(rng, comments_per_post, 500)):
+                comment_id = first_comment + comment_count
+                parent_id = rng.choice(top_level) if top_level and rng.random() < 0.25 else None
+                if parent_id is None:
+                    top_level.append(comment_id)
+                yield Comment(
+                    id=comment_id,
+                    post_id=first_post + i,
+                    user_id=first_user + rng.randrange(users),
+                    parent_id=parent_id,
+                    content=words(rng, rng.randint(5, 40)),
+                )
+                comment_count += 1
+
+    writer.write(Comment, generate_comments())
+
+    def generate_reactions():
+        rng = rng_for('reactions')
+        first_reaction = next_id(Reaction)
+        count = 0
+        targets = chain(
+            ((post_type.id, first_post + i, reactions_per_post) for i in range(post_count)),
+            ((comment_type.id, first_comment + i, 1) for i in range(comment_count)),
+        )
+        for type_id, object_id, mean in targets:
+            for user in rng.sample(range(users), heavy_tailed(rng, mean, users)):
+                yield Reaction(
+                    id=first_reaction + count,
+                    user_id=first_user + user,
+                    content_type_id=type_id,
+                    object_id=object_id,
+                    reaction_type='upvote' if rng.random() < 0.85 else 'downvote',
+                )
+                count += 1
+
+    writer.write(Reaction, generate_reactions())
+
+    def generate_bookmarks():
+        rng = rng_for('bookmarks')
+        first_bookmark = next_id(Bookmark)
+        count = 0
+        for i in range(users):
+            posts = {skewed(rng, post_count) for _ in range(rng.randint(0, 2 * bookmarks_per_user))}
+            for post in sorted(posts):
+                yield Bookmark(id=first_bookmark + count, user_id=first_user + i, post_id=first_post + post)
+                count += 1
+
+    writer.write(Bookmark, generate_bookmarks())
+
+    if partitioning.is_partitioned():
+        partitioning.ensure_partitions(
+            settings.NOTIFICATION_PARTITION_MONTHS_AHEAD,
+            start=(now - timedelta(days=DAYS)).date(),
+        )
+
+    def generate_notifications():
+        rng = rng_for('notifications')
+        first_notification = next_id(Notification)
+        count = 0
+        for i in range(users):
+            for _ in range(rng.randint(0, 2 * notifications_per_user)):
+                action_type = rng.choice(['follow', 'comment', 'reply', 'reaction', 'bookmark', 'new_post'])
+                if action_type == 'follow':
+                    type_id, object_id = user_type.id, first_user + i
+                else:
+                    type_id, object_id = post_type.id, first_post + rng.randrange(post_count)
+                yield Notification(
+                    id=first_notification + count,
+                    user_id=first_user + i,
+                    actor_id=first_user + rng.randrange(users),
+                    action_type=action_type,
+                    content_type_id=type_id,
+                    object_id=object_id,
+                    is_read=rng.random() < 0.6,
+                    created_at=created_at(rng),
+                )
+                count += 1
+
+    writer.write(Notification, generate_notifications(), keep_created_at=True)
+
+    writer.reset_sequences([User, Follow, Category, Tag, Post, PostTag, Comment, Reaction, Bookmark, Notification])
+
+    log("Recounting denormalized counters")
+    for start in range(0, users, RECOUNT_CHUNK_SIZE):
+        recount_follows(range(first_user + start, first_user + min(start + RECOUNT_CHUNK_SIZE, users)))
+    for start in range(0, post_count, RECOUNT_CHUNK_SIZE):
+        recount_posts(range(first_post + start, first_post + min(start + RECOUNT_CHUNK_SIZE, post_count)))
+    for start in range(0, comment_count, RECOUNT_CHUNK_SIZE):
+        recount_comments(range(first_comment + start, first_comment + min(start + RECOUNT_CHUNK_SIZE, comment_count)))
+    recount_categories(range(first_category, first_category + CATEGORIES))
+
+    return writer.counts
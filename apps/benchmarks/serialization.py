@@ -0,0 +1,247 @@
+"""
+Serializer microbenchmarks.
+
+Times the list serializers behind the busiest endpoints over pages of
+``SIZES`` instances. Instances are built in memory with their related
+objects and prefetch caches already filled in, and the viewer state the
+views look up in ``prepare_page`` (``following_ids``, ``liked_post_ids``,
+...) is put in the context up front, so the numbers are pure CPU. Any query
+that still happens fails the run instead of skewing it, since it would also
+be a query per page or per row in production.
+
+Results are seconds per ``serializer(instances, many=True).data`` call,
+keyed ``<serializer>[<size>]``. ``compare()`` checks them against a baseline
+recorded earlier on the same machine.
+"""
+from datetime import timedelta
+import platform
+import random
+import timeit
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.blogs.models import Bookmark, Category, Comment, Post, Tag, make_excerpt
+from apps.blogs.serializers import BookmarkSerializer, CommentSerializer, PostSerializer
+from apps.core.models import Follow, User
+from apps.core.serializers import FollowSerializer
+from apps.core.testing import call_site
+from apps.notifications.models import Notification
+from apps.notifications.serializers import NotificationSerializer
+
+from .seed import FIRST_NAMES, LAST_NAMES, words
+
+SIZES = (10, 100, 1000)
+DEFAULT_THRESHOLD = 0.2
+
+
+class QueryAttempted(Exception):
+    pass
+
+
+def _forbid_queries(execute, sql, params, many, context):
+    raise QueryAttempted(f"{call_site(skip=[__file__])} ran a query during a serializer benchmark: {sql[:200]}")
+
+
+def prefetched(model, objects):
+    """A queryset that yields ``objects`` without touching the database."""
+    queryset = model.objects.all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    return queryset
+
+
+class Fixtures:
+    """Related objects shared by every page, built once."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.users = [
+            User(
+                id=i,
+                email=f'bench{i}@example.com',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                bio=words(self.rng, 12),
+                about=words(self.rng, 40),
+                followers_count=self.rng.randint(0, 5000),
+                following_count=self.rng.randint(0, 500),
+                created_at=self.now,
+                updated_at=self.now,
+            )
+            for i in range(1, 201)
+        ]
+        self.viewer = self.users[0]
+        self.categories = [
+            Category(id=i, name=f'Topic {i}', slug=f'topic-{i}', posts_count=100, created_at=self.now)
+            for i in range(1, 21)
+        ]
+        self.tags = [
+            Tag(id=i, name=f'tag{i}', slug=f'tag-{i}', created_at=self.now)
+            for i in range(1, 201)
+        ]
+        # Warm the content type cache so NotificationSerializer does not query it.
+        self.content_types = {
+            model: ContentType.objects.get_for_model(model) for model in (Post, Comment, User)
+        }
+
+    def timestamp(self):
+        return self.now - timedelta(seconds=self.rng.randrange(30 * 86400))
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def posts(self, size):
+        posts = []
+        for i in range(1, size + 1):
+            created_at = self.timestamp()
+            post = Post(
+                id=i,
+                author=self.user(),
+                category=self.rng.choice(self.categories),
+                title=words(self.rng, 6).capitalize(),
+                subtitle=words(self.rng, 10),
+                slug=f'post-{i}',
+                content='\n\n'.join(words(self.rng, 60) for _ in range(4)),
+                status=Post.PUBLISHED,
+                comment_count=self.rng.randint(0, 50),
+                reaction_count=self.rng.randint(0, 200),
+                bookmark_count=self.rng.randint(0, 20),
+                views_count=self.rng.randint(0, 5000),
+                word_count=240,
+                paragraph_count=4,
+                read_time=2,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            post.excerpt = make_excerpt(post.content)
+            post._prefetched_objects_cache = {
+                'tags': prefetched(Tag, self.rng.sample(self.tags, self.rng.randint(0, 3))),
+            }
+            posts.append(post)
+        return posts
+
+    def comments(self, size):
+        posts = self.posts(10)
+        comments = []
+        for i in range(1, size + 1):
+            created_at = self.timestamp()
+            comments.append(Comment(
+                id=i,
+                post=self.rng.choice(posts),
+                user=self.user(),
+                parent_id=self.rng.choice(comments).id if comments and self.rng.random() < 0.25 else None,
+                content=words(self.rng, 25),
+                reply_count=self.rng.randint(0, 5),
+                reaction_count=self.rng.randint(0, 20),
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+        return comments
+
+    def notifications(self, size):
+        posts = self.posts(10)
+        notifications = []
+        for i in range(1, size + 1):
+            post = self.rng.choice(posts)
+            notification = Notification(
+                id=i,
+                user=self.viewer,
+                actor=self.user(),
+                action_type=self.rng.choice(['comment', 'reaction', 'bookmark', 'new_post']),
+                content_type_id=self.content_types[Post].id,
+                object_id=post.id,
+                is_read=self.rng.random() < 0.6,
+                created_at=self.timestamp(),
+            )
+            # What attach_notification_targets() would have set.
+            notification.target_summary = {'id': post.id, 'title': post.title, 'slug': post.slug}
+            notifications.append(notification)
+        return notifications
+
+    def follows(self, size):
+        return [
+            Follow(id=i, follower=self.user(), following=self.user(), created_at=self.timestamp())
+            for i in range(1, size + 1)
+        ]
+
+    def bookmarks(self, size):
+        return [
+            Bookmark(id=post.id, user=self.viewer, post=post, created_at=self.timestamp())
+            for post in self.posts(size)
+        ]
+
+    def context(self):
+        """Serializer context with the viewer state a list view would have prepared."""
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.viewer
+        return {
+            'request': request,
+            'following_ids': {user.id for user in self.rng.sample(self.users, 50)},
+            'liked_post_ids': set(self.rng.sample(range(1, 1001), 300)),
+            'bookmarked_post_ids': set(self.rng.sample(range(1, 1001), 100)),
+            'liked_comment_ids': set(self.rng.sample(range(1, 1001), 300)),
+        }
+
+
+BENCHMARKS = [
+    (PostSerializer, Fixtures.posts),
+    (CommentSerializer, Fixtures.comments),
+    (NotificationSerializer, Fixtures.notifications),
+    (FollowSerializer, Fixtures.follows),
+    (BookmarkSerializer, Fixtures.bookmarks),
+]
+
+
+def measure(serializer_class, instances, context, repeat):
+    """Best-of-``repeat`` seconds for one ``.data`` call over ``instances``."""
+    def serialize():
+        serializer = serializer_class(instances, many=True, context=context)
+        # The viewer state is already in the context.
+        serializer.child.prepare_page = lambda instances, user: None
+        return serializer.data
+
+    timer = timeit.Timer(serialize)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(sizes=SIZES, repeat=5, only=None, seed=0, log=None):
+    """Run the benchmarks and return ``{'<serializer>[<size>]': seconds}``."""
+    log = log or (lambda message: None)
+    fixtures = Fixtures(seed)
+    results = {}
+    with connection.execute_wrapper(_forbid_queries):
+        for serializer_class, build in BENCHMARKS:
+            name = serializer_class.__name__
+            if only and name not in only:
+                continue
+            for size in sizes:
+                seconds = measure(serializer_class, build(fixtures, size), fixtures.context(), repeat)
+                results[f'{name}[{size}]'] = seconds
+                log(f'{name}[{size}]', seconds, size)
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'node': platform.node()}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    ``(name, seconds, baseline seconds, change)`` for every result, where
+    ``change`` is the relative slowdown, plus the names slower than
+    ``1 + threshold`` times their baseline.
+    """
+    rows, regressions = [], []
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        change = None if previous is None else seconds / previous - 1
+        rows.append((name, seconds, previous, change))
+        if change is not None and change > threshold:
+            regressions.append(name)
+    return rows, regressions
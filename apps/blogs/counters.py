@@ -0,0 +1,51 @@
+"""
+Set-based recomputation of denormalized counters.
+
+The views keep counters up to date with ``F()`` increments as things happen.
+When rows disappear in bulk (e.g. an account being deleted) these recompute
+the counters of the affected rows from the source tables instead, one
+``UPDATE`` per batch.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Bookmark, Category, Comment, Post, Reaction
+
+
+def count_of(queryset, field):
+    """Correlated subquery counting ``queryset`` rows whose ``field`` is the outer pk."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_posts(post_ids):
+    post_type = ContentType.objects.get_for_model(Post)
+    return Post.objects.filter(pk__in=post_ids).update(
+        comment_count=count_of(Comment.objects.filter(parent__isnull=True), 'post'),
+        reaction_count=count_of(Reaction.objects.filter(content_type=post_type), 'object_id'),
+        bookmark_count=count_of(Bookmark.objects.all(), 'post'),
+    )
+
+
+def recount_comments(comment_ids):
+    comment_type = ContentType.objects.get_for_model(Comment)
+    return Comment.objects.filter(pk__in=comment_ids).update(
+        reply_count=count_of(Comment.objects.all(), 'parent'),
+        reaction_count=count_of(Reaction.objects.filter(content_type=comment_type), 'object_id'),
+    )
+
+
+def recount_categories(category_ids):
+    return Category.objects.filter(pk__in=category_ids).update(
+        posts_count=count_of(Post.objects.active(), 'category'),
+    )
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-19 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0009_category_posts_count_alter_post_unique_together'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['content_type', 'object_id'], name='blogs_react_content_9ddd0a_idx'),
+        ),
+    ]
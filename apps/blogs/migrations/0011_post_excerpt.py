@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 18:46
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+
+
+def make_excerpt(content):
+    # A copy of apps.blogs.models.make_excerpt as of this migration.
+    text = ' '.join(strip_tags(content).split())
+    return Truncator(text).chars(280)
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('blogs', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'content').iterator(chunk_size=BATCH_SIZE):
+        post.excerpt = make_excerpt(post.content)
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0010_reaction_target_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=280),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
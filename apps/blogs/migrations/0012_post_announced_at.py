@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 21:12
+
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def mark_announced(apps, schema_editor):
+    # Posts that already have new_post notifications were announced before
+    # this field existed; republishing them must not notify again.
+    Post = apps.get_model('blogs', 'Post')
+    Notification = apps.get_model('notifications', 'Notification')
+    announced = Notification.objects.filter(
+        action_type='new_post',
+        content_type__app_label='blogs',
+        content_type__model='post',
+    ).values('object_id')
+    Post.objects.filter(pk__in=announced).update(announced_at=Now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0011_post_excerpt'),
+        ('notifications', '0005_notificationpreference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='announced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_announced, migrations.RunPython.noop),
+    ]
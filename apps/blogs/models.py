@@ -2,10 +2,20 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 # Create your models here.
 
 User = settings.AUTH_USER_MODEL
 
+EXCERPT_LENGTH = 280
+
+
+def make_excerpt(content):
+    """The start of ``content`` as plain text, for list cards."""
+    text = ' '.join(strip_tags(content).split())
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True)
@@ -64,6 +74,8 @@ class Post(models.Model):
     subtitle = models.CharField(max_length=500, blank=True)
     slug = models.SlugField(unique=True)
     content = models.TextField(blank=True)
+    # Kept in sync with content by save(); lists show it instead of content.
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
     thumbnail = models.URLField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICE, default=DRAFT)
     comment_count = models.PositiveIntegerField(default=0)
@@ -74,6 +86,8 @@ class Post(models.Model):
     paragraph_count = models.PositiveIntegerField(default=0)
     read_time = models.PositiveIntegerField(default=0)
     is_deleted = models.BooleanField(default=False)
+    # Set once, by fan_out_new_post, when followers are first told about the post.
+    announced_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -88,6 +102,13 @@ class Post(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -135,6 +156,9 @@ class Reaction(models.Model):
     class Meta:
         unique_together=("user", "content_type", "object_id")
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
     
     def __str__(self):
         return f"Reaction by {self.user} on {self.post}"
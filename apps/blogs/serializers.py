@@ -1,7 +1,13 @@
 from django.contrib.auth.models import ContentType
-from rest_framework import generics, serializers
-
-from apps.core.serializers import UserSerializer, UserSummarySerializer
+from rest_framework import serializers
+
+from apps.core.fieldsets import renders
+from apps.core.serializers import (
+    PageListSerializer,
+    UserSerializer,
+    UserSummarySerializer,
+    prepare_following_ids,
+)
 from .models import Category, Comment, Post, Reaction, Bookmark, Tag
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -15,6 +21,7 @@ class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug', 'created_at']
+        card_fields = ['id', 'name', 'slug']
     def create(self, validated_data):
         return super().create(validated_data)
 
@@ -40,37 +47,77 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ['id', 'content', 'subtitle', 'title', 'author', 'tags', 'tag_objects', 'category', 'category_id', 'slug', 'thumbnail', 'status', 'comment_count', 'reaction_count', 'bookmark_count', 'views_count', 'word_count', 'paragraph_count', 'read_time', 'is_liked', 'is_bookmarked', 'created_at', 'updated_at' ]
+        fields = ['id', 'content', 'excerpt', 'subtitle', 'title', 'author', 'tags', 'tag_objects', 'category', 'category_id', 'slug', 'thumbnail', 'status', 'comment_count', 'reaction_count', 'bookmark_count', 'views_count', 'word_count', 'paragraph_count', 'read_time', 'is_liked', 'is_bookmarked', 'created_at', 'updated_at' ]
         read_only_fields = ['author', 'category', 'comment_count', 'reaction_count', 'bookmark_count', 'views_count']
+        list_serializer_class = PageListSerializer
+        # What lists show by default (apps.core.fieldsets): the excerpt instead of the content.
+        card_fields = [
+            'id', 'excerpt', 'subtitle', 'title', 'author', 'tag_objects', 'category', 'slug', 'thumbnail',
+            'status', 'comment_count', 'reaction_count', 'bookmark_count', 'views_count', 'read_time',
+            'is_liked', 'is_bookmarked', 'created_at',
+        ]
+        # Row columns each method reads, for apps.core.projection.
+        projection_columns = {
+            'prepare_page': ['id', 'author_id'],
+            'get_is_liked': ['id'],
+            'get_is_bookmarked': ['id'],
+        }
 
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
 
+    def prepare_page(self, posts, user):
+        self.prepare_viewer_state(posts, user)
+        if renders(self, 'author.is_following'):
+            prepare_following_ids(self.context, user, [post.author_id for post in posts])
+
+    def prepare_viewer_state(self, posts, user):
+        post_ids = [post.id for post in posts]
+        if renders(self, 'is_liked'):
+            self.context['liked_post_ids'] = set(
+                Reaction.objects.filter(
+                    user=user,
+                    content_type=ContentType.objects.get_for_model(Post),
+                    object_id__in=post_ids
+                ).values_list('object_id', flat=True)
+            )
+        if renders(self, 'is_bookmarked'):
+            self.context['bookmarked_post_ids'] = set(
+                Bookmark.objects.filter(
+                    user=user,
+                    post_id__in=post_ids
+                ).values_list('post_id', flat=True)
+            )
+
     def get_is_liked(self, obj):
         request = self.context.get('request')
-        post_id = obj.id
-        post = generics.get_object_or_404(Post, pk=post_id)
-        post_type = ContentType.objects.get_for_model(Post)
         if not request or not request.user.is_authenticated:
             return False
 
+        # List views resolve the whole page with one query up front.
+        liked_post_ids = self.context.get('liked_post_ids')
+        if liked_post_ids is not None:
+            return obj.id in liked_post_ids
+
         return Reaction.objects.filter(
             user=request.user,
-            content_type=post_type,
-            object_id=post.id
+            content_type=ContentType.objects.get_for_model(Post),
+            object_id=obj.id
         ).exists()
 
     def get_is_bookmarked(self, obj):
         request = self.context.get('request')
-        post_id = obj.id
-        post = generics.get_object_or_404(Post, pk=post_id)
         if not request or not request.user.is_authenticated:
             return False
 
+        bookmarked_post_ids = self.context.get('bookmarked_post_ids')
+        if bookmarked_post_ids is not None:
+            return obj.id in bookmarked_post_ids
+
         return Bookmark.objects.filter(
             user=request.user,
-            post=post
+            post_id=obj.id
         ).exists()
 
 class PostSummarySerializer(serializers.ModelSerializer):
@@ -93,6 +140,11 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'post', 'user', 'content', 'parent_id', 'is_liked', 'reply_count', 'reaction_count', 'views_count', 'created_at', 'updated_at']
         read_only_fields = ['post', 'user', 'reply_count', 'reaction_count', 'views_count', 'created_at', 'updated_at']
+        list_serializer_class = PageListSerializer
+        projection_columns = {
+            'prepare_page': ['id', 'user_id'],
+            'get_is_liked': ['id'],
+        }
 
     def validate_parent(self, parent):
         if parent.parent is not None:
@@ -101,18 +153,32 @@ class CommentSerializer(serializers.ModelSerializer):
             )
         return parent
 
+    def prepare_page(self, comments, user):
+        if renders(self, 'is_liked'):
+            self.context['liked_comment_ids'] = set(
+                Reaction.objects.filter(
+                    user=user,
+                    content_type=ContentType.objects.get_for_model(Comment),
+                    object_id__in=[comment.id for comment in comments]
+                ).values_list('object_id', flat=True)
+            )
+        if renders(self, 'user.is_following'):
+            prepare_following_ids(self.context, user, [comment.user_id for comment in comments])
+
     def get_is_liked(self, obj):
         request = self.context.get('request')
-        comment_id = obj.id
-        comment = generics.get_object_or_404(Comment, pk=comment_id)
-        comment_type = ContentType.objects.get_for_model(Comment)
         if not request or not request.user.is_authenticated:
             return False
 
+        # List views resolve the whole page with one query up front.
+        liked_comment_ids = self.context.get('liked_comment_ids')
+        if liked_comment_ids is not None:
+            return obj.id in liked_comment_ids
+
         return Reaction.objects.filter(
             user=request.user,
-            content_type=comment_type,
-            object_id=comment.id
+            content_type=ContentType.objects.get_for_model(Comment),
+            object_id=obj.id
         ).exists()
 
 class ReactionSerializer(serializers.ModelSerializer):
@@ -122,6 +188,11 @@ class ReactionSerializer(serializers.ModelSerializer):
         model = Reaction
         fields = ['id', 'user', 'reaction_type', 'created_at']
         read_only_fields = ['user', 'created_at']
+        list_serializer_class = PageListSerializer
+
+    def prepare_page(self, reactions, user):
+        if renders(self, 'user.is_following'):
+            prepare_following_ids(self.context, user, [reaction.user_id for reaction in reactions])
 
 class BookmarkSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -131,3 +202,16 @@ class BookmarkSerializer(serializers.ModelSerializer):
         model = Bookmark
         fields = ['id', 'user', 'post', 'created_at']
         read_only_fields = ['user', 'post', 'created_at']
+        list_serializer_class = PageListSerializer
+
+    def prepare_page(self, bookmarks, user):
+        user_ids = []
+        if renders(self, 'user.is_following'):
+            user_ids += [bookmark.user_id for bookmark in bookmarks]
+        if renders(self, 'post'):
+            posts = [bookmark.post for bookmark in bookmarks]
+            self.fields['post'].prepare_viewer_state(posts, user)
+            if renders(self, 'post.author.is_following'):
+                user_ids += [post.author_id for post in posts]
+        if user_ids:
+            prepare_following_ids(self.context, user, user_ids)
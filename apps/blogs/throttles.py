@@ -1,4 +1,4 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from apps.core.throttling import UserRateThrottle, AnonRateThrottle
 
 
 class PostCreateRateThrottle(UserRateThrottle):
@@ -10,15 +10,19 @@ from .throttles import (
     PostCreateRateThrottle, PostUpdateRateThrottle, PostReadRateThrottle, PostReadAnonRateThrottle,
     CommentCreateRateThrottle, ReactionRateThrottle, BookmarkRateThrottle
 )
-from apps.notifications.utils import create_notification
+from apps.notifications.utils import create_notification, notify_followers_of_new_post
 
 from .serializers import CommentSerializer, PostSerializer, CategorySerializer, ReactionSerializer, BookmarkSerializer, TagSerializer
 
 from .models import Post, Category, Comment, Reaction, Bookmark, Tag
 from apps.core.models import User
+from apps.core.async_views import AsyncRetrieveAPIView, serializer_data
+from apps.core.fieldsets import SparseFieldsMixin
+from apps.core.projection import ProjectedListMixin
+from apps.core.query_plan import QueryPlanMixin
 # Create your views here
 
-class PostsListCreateView(generics.ListCreateAPIView):
+class PostsListCreateView(SparseFieldsMixin, QueryPlanMixin, generics.ListCreateAPIView):
     queryset = Post.objects.active()
     serializer_class = PostSerializer
     filter_backends = [filters.SearchFilter]
@@ -34,7 +38,7 @@ class PostsListCreateView(generics.ListCreateAPIView):
     
 
     def get_queryset(self):
-        qs = super().get_queryset().select_related("author")
+        qs = super().get_queryset()
         status = self.request.query_params.get('status')
         category = self.request.query_params.get('category')
         if status == 'draft':
@@ -57,7 +61,9 @@ class PostsListCreateView(generics.ListCreateAPIView):
                 defaults={"slug": name.lower().replace(" ", "-")}
             )
             tags.append(tag)
-        serializer.save(author=self.request.user, tags=tags)
+        post = serializer.save(author=self.request.user, tags=tags)
+        if post.status == Post.PUBLISHED:
+            notify_followers_of_new_post(post)
         category = generics.get_object_or_404(Category, pk=validated_data['category'].id)
         print(category)
         Category.objects.filter(
@@ -76,8 +82,11 @@ class PostsUpdateView(generics.UpdateAPIView):
     lookup_url_kwarg='id'
 
     def perform_update(self, serializer):
+        was_published = serializer.instance.status == Post.PUBLISHED
         instance = serializer.save();
         instance.save()
+        if instance.status == Post.PUBLISHED and not was_published:
+            notify_followers_of_new_post(instance)
 
 class PostDeleteView(generics.DestroyAPIView):
     queryset= Post.objects.all()
@@ -97,24 +106,24 @@ class PostDeleteView(generics.DestroyAPIView):
                 posts_count=F("posts_count") + 1
         )
 
-class PostRetrieveView(generics.RetrieveAPIView):
+class PostRetrieveView(SparseFieldsMixin, QueryPlanMixin, AsyncRetrieveAPIView):
     queryset= Post.objects.all()
     serializer_class = PostSerializer
     throttle_classes = [PostReadRateThrottle]
     lookup_field = 'slug'
     lookup_url_kwarg='slug'
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
         # Increment views count
-        Post.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
+        await Post.objects.filter(pk=instance.pk).aupdate(views_count=F('views_count') + 1)
         # Refresh instance to get updated views_count
-        instance.refresh_from_db()
+        await instance.arefresh_from_db(fields=['views_count'])
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return Response(await serializer_data(serializer))
 
 
-class CommentsListCreateView(generics.ListCreateAPIView):
+class CommentsListCreateView(SparseFieldsMixin, QueryPlanMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
@@ -126,7 +135,7 @@ class CommentsListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         order_type = self.request.query_params.get('order_type')
         post_id = self.kwargs["id"]
-        queryset = Comment.objects.filter(post_id=post_id,parent__isnull=True).select_related('user')
+        queryset = Comment.objects.filter(post_id=post_id,parent__isnull=True)
         if order_type == 'relevant':
             return queryset.extra(
                 select={'engagement_score': 'reaction_count + reply_count + views_count'}
@@ -154,30 +163,21 @@ class CommentsListCreateView(generics.ListCreateAPIView):
             target_object=post
         )
 
-class RetrieveCommentView(generics.RetrieveAPIView):
+class RetrieveCommentView(SparseFieldsMixin, QueryPlanMixin, AsyncRetrieveAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'pk'
     lookup_url_kwarg = 'id'
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
         # Increment views count
-        Comment.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
+        await Comment.objects.filter(pk=instance.pk).aupdate(views_count=F('views_count') + 1)
         # Refresh instance to get updated views_count
-        instance.refresh_from_db()
+        await instance.arefresh_from_db(fields=['views_count'])
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-    
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        # Increment views count
-        Comment.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
-        # Refresh instance to get updated views_count
-        instance.refresh_from_db()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return Response(await serializer_data(serializer))
 
 class UpdateCommentView(generics.UpdateAPIView):
     queryset = Comment.objects.all()
@@ -201,14 +201,14 @@ class DeleteCommentView(generics.DestroyAPIView):
         )
         instance.delete()
 
-class RepliesListCreateView(generics.ListCreateAPIView):
+class RepliesListCreateView(SparseFieldsMixin, QueryPlanMixin, generics.ListCreateAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     throttle_classes = [CommentCreateRateThrottle]
 
     def get_queryset(self):
-        return Comment.objects.filter(parent_id=self.kwargs['id']).select_related('user')
+        return Comment.objects.filter(parent_id=self.kwargs['id'])
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -229,7 +229,7 @@ class RepliesListCreateView(generics.ListCreateAPIView):
             target_object=parent
         )
 
-class PostReactionListCreateView(generics.ListCreateAPIView):
+class PostReactionListCreateView(SparseFieldsMixin, QueryPlanMixin, generics.ListCreateAPIView):
     serializer_class = ReactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -243,11 +243,11 @@ class PostReactionListCreateView(generics.ListCreateAPIView):
         post_id = self.kwargs['id']
         post = generics.get_object_or_404(Post, pk=post_id)
         if reaction_type == 'upvote':
-            return Reaction.objects.filter(object_id=post.id, reaction_type=reaction_type).select_related('user')
+            return Reaction.objects.filter(object_id=post.id, reaction_type=reaction_type)
         elif reaction_type == 'downvote':
-            return Reaction.objects.filter(object_id=post.id, reaction_type=reaction_type).select_related('user')
+            return Reaction.objects.filter(object_id=post.id, reaction_type=reaction_type)
         
-        return Reaction.objects.filter(object_id=post.id).select_related('user')
+        return Reaction.objects.filter(object_id=post.id)
     
     def perform_create(self, serializer):
         post_id = self.kwargs['id']
@@ -287,7 +287,7 @@ class PostReactionListCreateView(generics.ListCreateAPIView):
                 target_object=post
             )
 
-class CommentReactionListCreateView(generics.ListCreateAPIView):
+class CommentReactionListCreateView(SparseFieldsMixin, QueryPlanMixin, generics.ListCreateAPIView):
     serializer_class = ReactionSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -301,11 +301,11 @@ class CommentReactionListCreateView(generics.ListCreateAPIView):
         comment_id = self.kwargs['id']
         comment = generics.get_object_or_404(Comment, pk=comment_id)
         if reaction_type == 'upvote':
-            return Reaction.objects.filter(object_id=comment.id, reaction_type=reaction_type).select_related('user')
+            return Reaction.objects.filter(object_id=comment.id, reaction_type=reaction_type)
         elif reaction_type == 'downvote':
-            return Reaction.objects.filter(object_id=comment.id, reaction_type=reaction_type).select_related('user')
+            return Reaction.objects.filter(object_id=comment.id, reaction_type=reaction_type)
         
-        return Reaction.objects.filter(object_id=comment.id).select_related('user')
+        return Reaction.objects.filter(object_id=comment.id)
 
     def perform_create(self, serializer):
         comment_id = self.kwargs['id']
@@ -420,32 +420,32 @@ class BookmarkDeleteView(APIView):
             status=status.HTTP_200_OK
         )
 
-class ListUserBookmarksView(generics.ListAPIView):
+class ListUserBookmarksView(SparseFieldsMixin, QueryPlanMixin, generics.ListAPIView):
     serializer_class = BookmarkSerializer
     permission_classes = [permissions.IsAuthenticated, IsBookmarkOwner]
     def  get_queryset(self):
         userId = self.kwargs['id']
         user = generics.get_object_or_404(User, pk=userId)
-        return Bookmark.objects.filter(user=self.request.user).select_related('post').select_related('user')
+        return Bookmark.objects.filter(user=self.request.user)
 
-class ListUserCommentsView(generics.ListAPIView):
+class ListUserCommentsView(SparseFieldsMixin, QueryPlanMixin, generics.ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsCommentOwner]
     def  get_queryset(self):
         userId = self.kwargs['id']
         user = generics.get_object_or_404(User, pk=userId)
-        return Comment.objects.filter(user=user).select_related('post').select_related('user')
+        return Comment.objects.filter(user=user)
         
-class ListUserPostsView(generics.ListAPIView):
+class ListUserPostsView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def  get_queryset(self):
         userId = self.kwargs['id']
         user = generics.get_object_or_404(User, pk=userId)
-        return Post.objects.filter(author=user).select_related('author')
+        return Post.objects.filter(author=user)
 
-class ListCategoryPostsView(generics.ListAPIView):
+class ListCategoryPostsView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -453,4 +453,4 @@ class ListCategoryPostsView(generics.ListAPIView):
         category_slug = self.kwargs['slug']
         category = generics.get_object_or_404(Category, slug=category_slug)
 
-        return Post.objects.filter(category=category).select_related('author')
\ No newline at end of file
+        return Post.objects.filter(category=category)
\ No newline at end of file
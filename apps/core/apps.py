@@ -2,4 +2,10 @@ from django.apps import AppConfig
 
 
 class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        from . import concurrency, metrics, signals  # noqa: F401
+        concurrency.install()
+        metrics.install()
@@ -0,0 +1,137 @@
+"""
+The ASGI application, with one bounded thread pool for synchronous work.
+
+Under ASGI, Django runs everything synchronous a request needs (sync views,
+``MiddlewareMixin`` hooks, signal receivers, every async ORM query) through
+``sync_to_async(thread_sensitive=True)``, and its handler gives each request
+a new single-thread executor for that. Threads are started and thrown away
+per request with no bound, and since database connections belong to
+threads, every request opens a new connection; ``CONN_MAX_AGE`` never gets
+to reuse one.
+
+``ASGIHandler`` runs that work on a pool of ``ASGI_SYNC_THREADS`` threads
+per worker instead. A sync view holds a thread for as long as it runs, as
+under a threaded WSGI server. An async view (``apps.core.async_views``)
+holds one only while a query or another synchronous step runs, and waits on
+the event loop in between, so many of them share a few threads. Work beyond
+what the pool can run queues without holding a thread. Each thread keeps
+its database connection between requests, so a worker has at most
+``ASGI_SYNC_THREADS`` connections open. Before a thread takes its first step
+of a request it checks its connections as Django does between requests,
+closing those past ``CONN_MAX_AGE`` or left unusable by an error.
+
+A request takes many steps through the pool (a hop per middleware hook,
+one per query of an async view), so the queue runs the steps of the oldest
+request first. In arrival order, a request's later steps would wait behind
+the first steps of every request that came after it, and under load all of
+them would slow down together instead of finishing in turn.
+
+Consecutive synchronous steps of one request may run on different threads.
+Nothing here keeps connection state from one step to the next: transactions
+are opened and closed inside a sync view, and ``ConcurrencyLimitMixin``'s
+statement timeout follows the request to whichever connection runs its
+queries.
+"""
+from concurrent.futures import Executor, Future
+import itertools
+import queue
+import threading
+
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
+import django
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import close_old_connections
+
+
+class SyncPool:
+    """
+    ``size`` threads running the synchronous steps of every request, those
+    of the oldest request first.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._queue = queue.PriorityQueue()
+        self._requests = itertools.count()
+        self._steps = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """An executor for the steps of a new request."""
+        return RequestExecutor(self, next(self._requests))
+
+    def submit(self, request, fn, args, kwargs):
+        if len(self._threads) < self.size:
+            self._start_thread()
+        future = Future()
+        self._queue.put((request, next(self._steps), future, fn, args, kwargs))
+        return future
+
+    def _start_thread(self):
+        with self._lock:
+            if len(self._threads) < self.size:
+                thread = threading.Thread(
+                    target=self._work, name=f'swirl-sync-{len(self._threads)}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        last_request = None
+        while True:
+            request, _, future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if request != last_request:
+                # request_started/finished only close the connections of the
+                # thread they run on; check this thread's before a new request.
+                close_old_connections()
+                last_request = request
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+class RequestExecutor(Executor):
+    def __init__(self, pool, request):
+        self.pool = pool
+        self.request = request
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self.pool.submit(self.request, fn, args, kwargs)
+
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = SyncPool(settings.ASGI_SYNC_THREADS)
+    return _pool
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await super().__call__(scope, receive, send)
+
+        async with ThreadSensitiveContext() as context:
+            # Django's own handler would start a thread for this request.
+            SyncToAsync.context_to_thread_executor[context] = get_pool().executor()
+            try:
+                await self.handle(scope, receive, send)
+            finally:
+                # Leaving the context shuts its executor down; it has nothing to shut.
+                SyncToAsync.context_to_thread_executor.pop(context, None)
+
+
+def get_asgi_application():
+    """Like ``django.core.asgi.get_asgi_application``, with ``ASGIHandler``."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
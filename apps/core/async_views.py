@@ -0,0 +1,128 @@
+"""
+Async versions of DRF's views.
+
+DRF's ``APIView.dispatch`` is synchronous, so under ASGI a DRF view holds
+one of ``apps.core.asgi``'s threads from start to finish. ``AsyncAPIView``
+dispatches on the event loop to ``async def`` handlers that read through
+Django's async ORM, and only goes to a thread for the steps that block:
+
+- ``initial()``: authentication, permissions and throttles, which read the
+  user cache, the throttle store and the database (a concurrency limit's
+  queue is waited on in ``ainitial()``, on the event loop);
+- serializing, since method fields and ``prepare_page`` run queries;
+- ``handle_exception()`` and ``finalize_response()``, which may read and
+  write the cache.
+
+``AsyncListAPIView`` and ``AsyncRetrieveAPIView`` stand in for DRF's
+``ListAPIView`` and ``RetrieveAPIView``. Their querysets come from
+``aget_queryset()``, which returns ``get_queryset()`` unless a view
+overrides it to run queries of its own; pages are read with
+``apaginate_queryset()`` and objects with ``aget_object()``. Everything else
+(``filter_queryset()``, ``get_serializer_class()`` and the mixins that
+override them) is shared with the sync views, and responses are the same.
+"""
+import inspect
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from rest_framework import generics, mixins
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+async def serializer_data(serializer):
+    """``serializer.data``, computed on a thread since fields may run queries."""
+    return await sync_to_async(lambda: serializer.data)()
+
+
+class AsyncAPIView(APIView):
+    async def ainitial(self, request, *args, **kwargs):
+        """``initial()``; mixins extend it with steps that wait on the event loop."""
+        await sync_to_async(self.initial)(request, *args, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(),
+                                  self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS is still answered by DRF's sync handler.
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = await sync_to_async(self.finalize_response)(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncGenericAPIView(AsyncAPIView, generics.GenericAPIView):
+    async def aget_queryset(self):
+        """``get_queryset()``; override to build the queryset with queries."""
+        return self.get_queryset()
+
+    def get_queryset(self):
+        # A view that only overrides aget_queryset() still has a queryset for
+        # sync callers, like the browsable API's filter form (on a thread).
+        if type(self).aget_queryset is not AsyncGenericAPIView.aget_queryset:
+            return async_to_sync(self.aget_queryset)()
+        return super().get_queryset()
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(await self.aget_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await aget_object_or_404(queryset, **filter_kwargs)
+        except (TypeError, ValueError, ValidationError):
+            # As in DRF's get_object_or_404: a lookup of the wrong type is a 404.
+            raise Http404
+
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+
+class AsyncListAPIView(mixins.ListModelMixin, AsyncGenericAPIView):
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(await serializer_data(serializer))
+
+        serializer = self.get_serializer([item async for item in queryset], many=True)
+        return Response(await serializer_data(serializer))
+
+
+class AsyncRetrieveAPIView(mixins.RetrieveModelMixin, AsyncGenericAPIView):
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(await serializer_data(serializer))
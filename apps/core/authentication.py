@@ -1,14 +1,101 @@
+from collections import OrderedDict
+from copy import copy
+import threading
+import time
+
+from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class ExpiringLRUCache:
+    """
+    Thread-safe, size-bounded LRU mapping whose entries each carry their own
+    expiry timestamp. Lives in the worker process; nothing is shared across
+    workers.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = ExpiringLRUCache(settings.AUTH_CACHE_MAX_ENTRIES)
+_user_cache = ExpiringLRUCache(settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached row so the next request reloads it."""
+    _user_cache.delete(str(user_id))
+
 
 class CookieJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication from the ``access_token`` cookie.
+
+    Decoded tokens are cached until they expire and user rows for
+    ``AUTH_USER_CACHE_TIMEOUT`` seconds (never past the token's expiry), so
+    repeat requests skip both signature verification and the users table.
+    """
+
     def authenticate(self, request):
         raw_token = request.COOKIES.get("access_token")
-        print(raw_token)
 
         if raw_token is None:
             return None
 
-        validated_token = self.get_validated_token(raw_token)
-        user = self.get_user(validated_token)
+        validated_token = _token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = self.get_validated_token(raw_token)
+            _token_cache.set(raw_token, validated_token, validated_token["exp"])
+
+        user = self.get_cached_user(validated_token)
 
         return user, validated_token
+
+    def get_cached_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            # Let simplejwt raise its usual error for a token without a user.
+            return self.get_user(validated_token)
+
+        user_id = str(user_id)
+        user = _user_cache.get(user_id)
+        if user is None:
+            user = self.get_user(validated_token)
+            expires_at = min(
+                time.time() + settings.AUTH_USER_CACHE_TIMEOUT,
+                validated_token["exp"],
+            )
+            _user_cache.set(user_id, user, expires_at)
+        # Each request gets its own instance so per-request state set on
+        # request.user never leaks into other requests.
+        return copy(user)
@@ -0,0 +1,285 @@
+"""
+Concurrency limits and load shedding for expensive endpoints.
+
+Views that declare a ``concurrency_class`` share that class's limiter from
+``CONCURRENCY_LIMITS``: at most ``limit`` requests run at once in a worker,
+up to ``queue`` more wait at most ``queue_timeout`` seconds for a slot, and
+anything beyond that is shed. A shed request gets the last successful
+response for the same user and URL if one was cached within
+``fallback_ttl`` seconds (marked with ``X-Degraded: 1``), and otherwise a
+503 with ``Retry-After``.
+
+On PostgreSQL, ``statement_timeout`` (milliseconds) bounds every query the
+view runs; a query cancelled by it is answered like a shed request. The
+timeout is kept in a context variable and set on each connection before its
+next query, so it follows the request to whichever thread runs its queries
+(under ASGI, any of ``apps.core.asgi``'s pool).
+
+Limits and counters are per worker process.
+"""
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+from django.db.backends.signals import connection_created
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+# PostgreSQL's SQLSTATE for a statement cancelled by statement_timeout.
+QUERY_CANCELED = '57014'
+
+# The statement timeout (ms) of the current request's view, or None.
+_statement_timeout = ContextVar('statement_timeout', default=None)
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service is busy, please retry shortly.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait=None, detail=None):
+        super().__init__(detail)
+        self.wait = wait
+
+
+class _Waiter:
+    """A request queued for a slot; ``wake`` is called once it's handed one."""
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name, limit, queue=0, queue_timeout=0):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def _admit_or_queue(self, wake):
+        """With the lock held: True if admitted, False if shed, else the queued waiter."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if self.waiting >= self.queue:
+            self.shed += 1
+            return False
+
+        waiter = _Waiter(wake)
+        self._waiters.append(waiter)
+        self.waiting += 1
+        self.queued += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        return waiter
+
+    def _give_up(self, waiter):
+        """Leave the queue after a timeout. True if a slot was handed over meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.waiting -= 1
+            self.timed_out += 1
+            self.shed += 1
+            return False
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room. Returns False if shed."""
+        event = threading.Event()
+        with self._lock:
+            waiter = self._admit_or_queue(event.set)
+        if isinstance(waiter, bool):
+            return waiter
+        if event.wait(self.queue_timeout):
+            return True
+        return self._give_up(waiter)
+
+    async def aacquire(self):
+        """``acquire()``, waiting in the queue on the event loop rather than a thread."""
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+
+        with self._lock:
+            waiter = self._admit_or_queue(wake)
+        if isinstance(waiter, bool):
+            return waiter
+        try:
+            await asyncio.wait_for(asyncio.shield(woken), self.queue_timeout)
+        except TimeoutError:
+            return self._give_up(waiter)
+        except asyncio.CancelledError:
+            if self._give_up(waiter):
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        """Free a slot, handing it straight to the longest-waiting request if any."""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                self.waiting -= 1
+                self.admitted += 1
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self.active -= 1
+
+    def retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'limit': self.limit,
+                'queue': self.queue,
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'shed': self.shed,
+                'timed_out': self.timed_out,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                config = settings.CONCURRENCY_LIMITS[name]
+                limiter = ConcurrencyLimiter(
+                    name,
+                    limit=config['limit'],
+                    queue=config.get('queue', 0),
+                    queue_timeout=config.get('queue_timeout', 0),
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+def get_concurrency_metrics():
+    """Snapshots of every limiter this worker has used."""
+    return [limiter.snapshot() for limiter in list(_limiters.values())]
+
+
+def _statement_timeout_wrapper(execute, sql, params, many, context):
+    connection = context['connection']
+    timeout = _statement_timeout.get()
+    if connection.statement_timeout != timeout:
+        # On the DB-API cursor, so this doesn't go through the execute wrappers again.
+        with connection.connection.cursor() as cursor:
+            if timeout:
+                cursor.execute("SET statement_timeout = %s", [int(timeout)])
+            else:
+                cursor.execute("SET statement_timeout TO DEFAULT")
+        connection.statement_timeout = timeout
+    return execute(sql, params, many, context)
+
+
+def _install_statement_timeout(sender, connection, **kwargs):
+    if connection.vendor != 'postgresql':
+        return
+    # A new session starts with the default timeout.
+    connection.statement_timeout = None
+    if _statement_timeout_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_statement_timeout_wrapper)
+
+
+def install():
+    connection_created.connect(_install_statement_timeout, dispatch_uid='statement_timeout_wrapper')
+
+
+def is_statement_timeout(exc):
+    cause = exc.__cause__
+    return getattr(cause, 'sqlstate', None) == QUERY_CANCELED or getattr(cause, 'pgcode', None) == QUERY_CANCELED
+
+
+class ConcurrencyLimitMixin:
+    """
+    Runs a DRF view's handler under the limiter named by ``concurrency_class``.
+    The slot is taken after authentication and throttling, so rejected
+    requests never occupy one. Async views wait for it on the event loop
+    (``ainitial``): blocked in a thread, queued requests would take the
+    threads of ``apps.core.asgi``'s pool that admitted ones need.
+    """
+    concurrency_class = None
+
+    def get_concurrency_config(self):
+        return settings.CONCURRENCY_LIMITS[self.concurrency_class]
+
+    def get_fallback_cache_key(self, request):
+        user_id = request.user.pk if request.user.is_authenticated else 'anon'
+        return f'degraded:{self.concurrency_class}:{user_id}:{request.get_full_path()}'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._concurrency_slot = False
+        # Async views queue in ainitial(), so a waiting request holds no thread.
+        if self.concurrency_class is not None and not self.view_is_async:
+            self.enter_limiter(get_limiter(self.concurrency_class).acquire())
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        if self.concurrency_class is not None:
+            self.enter_limiter(await get_limiter(self.concurrency_class).aacquire())
+
+    def enter_limiter(self, acquired):
+        if not acquired:
+            raise Overloaded(wait=get_limiter(self.concurrency_class).retry_after())
+        self._concurrency_slot = True
+        _statement_timeout.set(self.get_concurrency_config().get('statement_timeout'))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, OperationalError) and is_statement_timeout(exc):
+            exc = Overloaded(wait=get_limiter(self.concurrency_class).retry_after())
+        if isinstance(exc, Overloaded) and self.request.method == 'GET':
+            cached = cache.get(self.get_fallback_cache_key(self.request))
+            if cached is not None:
+                return Response(cached, headers={'X-Degraded': '1'})
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, '_concurrency_slot', False):
+            self._concurrency_slot = False
+            _statement_timeout.set(None)
+            get_limiter(self.concurrency_class).release()
+
+            config = self.get_concurrency_config()
+            fallback_ttl = config.get('fallback_ttl')
+            if (
+                fallback_ttl
+                and request.method == 'GET'
+                and response.status_code == 200
+                and isinstance(response, Response)
+            ):
+                cache.set(self.get_fallback_cache_key(request), response.data, fallback_ttl)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,230 @@
+"""
+Account deletion in the background.
+
+Deleting a user in the request made Django collect every post, comment,
+reaction, bookmark, follow and notification of theirs in memory and delete
+them in one transaction, which could time out and lock hot tables. Instead
+the account is deactivated right away and an ``AccountDeletionJob`` deletes
+the dependents step by step in batches of ``ACCOUNT_DELETION_BATCH_SIZE``,
+each in its own short transaction. After every batch the denormalized
+counters of the rows it touched (other users' follower counts, posts' and
+comments' reaction/comment counts, ...) are recomputed with set-based
+``UPDATE``s. The user row goes last.
+
+Each step only deletes rows that still exist, so a failed or interrupted
+job can simply be run again (``manage.py run_account_deletions``).
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from apps.blogs.counters import count_of, recount_categories, recount_comments, recount_posts
+from apps.blogs.models import Bookmark, Comment, Post, Reaction
+from apps.notifications.models import Notification, NotificationPreference, PushNotificationToken
+
+from .models import AccountDeletionJob, Follow, User
+from .tasks import run_after_commit
+
+logger = logging.getLogger(__name__)
+
+
+def recount_follows(user_ids):
+    return User.objects.filter(pk__in=user_ids).update(
+        followers_count=count_of(Follow.objects.all(), 'following'),
+        following_count=count_of(Follow.objects.all(), 'follower'),
+    )
+
+
+def delete_in_batches(job, queryset, values=(), after_batch=None):
+    """
+    Delete ``queryset`` ``ACCOUNT_DELETION_BATCH_SIZE`` rows at a time.
+    ``after_batch`` gets the ``(pk, *values)`` rows of each batch once they
+    are deleted, inside the same transaction.
+    """
+    model = queryset.model
+    batch_size = settings.ACCOUNT_DELETION_BATCH_SIZE
+    while True:
+        rows = list(queryset.order_by('pk').values_list('pk', *values)[:batch_size])
+        if not rows:
+            return
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            if after_batch:
+                after_batch(rows)
+        job.rows_deleted += deleted
+        job.save(update_fields=['rows_deleted', 'updated_at'])
+
+
+def delete_follows(job, user_id):
+    def after_batch(rows):
+        recount_follows({user for _, follower, following in rows for user in (follower, following)} - {user_id})
+
+    delete_in_batches(
+        job,
+        Follow.objects.filter(follower_id=user_id) | Follow.objects.filter(following_id=user_id),
+        values=('follower_id', 'following_id'),
+        after_batch=after_batch,
+    )
+
+
+def delete_reactions(job, user_id):
+    post_type = ContentType.objects.get_for_model(Post)
+    comment_type = ContentType.objects.get_for_model(Comment)
+
+    def after_batch(rows):
+        recount_posts({object_id for _, type_id, object_id in rows if type_id == post_type.id})
+        recount_comments({object_id for _, type_id, object_id in rows if type_id == comment_type.id})
+
+    delete_in_batches(
+        job,
+        Reaction.objects.filter(user_id=user_id),
+        values=('content_type_id', 'object_id'),
+        after_batch=after_batch,
+    )
+
+
+def delete_bookmarks(job, user_id):
+    delete_in_batches(
+        job,
+        Bookmark.objects.filter(user_id=user_id),
+        values=('post_id',),
+        after_batch=lambda rows: recount_posts({post_id for _, post_id in rows}),
+    )
+
+
+def delete_comments(job, user_id):
+    comment_type = ContentType.objects.get_for_model(Comment)
+    # Other users' replies to these comments go first, deepest first, in
+    # batches of their own: deleting a comment cascades into its replies, in
+    # any number, and would leave their reactions and notifications behind.
+    depth = 0
+    while Comment.objects.filter(**{'parent__' * (depth + 1) + 'user_id': user_id}).exists():
+        depth += 1
+    for level in range(depth, 0, -1):
+        replies = Comment.objects.filter(**{'parent__' * level + 'user_id': user_id})
+        reply_ids = replies.values('pk')
+        delete_in_batches(job, Notification.objects.filter(content_type=comment_type, object_id__in=reply_ids))
+        delete_in_batches(job, Reaction.objects.filter(content_type=comment_type, object_id__in=reply_ids))
+        delete_in_batches(
+            job,
+            replies,
+            values=('post_id',),
+            after_batch=lambda rows: recount_posts({post_id for _, post_id in rows}),
+        )
+
+    def after_batch(rows):
+        comment_ids = [comment_id for comment_id, _, _ in rows]
+        # Reactions and notifications point at comments generically, so they don't cascade.
+        Reaction.objects.filter(content_type=comment_type, object_id__in=comment_ids).delete()
+        Notification.objects.filter(content_type=comment_type, object_id__in=comment_ids).delete()
+        recount_posts({post_id for _, post_id, parent_id in rows if parent_id is None})
+        recount_comments({parent_id for _, _, parent_id in rows if parent_id is not None})
+
+    delete_in_batches(
+        job,
+        Comment.objects.filter(user_id=user_id),
+        values=('post_id', 'parent_id'),
+        after_batch=after_batch,
+    )
+
+
+def delete_posts(job, user_id):
+    post_type = ContentType.objects.get_for_model(Post)
+    comment_type = ContentType.objects.get_for_model(Comment)
+    post_ids = Post.objects.filter(author_id=user_id).values('pk')
+    comment_ids = Comment.objects.filter(post__author_id=user_id).values('pk')
+    # Other users' activity on these posts goes first in batches of its own,
+    # so deleting a post never cascades into an unbounded number of rows.
+    # Notifications (new_post fan-out creates one per follower) and
+    # reactions point at posts and comments generically and wouldn't
+    # cascade at all.
+    delete_in_batches(job, Notification.objects.filter(content_type=post_type, object_id__in=post_ids))
+    delete_in_batches(job, Reaction.objects.filter(content_type=post_type, object_id__in=post_ids))
+    delete_in_batches(job, Reaction.objects.filter(content_type=comment_type, object_id__in=comment_ids))
+    delete_in_batches(job, Notification.objects.filter(content_type=comment_type, object_id__in=comment_ids))
+    delete_in_batches(job, Bookmark.objects.filter(post__author_id=user_id))
+    # Comments without replies only, so no batch cascades into a reply tree;
+    # each batch leaves new leaves for the next, until none are left.
+    delete_in_batches(job, Comment.objects.filter(post__author_id=user_id, replies__isnull=True))
+    delete_in_batches(
+        job,
+        Post.objects.filter(author_id=user_id),
+        values=('category_id',),
+        after_batch=lambda rows: recount_categories({category_id for _, category_id in rows}),
+    )
+
+
+def delete_notifications(job, user_id):
+    delete_in_batches(job, Notification.objects.filter(user_id=user_id))
+    delete_in_batches(job, Notification.objects.filter(actor_id=user_id))
+    delete_in_batches(job, PushNotificationToken.objects.filter(user_id=user_id))
+    delete_in_batches(job, NotificationPreference.objects.filter(user_id=user_id))
+
+
+def delete_user(job, user_id):
+    deleted, _ = User.objects.filter(pk=user_id).delete()
+    job.rows_deleted += deleted
+
+
+STEPS = [
+    ('follows', delete_follows),
+    ('reactions', delete_reactions),
+    ('bookmarks', delete_bookmarks),
+    ('comments', delete_comments),
+    ('posts', delete_posts),
+    ('notifications', delete_notifications),
+    ('user', delete_user),
+]
+
+
+def start_account_deletion(user):
+    """
+    Deactivate ``user`` and queue the deletion of their account. Returns the
+    job, reusing one that is already under way.
+    """
+    job = AccountDeletionJob.objects.filter(
+        user_id=user.pk,
+        status__in=[AccountDeletionJob.PENDING, AccountDeletionJob.RUNNING]
+    ).first()
+    if job is not None:
+        return job
+
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        job = AccountDeletionJob.objects.create(user_id=user.pk)
+        run_after_commit(run_account_deletion, job.pk)
+    return job
+
+
+def run_account_deletion(job_id):
+    job = AccountDeletionJob.objects.get(pk=job_id)
+    if job.status == AccountDeletionJob.COMPLETED:
+        return job
+
+    job.status = AccountDeletionJob.RUNNING
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        for index, (name, step) in enumerate(STEPS):
+            job.step = name
+            job.save(update_fields=['step', 'updated_at'])
+            step(job, job.user_id)
+            job.steps_completed = index + 1
+            job.save(update_fields=['steps_completed', 'rows_deleted', 'updated_at'])
+    except Exception as e:
+        logger.exception(f"Deletion of user {job.user_id} failed at step {job.step}")
+        job.status = AccountDeletionJob.FAILED
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'rows_deleted', 'updated_at'])
+        return job
+
+    job.status = AccountDeletionJob.COMPLETED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info(f"Deleted user {job.user_id}: {job.rows_deleted} rows")
+    return job
@@ -0,0 +1,237 @@
+"""
+Streaming export of everything an account owns.
+
+Records are read and serialized ``EXPORT_CHUNK_SIZE`` at a time with the
+regular API serializers (minus fields that only make sense to a viewer, like
+``is_liked``), and written out as they are produced, so memory stays flat
+however big the account is. Each chunk is its own keyset query (``pk >``
+the last one) rather than a read from one long-lived cursor, so under ASGI
+``astream()`` can produce every chunk on whichever thread of
+``apps.core.asgi``'s pool is free, without buffering the whole export.
+
+NDJSON exports have one ``{"section", "cursor", "data"}`` object per line
+and end with ``{"section": "end"}``. An interrupted download is resumed by
+requesting the export again with ``?after=<cursor of the last line>``.
+The zip variant holds one ``<section>.ndjson`` file per section.
+"""
+import json
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.blogs.models import Bookmark, Comment, Post, Reaction
+from apps.blogs.serializers import (
+    BookmarkSerializer,
+    CommentSerializer,
+    PostSerializer,
+    PostSummarySerializer,
+    ReactionSerializer,
+)
+from apps.notifications.models import Notification
+from apps.notifications.serializers import NotificationSerializer
+from apps.notifications.utils import attach_notification_targets
+
+from .models import Follow, User
+from .serializers import FollowSerializer, UserSerializer, UserSummarySerializer
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def without(fields, *excluded):
+    return [field for field in fields if field not in excluded]
+
+
+class ExportUserSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        fields = without(UserSerializer.Meta.fields, 'password', 'is_following')
+
+
+class ExportUserSummarySerializer(UserSummarySerializer):
+    class Meta(UserSummarySerializer.Meta):
+        fields = without(UserSummarySerializer.Meta.fields, 'is_following')
+
+
+class ExportPostSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = without(
+            PostSerializer.Meta.fields,
+            'author', 'tags', 'category_id', 'is_liked', 'is_bookmarked'
+        )
+
+
+class ExportCommentSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        fields = without(CommentSerializer.Meta.fields, 'user', 'is_liked')
+
+
+class ExportReactionSerializer(ReactionSerializer):
+    target_content_type = serializers.SerializerMethodField()
+    target_object_id = serializers.IntegerField(source='object_id', read_only=True)
+
+    class Meta(ReactionSerializer.Meta):
+        fields = without(ReactionSerializer.Meta.fields, 'user') + ['target_content_type', 'target_object_id']
+
+    def get_target_content_type(self, obj):
+        return ContentType.objects.get_for_id(obj.content_type_id).model
+
+
+class ExportBookmarkSerializer(BookmarkSerializer):
+    post = PostSummarySerializer(read_only=True)
+
+    class Meta(BookmarkSerializer.Meta):
+        fields = without(BookmarkSerializer.Meta.fields, 'user')
+
+
+class ExportFollowingSerializer(FollowSerializer):
+    following = ExportUserSummarySerializer(read_only=True)
+
+    class Meta(FollowSerializer.Meta):
+        fields = without(FollowSerializer.Meta.fields, 'follower')
+
+
+class ExportFollowerSerializer(FollowSerializer):
+    follower = ExportUserSummarySerializer(read_only=True)
+
+    class Meta(FollowSerializer.Meta):
+        fields = without(FollowSerializer.Meta.fields, 'following')
+
+
+class ExportNotificationSerializer(NotificationSerializer):
+    actor = ExportUserSummarySerializer(read_only=True)
+
+    class Meta(NotificationSerializer.Meta):
+        fields = without(NotificationSerializer.Meta.fields, 'user')
+
+
+def get_sections(user):
+    """``(name, queryset, serializer class, per-chunk hook)`` in export order."""
+    return [
+        ('profile', User.objects.filter(pk=user.pk), ExportUserSerializer, None),
+        (
+            'posts',
+            Post.objects.filter(author=user).select_related('category').prefetch_related('tags'),
+            ExportPostSerializer,
+            None,
+        ),
+        ('comments', Comment.objects.filter(user=user).select_related('post'), ExportCommentSerializer, None),
+        ('reactions', Reaction.objects.filter(user=user), ExportReactionSerializer, None),
+        ('bookmarks', Bookmark.objects.filter(user=user).select_related('post'), ExportBookmarkSerializer, None),
+        ('following', Follow.objects.filter(follower=user).select_related('following'), ExportFollowingSerializer, None),
+        ('followers', Follow.objects.filter(following=user).select_related('follower'), ExportFollowerSerializer, None),
+        (
+            'notifications',
+            Notification.objects.filter(user=user).select_related('actor'),
+            ExportNotificationSerializer,
+            attach_notification_targets,
+        ),
+    ]
+
+
+SECTION_NAMES = [
+    'profile', 'posts', 'comments', 'reactions',
+    'bookmarks', 'following', 'followers', 'notifications',
+]
+
+
+def parse_cursor(value):
+    """``'<section>:<id>'`` -> ``(section, id)``. Raises ValueError if malformed."""
+    section, _, pk = value.partition(':')
+    if section not in SECTION_NAMES:
+        raise ValueError(f"Unknown export section: {section}")
+    return section, int(pk)
+
+
+def iter_chunks(user, after=None):
+    """
+    Yield ``(section, [(pk, data), ...])`` for every chunk of the export,
+    starting after ``after`` (a parsed cursor) if given.
+    """
+    resume_section, resume_pk = after or (None, None)
+    for name, queryset, serializer_class, prepare in get_sections(user):
+        last_pk = None
+        if resume_section is not None:
+            if name != resume_section:
+                continue
+            last_pk = resume_pk
+            resume_section = None
+
+        queryset = queryset.order_by('pk')
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(page[:EXPORT_CHUNK_SIZE])
+            if not chunk:
+                break
+            if prepare:
+                prepare(chunk)
+            data = serializer_class(chunk, many=True).data
+            yield name, [(instance.pk, item) for instance, item in zip(chunk, data)]
+            if len(chunk) < EXPORT_CHUNK_SIZE:
+                break
+            last_pk = chunk[-1].pk
+
+
+def encode_line(record):
+    return json.dumps(record, cls=JSONEncoder, ensure_ascii=False).encode() + b'\n'
+
+
+def ndjson_stream(user, after=None):
+    for section, records in iter_chunks(user, after):
+        yield b''.join(
+            encode_line({'section': section, 'cursor': f'{section}:{pk}', 'data': data})
+            for pk, data in records
+        )
+    yield encode_line({'section': 'end'})
+
+
+class _ZipOutput:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_stream(user, after=None):
+    output = _ZipOutput()
+    current, member = None, None
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for section, records in iter_chunks(user, after):
+            if section != current:
+                if member is not None:
+                    member.close()
+                current = section
+                member = archive.open(f'{section}.ndjson', 'w', force_zip64=True)
+            member.write(b''.join(encode_line(data) for _, data in records))
+            yield output.drain()
+        if member is not None:
+            member.close()
+    yield output.drain()
+
+
+async def astream(stream):
+    """
+    ``stream`` (``ndjson_stream`` or ``zip_stream``) as an async iterator for
+    ASGI responses, producing each chunk on a thread as it is sent; Django
+    would otherwise collect a sync iterator in full before sending anything.
+    """
+    done = object()
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(stream, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(stream.close)()
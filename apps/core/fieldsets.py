@@ -0,0 +1,157 @@
+"""
+Sparse fieldsets and card representations.
+
+``?fields=`` and ``?expand=`` choose which fields a GET response renders:
+
+- ``fields=id,title,author.first_name`` renders only those fields. A nested
+  object named without sub-fields (``fields=id,author``) renders its default
+  representation.
+- ``expand=content,author.bio`` adds fields the default representation
+  leaves out, ``expand=author`` renders that nested object in full, and
+  ``expand=*`` renders everything.
+
+Unknown names are ignored. List endpoints default to cards: each
+serializer's ``Meta.card_fields`` (every field if it has none), with nested
+serializers as their own cards. Detail endpoints default to every field.
+
+A fieldset is applied by subclassing the serializer with ``Meta.fields`` and
+the nested serializers narrowed to it, so unrequested fields are never built
+or computed. ``apps.core.projection`` compiles each subclass on its own, so
+projected lists do not select their columns either. ``prepare_page`` methods
+check ``renders()`` to skip lookups for fields that are not rendered.
+"""
+from functools import cache, lru_cache
+
+from rest_framework import mixins, serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+ALL = '*'
+
+
+def parse_paths(value):
+    """``'a,b.c,b.d'`` -> ``{'a': {}, 'b': {'c': {}, 'd': {}}}``."""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+@cache
+def _shape(serializer_class):
+    """
+    ``(names, nested, card_fields)``: the readable field names of
+    ``serializer_class`` in order, the serializer class of each nested one,
+    and its ``Meta.card_fields`` or None.
+    """
+    names, nested = [], {}
+    for field in serializer_class().fields.values():
+        if field.write_only:
+            continue
+        names.append(field.field_name)
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(child, serializers.BaseSerializer) and field.field_name in serializer_class._declared_fields:
+            nested[field.field_name] = type(child)
+    card_fields = getattr(getattr(serializer_class, 'Meta', None), 'card_fields', None)
+    return tuple(names), nested, card_fields and frozenset(card_fields)
+
+
+def select(serializer_class, fields=None, expand=None, card=False):
+    """
+    The fieldset of ``serializer_class`` for ``parse_paths()`` trees of
+    ``fields`` and ``expand``: a tuple of ``(name, nested fieldset or None)``
+    in declaration order.
+    """
+    expand = expand or {}
+    names, nested, card_fields = _shape(serializer_class)
+    if fields:
+        chosen = [name for name in names if name in fields]
+    elif ALL in expand or not card or card_fields is None:
+        chosen = names
+    else:
+        chosen = [name for name in names if name in card_fields or name in expand]
+
+    fieldset = []
+    for name in chosen:
+        if name not in nested:
+            fieldset.append((name, None))
+            continue
+        if ALL in expand:
+            child_expand, child_card = {ALL: {}}, False
+        else:
+            child_expand = expand.get(name, {})
+            child_card = card and not (name in expand and not child_expand)
+        child_fields = fields.get(name) if fields else None
+        fieldset.append((name, select(nested[name], child_fields, child_expand, child_card)))
+    return tuple(fieldset)
+
+
+@lru_cache(maxsize=256)
+def fieldset_serializer(serializer_class, fieldset):
+    """A read-only subclass of ``serializer_class`` that renders ``fieldset``."""
+    declared = serializer_class._declared_fields
+    attrs = {}
+    for name, nested in fieldset:
+        if nested is None:
+            continue
+        field = declared[name]
+        if isinstance(field, serializers.ListSerializer):
+            child = fieldset_serializer(type(field.child), nested)(*field.child._args, **field.child._kwargs)
+            attrs[name] = type(field)(*field._args, **{**field._kwargs, 'child': child})
+        else:
+            attrs[name] = fieldset_serializer(type(field), nested)(*field._args, **field._kwargs)
+    attrs['Meta'] = type('Meta', (serializer_class.Meta,), {'fields': [name for name, _ in fieldset]})
+    return type(serializer_class.__name__, (serializer_class,), {
+        '__module__': serializer_class.__module__,
+        '__qualname__': serializer_class.__qualname__,
+        **attrs,
+    })
+
+
+def narrow(serializer_class, fields=None, expand=None, card=False):
+    """
+    ``serializer_class`` narrowed to the raw ``?fields=`` and ``?expand=``
+    values, or ``serializer_class`` itself if that renders every field.
+    """
+    fieldset = select(
+        serializer_class,
+        parse_paths(fields) if fields else None,
+        parse_paths(expand) if expand else None,
+        card,
+    )
+    if fieldset == select(serializer_class):
+        return serializer_class
+    return fieldset_serializer(serializer_class, fieldset)
+
+
+def renders(serializer, path):
+    """Whether ``serializer`` renders the field at dotted ``path``."""
+    for name in path.split('.'):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        field = serializer.fields.get(name)
+        if field is None or field.write_only:
+            return False
+        serializer = field
+    return True
+
+
+class SparseFieldsMixin:
+    """
+    Applies ``?fields=`` and ``?expand=`` to GET responses, and renders lists
+    as cards.
+    """
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if self.request.method not in ('GET', 'HEAD'):
+            return serializer_class
+        card = isinstance(self, mixins.ListModelMixin)
+        fields = self.request.query_params.get(FIELDS_PARAM)
+        expand = self.request.query_params.get(EXPAND_PARAM)
+        if not (card or fields or expand):
+            return serializer_class
+        return narrow(serializer_class, fields, expand, card)
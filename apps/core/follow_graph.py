@@ -0,0 +1,294 @@
+"""
+In-memory follow graph for suggestions, mutuals and degree queries.
+
+``Follow`` is loaded into two CSR adjacency structures indexed by user id:
+``forward`` (who a user follows) and ``reverse`` (who follows a user). Each
+is an ``indptr`` array plus a sorted ``indices`` array, so a user's
+neighbours are one contiguous slice and set operations over them are NumPy
+calls instead of queries.
+
+Follows and unfollows made in this worker are applied as deltas on top of
+the arrays (via the ``Follow`` signals) and folded in once there are
+``COMPACT_THRESHOLD`` of them. Every ``FOLLOW_GRAPH_SYNC_INTERVAL`` seconds
+the graph pulls follows created by other workers; unfollows made elsewhere
+show up at the next full rebuild, every ``FOLLOW_GRAPH_REBUILD_INTERVAL``
+seconds. A rebuild streams the table into arrays and builds the new graph
+without holding the lock, so queries keep being answered from the old one
+meanwhile; follows and unfollows made during it are applied to both. Answers can therefore lag slightly behind the database, which is
+fine for recommendations but means this must not be used for access checks.
+"""
+from datetime import timedelta
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+import numpy as np
+
+from .models import Follow
+
+COMPACT_THRESHOLD = 10000
+# Follows created this long before the previous sync are read again, so a
+# row whose transaction committed late is not missed.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+_EMPTY = np.empty(0, dtype=np.int64)
+EDGE_DTYPE = np.dtype([('follower', np.int64), ('following', np.int64)])
+
+
+def build_csr(sources, targets, size):
+    """CSR arrays for the edges ``sources[i] -> targets[i]`` over ``size`` nodes."""
+    order = np.lexsort((targets, sources))
+    indices = targets[order].astype(np.int64)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return indptr, indices
+
+
+def gather(indptr, indices, nodes):
+    """Concatenated neighbour slices of ``nodes``, without a Python loop."""
+    nodes = nodes[nodes < len(indptr) - 1]
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return _EMPTY
+    # Position k of the output reads indices[start of its slice + offset in it].
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets]
+
+
+class Adjacency:
+    """One direction of the graph: CSR arrays plus not-yet-compacted deltas."""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+        self.added = {}
+        self.removed = {}
+
+    @property
+    def size(self):
+        return len(self.indptr) - 1
+
+    def base(self, node):
+        if node >= self.size:
+            return _EMPTY
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbors(self, node):
+        """Sorted neighbour ids of ``node``, deltas included."""
+        result = self.base(node)
+        removed = self.removed.get(node)
+        if removed:
+            result = result[~np.isin(result, list(removed))]
+        added = self.added.get(node)
+        if added:
+            result = np.union1d(result, np.fromiter(added, dtype=np.int64))
+        return result
+
+    def has_edge(self, source, target):
+        if target in self.added.get(source, ()):
+            return True
+        if target in self.removed.get(source, ()):
+            return False
+        base = self.base(source)
+        position = np.searchsorted(base, target)
+        return position < len(base) and base[position] == target
+
+    def gather(self, nodes):
+        """Concatenated neighbours of every node in ``nodes``, deltas included."""
+        changed = [node for node in nodes.tolist() if node in self.added or node in self.removed]
+        if not changed:
+            return gather(self.indptr, self.indices, nodes)
+        unchanged = nodes[~np.isin(nodes, changed)]
+        parts = [gather(self.indptr, self.indices, unchanged)]
+        parts.extend(self.neighbors(node) for node in changed)
+        return np.concatenate(parts)
+
+    def add(self, source, target):
+        removed = self.removed.get(source)
+        if removed and target in removed:
+            removed.discard(target)
+        else:
+            self.added.setdefault(source, set()).add(target)
+
+    def remove(self, source, target):
+        added = self.added.get(source)
+        if added and target in added:
+            added.discard(target)
+        else:
+            self.removed.setdefault(source, set()).add(target)
+
+    def delta_count(self):
+        return sum(map(len, self.added.values())) + sum(map(len, self.removed.values()))
+
+    def edges(self):
+        """``(sources, targets)`` of every edge, deltas applied."""
+        sources = np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.indptr))
+        targets = self.indices
+        if self.removed:
+            removed = [(source, target) for source, targets_ in self.removed.items() for target in targets_]
+            removed_keys = np.array([source * (1 << 32) + target for source, target in removed], dtype=np.int64)
+            keep = ~np.isin(sources * (1 << 32) + targets, removed_keys)
+            sources, targets = sources[keep], targets[keep]
+        if self.added:
+            added = [(source, target) for source, targets_ in self.added.items() for target in targets_]
+            added = np.array(added, dtype=np.int64).reshape(-1, 2)
+            sources = np.concatenate([sources, added[:, 0]])
+            targets = np.concatenate([targets, added[:, 1]])
+        return sources, targets
+
+
+class FollowGraph:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held by the one thread rebuilding; others keep using the old graph.
+        self._rebuild_lock = threading.Lock()
+        self.forward = None
+        self.reverse = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._last_sync = None
+        # Follows and unfollows seen while a rebuild reads the table, to be
+        # applied again to the new graph.
+        self._replay = None
+
+    @staticmethod
+    def _build(sources, targets):
+        size = int(max(sources.max(initial=0), targets.max(initial=0))) + 1
+        return Adjacency(*build_csr(sources, targets, size)), Adjacency(*build_csr(targets, sources, size))
+
+    def _load(self, sources, targets):
+        self.forward, self.reverse = self._build(sources, targets)
+
+    def _rebuild_due(self):
+        return self.forward is None or time.monotonic() - self._built_at >= settings.FOLLOW_GRAPH_REBUILD_INTERVAL
+
+    def _rebuild(self):
+        """Read the whole table and swap in the new graph; runs without ``_lock``."""
+        now = timezone.now()
+        with self._lock:
+            self._replay = []
+        try:
+            # Streamed into one array, without a Python tuple per follow.
+            rows = Follow.objects.values_list('follower_id', 'following_id').iterator(chunk_size=10000)
+            edges = np.fromiter(rows, dtype=EDGE_DTYPE)
+            forward, reverse = self._build(
+                np.ascontiguousarray(edges['follower']), np.ascontiguousarray(edges['following'])
+            )
+            del edges
+        except BaseException:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self.forward, self.reverse = forward, reverse
+            for apply, follower_id, following_id in replay:
+                apply(follower_id, following_id)
+            self._built_at = self._synced_at = time.monotonic()
+            self._last_sync = now
+
+    def _sync(self):
+        now = timezone.now()
+        recent = list(Follow.objects.filter(
+            created_at__gte=self._last_sync - SYNC_OVERLAP
+        ).values_list('follower_id', 'following_id'))
+        with self._lock:
+            for follower_id, following_id in recent:
+                self._add(follower_id, following_id)
+            self._synced_at = time.monotonic()
+            self._last_sync = now
+
+    def _refresh(self):
+        if self._rebuild_due():
+            # Without a graph yet every caller waits for the first build.
+            if self._rebuild_lock.acquire(blocking=self.forward is None):
+                try:
+                    if self._rebuild_due():
+                        self._rebuild()
+                finally:
+                    self._rebuild_lock.release()
+        elif time.monotonic() - self._synced_at >= settings.FOLLOW_GRAPH_SYNC_INTERVAL:
+            self._sync()
+
+    def _compact(self):
+        self._load(*self.forward.edges())
+
+    def _add(self, follower_id, following_id):
+        if self.forward.has_edge(follower_id, following_id):
+            return
+        self.forward.add(follower_id, following_id)
+        self.reverse.add(following_id, follower_id)
+        if self.forward.delta_count() >= COMPACT_THRESHOLD:
+            self._compact()
+
+    def _remove(self, follower_id, following_id):
+        if not self.forward.has_edge(follower_id, following_id):
+            return
+        self.forward.remove(follower_id, following_id)
+        self.reverse.remove(following_id, follower_id)
+        if self.forward.delta_count() >= COMPACT_THRESHOLD:
+            self._compact()
+
+    def add_follow(self, follower_id, following_id):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((self._add, follower_id, following_id))
+            if self.forward is not None:
+                self._add(follower_id, following_id)
+
+    def remove_follow(self, follower_id, following_id):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((self._remove, follower_id, following_id))
+            if self.forward is not None:
+                self._remove(follower_id, following_id)
+
+    def degree(self, user_id):
+        self._refresh()
+        with self._lock:
+            return {
+                'followers': len(self.reverse.neighbors(user_id)),
+                'following': len(self.forward.neighbors(user_id)),
+            }
+
+    def mutuals(self, user_id, target_id):
+        """Ids of users ``user_id`` follows who also follow ``target_id``."""
+        self._refresh()
+        with self._lock:
+            return np.intersect1d(
+                self.forward.neighbors(user_id),
+                self.reverse.neighbors(target_id),
+                assume_unique=True,
+            )
+
+    def suggestions(self, user_id, limit=20):
+        """
+        Users followed by the people ``user_id`` follows, ranked by how many
+        of them do, as ``(user_id, mutual_count)`` pairs.
+        """
+        self._refresh()
+        with self._lock:
+            following = self.forward.neighbors(user_id)
+            if not len(following):
+                return []
+            candidates = self.forward.gather(following)
+        candidates = candidates[~np.isin(candidates, following) & (candidates != user_id)]
+        if not len(candidates):
+            return []
+
+        ids, counts = np.unique(candidates, return_counts=True)
+        # Highest overlap first, lower id first among equals.
+        order = np.lexsort((ids, -counts))[:limit]
+        return list(zip(ids[order].tolist(), counts[order].tolist()))
+
+    def reset(self):
+        with self._lock:
+            self.forward = self.reverse = None
+            self._replay = None
+
+
+follow_graph = FollowGraph()
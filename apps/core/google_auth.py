@@ -0,0 +1,115 @@
+"""
+Google ID token verification for ``google_login``.
+
+Google's signing certificates are cached per worker for as long as the
+``Cache-Control: max-age`` of the certificate response allows, and are only
+fetched early when a token names a key id the cache doesn't know (Google
+rotated its keys). All fetches share one pooled HTTP session.
+
+Tests and offline benchmarks can point ``GOOGLE_OAUTH_CERTS_URL`` at a locally
+served key set, or build a ``GoogleIDTokenVerifier`` with ``certs`` directly.
+"""
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt as google_jwt
+from google.auth.transport import requests as google_requests
+import jwt
+import requests
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Fallback lifetime when the certificate response has no usable max-age.
+DEFAULT_CERTS_MAX_AGE = 60 * 60
+# Unknown key ids trigger at most one refetch per this many seconds, so
+# tokens with made-up key ids can't be used to hammer Google.
+MIN_REFETCH_INTERVAL = 60
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class GoogleIDTokenVerifier:
+    def __init__(self, audience, certs_url=None, certs=None, session=None, clock_skew_in_seconds=0):
+        self.audience = audience
+        self.certs_url = certs_url
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+        self._lock = threading.Lock()
+        self._certs = dict(certs or {})
+        # Certificates handed in directly never expire.
+        self._expires_at = float('inf') if certs else 0.0
+        self._fetched_at = 0.0
+        self._session = session or requests.Session()
+        self._request = google_requests.Request(session=self._session)
+
+    def _fetch_certs(self):
+        response = self._request(self.certs_url, method='GET')
+        if response.status != 200:
+            raise google_exceptions.TransportError(
+                f"Could not fetch certificates at {self.certs_url}"
+            )
+
+        max_age = DEFAULT_CERTS_MAX_AGE
+        match = _MAX_AGE_RE.search(response.headers.get('cache-control', ''))
+        if match:
+            max_age = int(match.group(1))
+
+        now = time.monotonic()
+        self._certs = json.loads(response.data.decode('utf-8'))
+        self._expires_at = now + max_age
+        self._fetched_at = now
+
+    def get_certs(self, key_id=None):
+        with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            unknown_key = (
+                key_id is not None
+                and key_id not in self._certs
+                and now - self._fetched_at >= MIN_REFETCH_INTERVAL
+            )
+            if self.certs_url and (expired or unknown_key):
+                self._fetch_certs()
+            return self._certs
+
+    def verify(self, token):
+        """
+        Return the claims of a valid Google ID token for ``audience``.
+        Raises ``ValueError`` for any invalid token.
+        """
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+
+        try:
+            key_id = jwt.get_unverified_header(token).get('kid')
+        except jwt.PyJWTError as e:
+            raise ValueError(f"Malformed token: {e}") from e
+
+        id_info = google_jwt.decode(
+            token,
+            certs=self.get_certs(key_id),
+            audience=self.audience,
+            clock_skew_in_seconds=self.clock_skew_in_seconds,
+        )
+        if id_info.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+        return id_info
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_google_verifier():
+    """The worker's shared verifier, configured from settings on first use."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = GoogleIDTokenVerifier(
+                    audience=settings.GOOGLE_OAUTH_CLIENT_ID,
+                    certs_url=settings.GOOGLE_OAUTH_CERTS_URL,
+                )
+    return _verifier
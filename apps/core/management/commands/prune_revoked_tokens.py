@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have expired anyway."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help="Maximum number of rows removed per DELETE statement.",
+        )
+
+    def handle(self, *args, **options):
+        expired = RevokedToken.objects.filter(expires_at__lt=timezone.now())
+        total = 0
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            deleted, _ = RevokedToken.objects.filter(pk__in=ids).delete()
+            total += deleted
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired revoked tokens"))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.deletion import run_account_deletion
+from apps.core.models import AccountDeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run account deletion jobs that failed or never finished, e.g. "
+        "because the worker running them restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=30,
+            help="Treat pending/running jobs not updated for this long as abandoned.",
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        jobs = AccountDeletionJob.objects.filter(
+            Q(status=AccountDeletionJob.FAILED) |
+            Q(
+                status__in=[AccountDeletionJob.PENDING, AccountDeletionJob.RUNNING],
+                updated_at__lt=stale_before
+            )
+        ).order_by('created_at')
+
+        for job_id in jobs.values_list('pk', flat=True):
+            job = run_account_deletion(job_id)
+            message = f"{job.pk}: user {job.user_id} {job.status}, {job.rows_deleted} rows deleted"
+            if job.status == AccountDeletionJob.COMPLETED:
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.ERROR(f"{message} ({job.error})"))
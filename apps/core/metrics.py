@@ -0,0 +1,401 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+``apps.core.middleware.MetricsMiddleware`` times every request and,
+through a database execute wrapper and a hook on DRF's ``Serializer.data``,
+counts the SQL queries, SQL time and serializer time it caused. Results are kept per
+``(route, method)`` in this process, where a route is the URL pattern
+(``api/users/<int:id>/``), so cardinality stays bounded. Response
+compression (``apps.core.compression``) is recorded per route and encoding.
+
+With ``METRICS_DIR`` set, each worker also writes its totals to
+``<METRICS_DIR>/metrics-<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL``
+seconds, and ``/metrics`` serves the sum over all workers' files. Without
+it, ``/metrics`` only reflects the worker that answers the scrape. The files
+of workers that are gone (their pid no longer runs) are removed at the next
+scrape, and a worker that hasn't written its file for ``STALE_FLUSHES``
+flush intervals has handled no request since, so its gauges count as 0.
+
+``/metrics`` requires ``METRICS_TOKEN`` as a bearer token unless
+``METRICS_PUBLIC`` is set.
+"""
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from copy import deepcopy
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import serializers
+
+from .concurrency import get_concurrency_metrics
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+COMPRESSION_STATS = ('responses', 'input_bytes', 'output_bytes', 'seconds')
+# Flush intervals after which a worker's file no longer reflects its gauges.
+STALE_FLUSHES = 3
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+def _bucket_index(buckets, value):
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+        self.compression = {}
+        self._flushed_at = 0.0
+
+    def observe(self, route, method, status, duration, metrics, response_bytes, throttle_seconds):
+        with self._lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = {
+                    'statuses': {},
+                    'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'latency_sum': 0.0,
+                    'query_buckets': [0] * (len(QUERY_BUCKETS) + 1),
+                    'queries': 0,
+                    'sql_seconds': 0.0,
+                    'serializer_seconds': 0.0,
+                    'throttle_seconds': 0.0,
+                    'response_bytes': 0,
+                }
+            status = str(status)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            stats['latency_buckets'][_bucket_index(LATENCY_BUCKETS, duration)] += 1
+            stats['latency_sum'] += duration
+            stats['query_buckets'][_bucket_index(QUERY_BUCKETS, metrics.queries)] += 1
+            stats['queries'] += metrics.queries
+            stats['sql_seconds'] += metrics.sql_seconds
+            stats['serializer_seconds'] += metrics.serializer_seconds
+            stats['throttle_seconds'] += throttle_seconds
+            stats['response_bytes'] += response_bytes
+
+    def observe_compression(self, route, method, encoding, input_bytes, output_bytes, seconds):
+        with self._lock:
+            stats = self.compression.get((route, method, encoding))
+            if stats is None:
+                stats = self.compression[(route, method, encoding)] = dict.fromkeys(COMPRESSION_STATS, 0)
+            stats['responses'] += 1
+            stats['input_bytes'] += input_bytes
+            stats['output_bytes'] += output_bytes
+            stats['seconds'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'routes': [
+                    {'route': route, 'method': method, **deepcopy(stats)}
+                    for (route, method), stats in self.routes.items()
+                ],
+                'compression': [
+                    {'route': route, 'method': method, 'encoding': encoding, **stats}
+                    for (route, method, encoding), stats in self.compression.items()
+                ],
+                'concurrency': get_concurrency_metrics(),
+            }
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.compression.clear()
+
+
+registry = Registry()
+
+
+def start_request():
+    """Start collecting query and serializer cost for the current request."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_seconds += time.perf_counter() - start
+
+
+def _install_execute_wrapper(sender, connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@contextmanager
+def serializer_timer():
+    """Count the enclosed block as serializer time for the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    # Only the outermost serializer is timed; nested ones are part of it.
+    metrics.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_seconds += time.perf_counter() - start
+
+
+def _timed_data(data_property):
+    def data(self):
+        with serializer_timer():
+            return data_property.fget(self)
+    return property(data)
+
+
+def install():
+    """Hook the database and serializers. Called once from ``CoreConfig.ready``."""
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='metrics_execute_wrapper')
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data, '_metrics_timed', False):
+            timed = _timed_data(serializer_class.data)
+            timed.fget._metrics_timed = True
+            serializer_class.data = timed
+
+
+def merge_snapshots(snapshots):
+    routes = {}
+    compression = {}
+    concurrency = {}
+    for snapshot in snapshots:
+        for stats in snapshot['routes']:
+            key = (stats['route'], stats['method'])
+            merged = routes.get(key)
+            if merged is None:
+                routes[key] = deepcopy(stats)
+                continue
+            for status, count in stats['statuses'].items():
+                merged['statuses'][status] = merged['statuses'].get(status, 0) + count
+            for name in ('latency_buckets', 'query_buckets'):
+                merged[name] = [a + b for a, b in zip(merged[name], stats[name])]
+            for name in (
+                'latency_sum', 'queries', 'sql_seconds', 'serializer_seconds',
+                'throttle_seconds', 'response_bytes',
+            ):
+                merged[name] += stats[name]
+        # Snapshots written before compression was recorded have no key for it.
+        for stats in snapshot.get('compression', ()):
+            key = (stats['route'], stats['method'], stats['encoding'])
+            merged = compression.get(key)
+            if merged is None:
+                compression[key] = dict(stats)
+                continue
+            for name in COMPRESSION_STATS:
+                merged[name] += stats[name]
+        for limiter in snapshot['concurrency']:
+            merged = concurrency.setdefault(limiter['name'], dict.fromkeys(limiter, 0))
+            for name, value in limiter.items():
+                if name == 'name':
+                    merged[name] = value
+                elif name == 'max_queue_depth':
+                    merged[name] = max(merged[name], value)
+                else:
+                    merged[name] += value
+    return {
+        'routes': list(routes.values()),
+        'compression': list(compression.values()),
+        'concurrency': list(concurrency.values()),
+    }
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    directory = settings.METRICS_DIR
+    if not directory:
+        return registry.snapshot()
+    # Bring this worker's file up to date so the scrape includes its latest numbers.
+    registry.flush(directory)
+    stale_before = time.time() - STALE_FLUSHES * settings.METRICS_FLUSH_INTERVAL
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        except ValueError:
+            continue
+        if not _process_exists(pid):
+            # An exited or recycled worker's totals would be summed forever.
+            with suppress(OSError):
+                os.remove(path)
+            continue
+        try:
+            modified = os.path.getmtime(path)
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if modified < stale_before:
+            for limiter in snapshot['concurrency']:
+                limiter.update(dict.fromkeys(CONCURRENCY_GAUGES, 0))
+        snapshots.append(snapshot)
+    return merge_snapshots(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, buckets, counts, total, labels):
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+
+
+COUNTERS = [
+    ('sql_seconds', 'swirl_db_query_duration_seconds_total', 'Time spent in SQL queries.'),
+    ('serializer_seconds', 'swirl_serializer_duration_seconds_total', 'Time spent serializing responses.'),
+    ('throttle_seconds', 'swirl_throttle_duration_seconds_total', 'Time spent evaluating rate limits.'),
+    ('response_bytes', 'swirl_http_response_bytes_total', 'Response body bytes sent.'),
+]
+
+COMPRESSION_COUNTERS = [
+    ('responses', 'swirl_http_compressed_responses_total', 'Responses compressed.'),
+    ('input_bytes', 'swirl_http_compression_input_bytes_total', 'Response bytes before compression.'),
+    ('output_bytes', 'swirl_http_compression_output_bytes_total', 'Response bytes after compression.'),
+    ('seconds', 'swirl_http_compression_duration_seconds_total', 'Time spent compressing responses.'),
+]
+
+CONCURRENCY_METRICS = [
+    ('active', 'swirl_concurrency_active', 'gauge', 'Requests currently holding a slot.'),
+    ('queue_depth', 'swirl_concurrency_queue_depth', 'gauge', 'Requests currently waiting for a slot.'),
+    ('admitted', 'swirl_concurrency_admitted_total', 'counter', 'Requests that got a slot.'),
+    ('shed', 'swirl_concurrency_shed_total', 'counter', 'Requests turned away.'),
+    ('timed_out', 'swirl_concurrency_timed_out_total', 'counter', 'Requests that gave up waiting.'),
+]
+CONCURRENCY_GAUGES = [key for key, _, kind, _ in CONCURRENCY_METRICS if kind == 'gauge']
+
+
+def render(snapshot):
+    routes = sorted(snapshot['routes'], key=lambda stats: (stats['route'], stats['method']))
+    lines = [
+        '# HELP swirl_http_requests_total Requests handled.',
+        '# TYPE swirl_http_requests_total counter',
+    ]
+    for stats in routes:
+        for status, count in sorted(stats['statuses'].items()):
+            labels = _labels(route=stats['route'], method=stats['method'], status=status)
+            lines.append(f'swirl_http_requests_total{labels} {count}')
+
+    lines += [
+        '# HELP swirl_http_request_duration_seconds Request latency.',
+        '# TYPE swirl_http_request_duration_seconds histogram',
+    ]
+    for stats in routes:
+        _histogram(
+            lines, 'swirl_http_request_duration_seconds', LATENCY_BUCKETS,
+            stats['latency_buckets'], stats['latency_sum'],
+            {'route': stats['route'], 'method': stats['method']},
+        )
+
+    lines += [
+        '# HELP swirl_db_queries_per_request SQL queries run per request.',
+        '# TYPE swirl_db_queries_per_request histogram',
+    ]
+    for stats in routes:
+        _histogram(
+            lines, 'swirl_db_queries_per_request', QUERY_BUCKETS,
+            stats['query_buckets'], stats['queries'],
+            {'route': stats['route'], 'method': stats['method']},
+        )
+
+    for key, name, help_text in COUNTERS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for stats in routes:
+            lines.append(f'{name}{_labels(route=stats["route"], method=stats["method"])} {stats[key]}')
+
+    compression = sorted(
+        snapshot['compression'],
+        key=lambda stats: (stats['route'], stats['method'], stats['encoding']),
+    )
+    for key, name, help_text in COMPRESSION_COUNTERS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for stats in compression:
+            labels = _labels(route=stats['route'], method=stats['method'], encoding=stats['encoding'])
+            lines.append(f'{name}{labels} {stats[key]}')
+
+    for key, name, kind, help_text in CONCURRENCY_METRICS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for limiter in snapshot['concurrency']:
+            lines.append(f'{name}{_labels(limiter=limiter["name"])} {limiter[key]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorized = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (authorized or settings.METRICS_PUBLIC):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
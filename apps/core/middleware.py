@@ -0,0 +1,198 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .compression import Compressor, compressible, negotiate
+from .metrics import end_request, registry, start_request
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Runs in whichever mode the layer below it does, calling
+    ``process_response(request, response)`` on the way out.
+
+    Django's ``MiddlewareMixin`` does the same, but in async mode it runs
+    every hook on a worker thread; hooks here never block, so they run on the
+    event loop. Under ASGI a single sync-only middleware would make Django run
+    the whole stack, and every view under it, on one thread per request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+
+class ServerTimingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Reports per-request overheads recorded by the API in the
+    ``Server-Timing`` response header, e.g. ``throttle;dur=0.41``.
+    """
+
+    def process_response(self, request, response):
+        throttle_duration = getattr(request, 'throttle_duration', None)
+        if throttle_duration is not None:
+            entry = f'throttle;dur={throttle_duration * 1000:.2f}'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {entry}' if existing else entry
+
+        return response
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """Records latency, SQL and serializer cost and response size per route."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    def record(self, request, response, metrics, duration):
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        if response.streaming:
+            response_bytes = int(response.get('Content-Length', 0))
+        else:
+            response_bytes = len(response.content)
+
+        registry.observe(
+            route,
+            request.method,
+            response.status_code,
+            duration,
+            metrics,
+            response_bytes,
+            getattr(request, 'throttle_duration', 0.0),
+        )
+        registry.maybe_flush()
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, usable in async mode: it only supports sync, which under ASGI
+    would put every request below it on a thread of its own. Static paths are
+    looked up in memory; only serving a file goes to a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class CompressionMiddleware(SyncAndAsyncMiddleware):
+    """Compresses responses with brotli or gzip (see ``apps.core.compression``)."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not compressible(response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # The body now depends on Accept-Encoding, whether or not this client gets it compressed.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        compressor = Compressor(encoding)
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(
+                    response.streaming_content, compressor, route, request.method
+                )
+            else:
+                response.streaming_content = self._compress(
+                    response.streaming_content, compressor, route, request.method
+                )
+            del response['Content-Length']
+        else:
+            compressed = compressor.compress(response.content)
+            # Not worth it (already dense, or a tiny page of short strings).
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+            self._observe(compressor, route, request.method)
+
+        # The bytes differ from the uncompressed representation's, so a strong ETag no longer holds.
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _compress(self, chunks, compressor, route, method):
+        try:
+            for data in chunks:
+                if data:
+                    yield compressor.chunk(data)
+            yield compressor.finish()
+        finally:
+            self._observe(compressor, route, method)
+
+    async def _compress_async(self, chunks, compressor, route, method):
+        try:
+            async for data in chunks:
+                if data:
+                    yield compressor.chunk(data)
+            yield compressor.finish()
+        finally:
+            self._observe(compressor, route, method)
+
+    @staticmethod
+    def _observe(compressor, route, method):
+        registry.observe_compression(
+            route, method, compressor.encoding,
+            compressor.input_bytes, compressor.output_bytes, compressor.seconds,
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', 'follower'], name='core_follow_followi_d6d1c6_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='core_follow_followi_a11b6b_idx',
+        ),
+    ]
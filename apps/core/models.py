@@ -1,4 +1,6 @@
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser, PermissionsMixin
+import uuid
+
 from django.db import models
 
 REGISTRATION_CHOICES = [
@@ -79,8 +81,56 @@ class Follow(models.Model):
         unique_together = ("follower", "following")
         indexes = [
             models.Index(fields=["follower"]),
-            models.Index(fields=["following"]),
+            # Also serves "who follows this user"; the second column lets
+            # relationship lookups check specific followers from the index.
+            models.Index(fields=["following", "follower"]),
         ]
 
     def __str__(self):
-        return f"{self.follower} → {self.following}"
\ No newline at end of file
+        return f"{self.follower} → {self.following}"
+
+
+class RevokedToken(models.Model):
+    """
+    A refresh token that must no longer be accepted, by its ``jti`` claim.
+    Rows can be deleted once the token would have expired anyway.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class AccountDeletionJob(models.Model):
+    """
+    Progress of deleting a deactivated account and everything it owns in
+    the background. Keeps only the user's id, since the user row itself is
+    the last thing the job deletes.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.PositiveIntegerField(db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    step = models.CharField(max_length=30, blank=True)
+    steps_completed = models.PositiveSmallIntegerField(default=0)
+    rows_deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Deletion of user {self.user_id} ({self.status})"
@@ -0,0 +1,38 @@
+"""
+Pagination.
+
+``PageNumberPagination`` is DRF's, plus ``apaginate_queryset`` for the async
+views in ``apps.core.async_views``.
+"""
+from django.core.paginator import InvalidPage
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset``, counting and fetching the page through the async ORM."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # A cached_property: filled in here, paginator.page() won't count synchronously.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+        self.page.object_list = [item async for item in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+
+        return list(self.page)
@@ -0,0 +1,331 @@
+"""
+Read-only projections of list serializers.
+
+For a list GET, ``ModelSerializer`` loads full model instances and then
+walks its fields for every row: ``get_attribute``, a ``None`` check and
+``to_representation`` per field, and the same again for every nested
+serializer. A ``Projection`` does that walk once per serializer class. It
+turns the readable fields into the ``.values()`` columns they need plus one
+accessor per field, so a page costs one narrow query (and one per
+many-to-many field) and building each row's dict is a loop over
+precomputed accessors. The output is the same as the serializer's, key for key.
+
+Fields a projection can reproduce:
+
+- model columns, and primary keys of foreign keys;
+- nested model serializers over foreign keys;
+- ``many=True`` nested model serializers over many-to-many fields, on the
+  top-level serializer only;
+- ``SerializerMethodField``s whose method is listed in the serializer's
+  ``Meta.projection_columns``, which names the columns the method reads.
+  Methods get a ``Row`` holding those columns instead of a model instance.
+  ``prepare_page`` is declared the same way.
+
+Serializers with any other field, or with their own ``to_representation``,
+are not projected, and ``ProjectedListMixin`` lists them the usual way.
+"""
+from collections import defaultdict
+import logging
+from operator import itemgetter
+from weakref import WeakKeyDictionary
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import serializer_timer
+
+logger = logging.getLogger(__name__)
+
+OWNER = '_projection_owner'
+
+TEXT_FIELDS = {'CharField', 'TextField', 'SlugField'}
+INTEGER_FIELDS = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+# DRF field to_representation -> model field types it returns unchanged.
+PASSTHROUGH = {
+    serializers.CharField.to_representation: TEXT_FIELDS,
+    serializers.IntegerField.to_representation: INTEGER_FIELDS,
+    serializers.BooleanField.to_representation: {'BooleanField'},
+}
+
+VALUE, DATETIME, NESTED, MANY, METHOD = 'value', 'datetime', 'nested', 'many', 'method'
+
+
+class Unsupported(Exception):
+    """The serializer has a field a projection cannot reproduce."""
+
+
+class Row:
+    """Attribute access to one serializer's columns of a ``.values()`` row."""
+
+    __slots__ = ('_values', '_prefix')
+
+    def __init__(self, values, prefix=''):
+        self._values = values
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        try:
+            return self._values[self._prefix + name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _model_field(serializer, field):
+    if field.source == '*' or len(field.source_attrs) != 1:
+        raise Unsupported(f"{field.field_name}: source {field.source!r}")
+    try:
+        return serializer.Meta.model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise Unsupported(f"{field.field_name}: {field.source!r} is not a model field") from None
+
+
+def _value(name, column, field, model_field):
+    """The spec of a field that formats one column."""
+    representation = type(field).to_representation
+    passthrough = PASSTHROUGH.get(representation)
+    if (
+        representation is serializers.BigIntegerField.to_representation
+        and not getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING)
+    ):
+        passthrough = INTEGER_FIELDS
+    if passthrough and model_field.get_internal_type() in passthrough:
+        return (VALUE, name, column, None)
+    if (
+        representation is serializers.DateTimeField.to_representation
+        and model_field.get_internal_type() == 'DateTimeField'
+        and getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() == ISO_8601
+    ):
+        return (DATETIME, name, column, field)
+    return (VALUE, name, column, field.to_representation)
+
+
+def _compile(serializer, prefix, columns, top):
+    """
+    The spec of ``serializer``'s readable fields reading ``prefix``-ed
+    columns, adding the columns it needs to ``columns``. Many-to-many specs
+    are returned separately since they are fetched with their own query.
+    """
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        raise Unsupported(f"{type(serializer).__name__} overrides to_representation")
+    declared = getattr(serializer.Meta, 'projection_columns', {})
+    spec, many = [], []
+
+    def method_columns(method_name):
+        if method_name not in declared:
+            raise Unsupported(f"{type(serializer).__name__}.{method_name} has no projection_columns")
+        for column in declared[method_name]:
+            columns[prefix + column] = None
+
+    if top and hasattr(serializer, 'prepare_page'):
+        method_columns('prepare_page')
+    pk_column = prefix + serializer.Meta.model._meta.pk.attname
+    columns[pk_column] = None
+
+    for field in serializer._readable_fields:
+        name = field.field_name
+        if isinstance(field, serializers.SerializerMethodField):
+            method_columns(field.method_name)
+            spec.append((METHOD, name, prefix, field.method_name))
+        elif isinstance(field, serializers.ListSerializer):
+            model_field = _model_field(serializer, field)
+            if not (top and model_field.many_to_many and model_field.concrete):
+                raise Unsupported(f"{name}: only top-level many-to-many lists are projected")
+            child_columns = {}
+            child_spec, _ = _compile(field.child, '', child_columns, top=False)
+            many.append((
+                name, model_field.related_model, model_field.related_query_name(),
+                list(child_columns), child_spec,
+            ))
+            spec.append((MANY, name, pk_column))
+        elif isinstance(field, serializers.ModelSerializer):
+            model_field = _model_field(serializer, field)
+            if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+                raise Unsupported(f"{name}: nested serializers need a forward foreign key")
+            fk_column = prefix + model_field.attname
+            columns[fk_column] = None
+            nested_spec, _ = _compile(field, f'{prefix}{model_field.name}__', columns, top=False)
+            spec.append((NESTED, name, fk_column, nested_spec))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            model_field = _model_field(serializer, field)
+            if not model_field.many_to_one:
+                raise Unsupported(f"{name}: primary key of a non foreign key")
+            columns[prefix + model_field.attname] = None
+            spec.append((VALUE, name, prefix + model_field.attname, None))
+        elif isinstance(field, (serializers.BaseSerializer, serializers.RelatedField, serializers.ManyRelatedField)):
+            raise Unsupported(f"{name}: {type(field).__name__}")
+        else:
+            model_field = _model_field(serializer, field)
+            if model_field.is_relation or not model_field.concrete:
+                raise Unsupported(f"{name}: {field.source!r} is not a column")
+            columns[prefix + model_field.attname] = None
+            spec.append(_value(name, prefix + model_field.attname, field, model_field))
+    return spec, many
+
+
+def _converted(column, convert):
+    def get(row):
+        value = row[column]
+        return None if value is None else convert(value)
+    return get
+
+
+def _iso_datetime(column, field):
+    """
+    ``DateTimeField.to_representation`` for ISO 8601 output, with the time
+    zone looked up once instead of for every value.
+    """
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if tz is None:
+        return _converted(column, field.to_representation)
+
+    def get(row):
+        value = row[column]
+        if value is None or value.tzinfo is None:
+            return None if value is None else field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return get
+
+
+def _nested(fk_column, getters):
+    def get(row):
+        if row[fk_column] is None:
+            return None
+        return {name: getter(row) for name, getter in getters}
+    return get
+
+
+def _many(pk_column, items):
+    def get(row):
+        return items.get(row[pk_column], [])
+    return get
+
+
+def _method(method, prefix):
+    def get(row):
+        return method(Row(row, prefix))
+    return get
+
+
+def _bind(spec, serializer, related):
+    """``(name, getter)`` pairs for ``spec``, with methods bound to ``serializer``."""
+    getters = []
+    for kind, name, *args in spec:
+        if kind == VALUE:
+            column, convert = args
+            getters.append((name, itemgetter(column) if convert is None else _converted(column, convert)))
+        elif kind == DATETIME:
+            column, field = args
+            getters.append((name, _iso_datetime(column, field)))
+        elif kind == NESTED:
+            fk_column, nested_spec = args
+            getters.append((name, _nested(fk_column, _bind(nested_spec, serializer.fields[name], related))))
+        elif kind == MANY:
+            getters.append((name, _many(args[0], related[name])))
+        else:
+            prefix, method_name = args
+            getters.append((name, _method(getattr(serializer, method_name), prefix)))
+    return getters
+
+
+class Projection:
+    """A compiled, read-only version of ``serializer_class`` for lists."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        columns = {}
+        self.spec, self.many = _compile(serializer, '', columns, top=True)
+        self.columns = list(columns)
+        self.pk_column = serializer.Meta.model._meta.pk.attname
+        self.prepare_page = hasattr(serializer, 'prepare_page')
+
+    def queryset(self, queryset):
+        """``queryset`` narrowed to the projected columns, yielding dicts."""
+        # Keep extra(select=...) columns, which the ordering may refer to.
+        return queryset.prefetch_related(None).values(*self.columns, *queryset.query.extra_select)
+
+    def render(self, rows, serializer):
+        """
+        What ``serializer_class(instances, many=True).data`` would return for
+        ``rows`` from ``queryset()``. ``serializer`` is an instance with the
+        view's context; its methods produce the method fields.
+        """
+        rows = list(rows)
+        related = {}
+        ids = [row[self.pk_column] for row in rows]
+        for field_name, model, query_name, columns, spec in self.many:
+            getters = _bind(spec, serializer.fields[field_name].child, {})
+            items = defaultdict(list)
+            for row in model._default_manager.filter(**{f'{query_name}__in': ids}).values(
+                *columns, **{OWNER: F(query_name)}
+            ):
+                items[row[OWNER]].append({name: getter(row) for name, getter in getters})
+            related[field_name] = items
+
+        with serializer_timer():
+            request = serializer.context.get('request')
+            if self.prepare_page and rows and request is not None and request.user.is_authenticated:
+                serializer.prepare_page([Row(row) for row in rows], request.user)
+            getters = _bind(self.spec, serializer, related)
+            return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+# Weak, so the subclasses apps.core.fieldsets builds go once it drops them.
+_projections = WeakKeyDictionary()
+
+
+def get_projection(serializer_class):
+    """The cached ``Projection`` of ``serializer_class``, or None if it has none."""
+    try:
+        return _projections[serializer_class]
+    except KeyError:
+        pass
+    try:
+        projection = Projection(serializer_class)
+    except Unsupported as e:
+        logger.debug("Not projecting %s: %s", serializer_class.__name__, e)
+        projection = None
+    _projections[serializer_class] = projection
+    return projection
+
+
+class ProjectedListMixin:
+    """
+    Lists through the serializer's ``Projection`` when it has one, and the
+    usual way otherwise. Filtering, ordering and pagination are unchanged.
+    ``alist`` does the same for ``apps.core.async_views.AsyncListAPIView``.
+    """
+
+    def list(self, request, *args, **kwargs):
+        projection = get_projection(self.get_serializer_class())
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = projection.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        data = projection.render(queryset if page is None else page, self.get_serializer())
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    async def alist(self, request, *args, **kwargs):
+        projection = get_projection(self.get_serializer_class())
+        if projection is None:
+            return await super().alist(request, *args, **kwargs)
+
+        queryset = projection.queryset(self.filter_queryset(await self.aget_queryset()))
+        page = await self.apaginate_queryset(queryset)
+        rows = [row async for row in queryset] if page is None else page
+        # render() queries many-to-many fields and runs prepare_page.
+        data = await sync_to_async(projection.render)(rows, self.get_serializer())
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
@@ -0,0 +1,123 @@
+"""
+``select_related`` and ``prefetch_related`` worked out from serializers.
+
+``QueryPlan.for_serializer`` walks a serializer's readable fields once and
+finds every relation rendering them will follow:
+
+- a nested serializer, or a related field other than a primary key read
+  off a foreign key, follows the relation in its ``source``;
+- a dotted ``source`` (``'post.title'``) follows every relation on the way.
+
+Relations that are single-valued all the way from the root (foreign keys,
+one-to-ones) are joined with ``select_related``. Many-valued ones (many-to-many,
+reverse foreign keys), and anything reached through one, are fetched with
+``prefetch_related``, e.g. ``post__tags`` under a selected ``post``.
+
+Method fields are not followed; serializers look up what those need for a
+whole page in ``prepare_page``.
+
+Plans are cached per serializer class, including the narrowed subclasses
+``apps.core.fieldsets`` builds, so a ``?fields=`` request only joins what it
+renders. ``QueryPlanMixin`` applies the plan of the view's serializer to
+every queryset it lists or looks objects up in.
+"""
+from weakref import WeakKeyDictionary
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def _minimal(paths):
+    """``paths`` without those another path already covers (``a`` under ``a__b``)."""
+    return tuple(sorted(
+        path for path in set(paths)
+        if not any(other.startswith(path + '__') for other in paths)
+    ))
+
+
+def _follows_last(field):
+    """Whether rendering ``field`` loads the object at the end of its source."""
+    if isinstance(field, (serializers.BaseSerializer, ManyRelatedField)):
+        return True
+    if isinstance(field, RelatedField):
+        return not field.use_pk_only_optimization()
+    return False
+
+
+class QueryPlan:
+    def __init__(self, select_related=(), prefetch_related=()):
+        self.select_related = _minimal(select_related)
+        self.prefetch_related = _minimal(prefetch_related)
+
+    def __repr__(self):
+        return f'QueryPlan(select_related={self.select_related!r}, prefetch_related={self.prefetch_related!r})'
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        select, prefetch = [], []
+        serializer = serializer_class()
+        _walk(serializer, serializer.Meta.model, '', False, select, prefetch)
+        return cls(select, prefetch)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+
+def _walk(serializer, model, prefix, many, select, prefetch):
+    """Add the relations rendering ``serializer`` over ``model`` follows."""
+    for field in serializer._readable_fields:
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, model, prefix, many, select, prefetch)
+            continue
+
+        attrs = field.source_attrs if _follows_last(field) else field.source_attrs[:-1]
+        current, path, field_many = model, prefix, many
+        for attr in attrs:
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # A property or method: whatever it touches is up to it.
+                break
+            if not model_field.is_relation:
+                break
+            path += attr
+            current = model_field.related_model
+            # Generic foreign keys (no related_model) can only be prefetched.
+            field_many = field_many or model_field.many_to_many or model_field.one_to_many or current is None
+            (prefetch if field_many else select).append(path)
+            if current is None:
+                break
+            path += '__'
+        else:
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if attrs and isinstance(nested, serializers.ModelSerializer):
+                _walk(nested, current, path, field_many, select, prefetch)
+
+
+_plans = WeakKeyDictionary()
+
+
+def get_query_plan(serializer_class):
+    """The cached ``QueryPlan`` of ``serializer_class``."""
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        plan = _plans[serializer_class] = QueryPlan.for_serializer(serializer_class)
+    return plan
+
+
+class QueryPlanMixin:
+    """
+    Applies the query plan of the view's serializer in ``filter_queryset``,
+    which list views and ``get_object`` both go through, so views do not
+    need their own ``select_related``/``prefetch_related``.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return get_query_plan(self.get_serializer_class()).apply(queryset)
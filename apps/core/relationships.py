@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Follow
+
+VERSION_KEY = 'relationships_version:{}'
+CACHE_KEY = 'relationships:{}:{}:{}'
+
+
+def get_relationship_version(user_id):
+    return cache.get_or_set(VERSION_KEY.format(user_id), 1, None)
+
+
+def bump_relationship_version(user_id):
+    """Make every cached relationship lookup made by ``user_id`` stale."""
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def get_relationships(user_id, target_ids):
+    """
+    Map each of ``target_ids`` to ``{following, followed_by, mutual}`` from
+    ``user_id``'s point of view, with one query against ``Follow``. Results
+    are cached per viewer until the viewer or a target follows or unfollows.
+    """
+    target_ids = sorted(set(target_ids))
+    digest = hashlib.md5(','.join(map(str, target_ids)).encode()).hexdigest()
+    key = CACHE_KEY.format(user_id, get_relationship_version(user_id), digest)
+    relationships = cache.get(key)
+    if relationships is not None:
+        return relationships
+
+    following, followed_by = set(), set()
+    rows = Follow.objects.filter(
+        Q(follower_id=user_id, following_id__in=target_ids) |
+        Q(following_id=user_id, follower_id__in=target_ids)
+    ).values_list('follower_id', 'following_id')
+    for follower_id, following_id in rows:
+        if follower_id == user_id:
+            following.add(following_id)
+        if following_id == user_id:
+            followed_by.add(follower_id)
+
+    relationships = {
+        target_id: {
+            'following': target_id in following,
+            'followed_by': target_id in followed_by,
+            'mutual': target_id in following and target_id in followed_by,
+        }
+        for target_id in target_ids
+    }
+    cache.set(key, relationships, settings.RELATIONSHIP_CACHE_TIMEOUT)
+    return relationships
@@ -0,0 +1,86 @@
+"""
+Response renderers.
+
+``JSONRenderer`` produces the same output as DRF's but encodes with
+msgspec, which handles dicts, lists, strings, numbers, datetimes, dates,
+UUIDs and decimals in C. Only types msgspec does not know (``ErrorDetail``,
+lazy translation strings, querysets, ...) go through a Python hook.
+Decimals are written as floats, as DRF's encoder does. msgspec writes NaN
+and infinity as ``null``, so output with a ``null`` in it is checked for
+them and, if there are any, left to DRF, which rejects them under
+``STRICT_JSON``. Very large or small finite floats are spelled differently
+(``1e20`` for ``1e+20``, ``0.00001`` for ``1e-05``); the value is the same.
+
+``MessagePackRenderer`` serves ``application/msgpack`` to clients that ask
+for it in ``Accept`` (or with ``?format=msgpack``): the same data, smaller
+and cheaper to decode on mobile. Both add ``Vary: Accept`` since the body
+now depends on that header.
+"""
+import re
+
+import msgpack
+import msgspec
+from django.utils.cache import patch_vary_headers
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+_default = JSONEncoder().default
+
+# A MessagePack float64 whose exponent bits are all ones: NaN or +/-inf.
+_NON_FINITE = re.compile(rb'\xcb[\x7f\xff][\xf0-\xff]')
+
+
+def _fallback(obj):
+    # msgspec only takes exact str/int/float; ErrorDetail and friends subclass them.
+    for base in (str, int, float):
+        if isinstance(obj, base):
+            return base(obj)
+    return _default(obj)
+
+
+def _vary_on_accept(renderer_context):
+    response = (renderer_context or {}).get('response')
+    if response is not None:
+        patch_vary_headers(response, ['Accept'])
+
+
+# MessagePack keeps NaN and infinity where JSON turns them into null.
+_probe = msgspec.msgpack.Encoder(enc_hook=_fallback, decimal_format=float)
+
+
+def _has_non_finite(data):
+    return _NON_FINITE.search(_probe.encode(data)) is not None
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    encoder = msgspec.json.Encoder(enc_hook=_fallback, decimal_format=float)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        _vary_on_accept(renderer_context)
+        if data is None:
+            return b''
+        # Indented output (?indent= in Accept) is rare; leave it to DRF.
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = self.encoder.encode(data)
+        if b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like DRF, escape the two characters that are valid in JSON but not
+        # in JavaScript string literals.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        _vary_on_accept(renderer_context)
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback, use_bin_type=True)
@@ -0,0 +1,135 @@
+"""
+Refresh token revocation with a per-worker Bloom filter in front of the
+``RevokedToken`` table.
+
+A token that is not in the filter is certainly not revoked, which answers the
+vast majority of checks without touching the database. A filter hit is
+confirmed against the table, since Bloom filters allow false positives.
+
+Each worker builds its filter from the table on first use, adds tokens it
+revokes itself immediately, and every ``TOKEN_REVOCATION_SYNC_INTERVAL``
+seconds pulls in rows other workers created since its last sync. The filter
+is rebuilt from scratch every ``TOKEN_REVOCATION_REBUILD_INTERVAL`` seconds
+(or once it fills up) so expired entries drop out.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+MIN_CAPACITY = 1024
+# Rows created this long before the previous sync are read again, so a row
+# whose transaction committed late is not missed.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._last_sync = None
+
+    def _rebuild(self):
+        now = timezone.now()
+        active = RevokedToken.objects.filter(expires_at__gt=now)
+        capacity = max(MIN_CAPACITY, active.count() * 2)
+        bloom = BloomFilter(capacity, settings.TOKEN_REVOCATION_FALSE_POSITIVE_RATE)
+        for jti in active.values_list('jti', flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+        self._filter = bloom
+        self._built_at = self._synced_at = time.monotonic()
+        self._last_sync = now
+
+    def _sync(self):
+        now = timezone.now()
+        recent = RevokedToken.objects.filter(
+            created_at__gte=self._last_sync - SYNC_OVERLAP
+        ).values_list('jti', flat=True)
+        for jti in recent:
+            # Overlapping windows return rows again; don't count them twice.
+            if jti not in self._filter:
+                self._filter.add(jti)
+        self._synced_at = time.monotonic()
+        self._last_sync = now
+
+    def _refresh(self):
+        now = time.monotonic()
+        if (
+            self._filter is None
+            or now - self._built_at >= settings.TOKEN_REVOCATION_REBUILD_INTERVAL
+            or self._filter.count >= self._filter.capacity
+        ):
+            self._rebuild()
+        elif now - self._synced_at >= settings.TOKEN_REVOCATION_SYNC_INTERVAL:
+            self._sync()
+
+    def is_revoked(self, jti):
+        with self._lock:
+            self._refresh()
+            maybe_revoked = jti in self._filter
+        if not maybe_revoked:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """Revoke ``jti``. Returns False if it was already revoked."""
+        _, created = RevokedToken.objects.get_or_create(
+            jti=jti,
+            defaults={'expires_at': expires_at}
+        )
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        return created
+
+    def revoke_token(self, token):
+        """Revoke a simplejwt token instance until its own expiry."""
+        return self.revoke(
+            token[api_settings.JTI_CLAIM],
+            datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        )
+
+    def is_token_revoked(self, token):
+        return self.is_revoked(token[api_settings.JTI_CLAIM])
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+
+revocation_store = RevocationStore()
@@ -1,9 +1,46 @@
-from rest_framework import generics, serializers
-from .models import User, Follow
+from django.db.models.manager import BaseManager
+from rest_framework import serializers
+from .models import AccountDeletionJob, User, Follow
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .fieldsets import renders
+from .revocation import revocation_store
+
+
+class PageListSerializer(serializers.ListSerializer):
+    """
+    Gives the child serializer a chance to look up viewer state
+    (``is_following``, ``is_liked``, ...) for the whole page with one query
+    per kind before any row is rendered. Children implement
+    ``prepare_page(instances, user)`` and store what they find in the
+    context, where their ``get_*`` methods look first.
+    """
+
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, BaseManager) else data)
+        request = self.context.get('request')
+        if instances and request is not None and request.user.is_authenticated:
+            self.child.prepare_page(instances, request.user)
+        return super().to_representation(instances)
+
+
+def prepare_following_ids(context, user, user_ids):
+    """Store which of ``user_ids`` ``user`` follows, unless the view already did."""
+    if 'following_ids' in context:
+        return
+    context['following_ids'] = set(
+        Follow.objects.filter(
+            follower=user,
+            following_id__in=set(user_ids)
+        ).values_list('following_id', flat=True)
+    )
+
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -11,21 +48,39 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'password', 'first_name', 'last_name', 'profile_pic_url', 'banner_url', 'bio', 'followers_count', 'following_count', 'about', 'phone_number', 'address', 'city', 'state', 'country', 'website', 'linkedin', 'instagram', 'twitter', 'github', 'registration_method', 'is_following', 'created_at', 'updated_at']
+        list_serializer_class = PageListSerializer
+        # What lists show by default (apps.core.fieldsets).
+        card_fields = [
+            'id', 'first_name', 'last_name', 'profile_pic_url', 'bio', 'followers_count', 'following_count',
+            'is_following',
+        ]
+        # Row columns each method reads, for apps.core.projection.
+        projection_columns = {
+            'prepare_page': ['id'],
+            'get_is_following': ['id'],
+        }
 
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
         return user
 
+    def prepare_page(self, users, user):
+        if renders(self, 'is_following'):
+            prepare_following_ids(self.context, user, [obj.id for obj in users])
+
     def get_is_following(self, obj):
         request = self.context.get('request')
-        user_id = obj.id
-        user = generics.get_object_or_404(User, pk=user_id)
         if not request or not request.user.is_authenticated:
             return False
 
+        # List views can resolve the whole page with one query up front.
+        following_ids = self.context.get('following_ids')
+        if following_ids is not None:
+            return obj.id in following_ids
+
         return Follow.objects.filter(
             follower=request.user,
-            following=user
+            following=obj
         ).exists()
 
 class UserSummarySerializer(serializers.ModelSerializer):
@@ -33,17 +88,30 @@ class UserSummarySerializer(serializers.ModelSerializer):
     class Meta: 
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'profile_pic_url', 'bio', 'about', 'is_following']
+        list_serializer_class = PageListSerializer
+        card_fields = ['id', 'first_name', 'last_name', 'profile_pic_url', 'is_following']
+        projection_columns = {
+            'prepare_page': ['id'],
+            'get_is_following': ['id'],
+        }
+
+    def prepare_page(self, users, user):
+        if renders(self, 'is_following'):
+            prepare_following_ids(self.context, user, [obj.id for obj in users])
 
     def get_is_following(self, obj):
         request = self.context.get('request')
-        user_id = obj.id
-        user = generics.get_object_or_404(User, pk=user_id)
         if not request or not request.user.is_authenticated:
             return False
 
+        # List views can resolve the whole page with one query up front.
+        following_ids = self.context.get('following_ids')
+        if following_ids is not None:
+            return obj.id in following_ids
+
         return Follow.objects.filter(
             follower=request.user,
-            following=user
+            following=obj
         ).exists()
 
 
@@ -85,3 +153,50 @@ class FollowSerializer(serializers.ModelSerializer):
         model = Follow
         fields = ['id', 'follower', 'following', 'created_at']
         read_only_fields = ['follower', 'following', 'created_at']
+        list_serializer_class = PageListSerializer
+
+    def prepare_page(self, follows, user):
+        user_ids = []
+        if renders(self, 'follower.is_following'):
+            user_ids += [follow.follower_id for follow in follows]
+        if renders(self, 'following.is_following'):
+            user_ids += [follow.following_id for follow in follows]
+        if user_ids:
+            prepare_following_ids(self.context, user, user_ids)
+
+
+class CookieTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refuses revoked refresh tokens and, when rotation with blacklisting is
+    on, revokes the token being exchanged so it can only be used once.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        if revocation_store.is_token_revoked(refresh):
+            raise TokenError(_("Token is blacklisted"))
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # The insert is what makes rotation single-use when two requests
+            # race with the same token.
+            if not revocation_store.revoke_token(refresh):
+                raise TokenError(_("Token is blacklisted"))
+
+        return super().validate(attrs)
+
+
+class AccountDeletionJobSerializer(serializers.ModelSerializer):
+    total_steps = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AccountDeletionJob
+        fields = [
+            'id', 'status', 'step', 'steps_completed', 'total_steps',
+            'rows_deleted', 'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_total_steps(self, obj):
+        from .deletion import STEPS
+        return len(STEPS)
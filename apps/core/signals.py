@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .follow_graph import follow_graph
+from .models import Follow, User
+from .relationships import bump_relationship_version
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    # Covers profile updates, password resets and account deletion.
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def clear_cached_relationships(sender, instance, **kwargs):
+    # Both sides see the change: one as "following", the other as "followed by".
+    bump_relationship_version(instance.follower_id)
+    bump_relationship_version(instance.following_id)
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_to_graph(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: follow_graph.add_follow(instance.follower_id, instance.following_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_from_graph(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: follow_graph.remove_follow(instance.follower_id, instance.following_id)
+    )
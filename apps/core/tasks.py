@@ -0,0 +1,56 @@
+"""
+In-process background execution for work that should not hold up a response.
+
+Tasks run on a small per-worker thread pool. They are not persisted, so a
+task still queued when the worker stops is lost; only use this for work that
+can be retried or re-derived.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_TASK_WORKERS,
+            thread_name_prefix='swirl-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {func.__name__} failed")
+        raise
+    finally:
+        # Worker threads get their own database connections; don't leave
+        # them open between tasks.
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the background pool and return its future."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            logger.exception(f"Background task {func.__name__} failed")
+            future.set_exception(e)
+        return future
+    return get_executor().submit(_run, func, args, kwargs)
+
+
+def run_after_commit(func, *args, **kwargs):
+    """Queue ``func`` for background execution once the current transaction commits."""
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
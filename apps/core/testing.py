@@ -0,0 +1,120 @@
+"""
+Query budgets for API tests.
+
+``QueryRecorder`` captures the SQL run while it is active together with the
+line of project code that caused each statement, so a failing budget can
+point at the serializer method or view that issues one query per row
+instead of just printing a count. ``QueryBudgetMixin`` builds the two checks
+the API suite needs on top of it: a fixed per-endpoint ceiling, and a query
+count that must not change with the page size.
+"""
+from collections import Counter
+from contextlib import contextmanager
+import os
+import traceback
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.pagination import PageNumberPagination
+
+from . import metrics
+
+# Execute wrappers sit between the caller and the database; skip their frames.
+_WRAPPER_FILES = {os.path.abspath(__file__), os.path.abspath(metrics.__file__)}
+_PROJECT_DIRS = tuple(
+    os.path.join(str(settings.BASE_DIR), name) + os.sep for name in ('apps', 'config')
+)
+
+
+def call_site(skip=()):
+    """
+    ``path:line (function)`` of the innermost project frame on the stack,
+    ignoring frames from the files in ``skip``.
+    """
+    skip = _WRAPPER_FILES.union(os.path.abspath(filename) for filename in skip)
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename in skip or not filename.startswith(_PROJECT_DIRS):
+            continue
+        path = os.path.relpath(filename, settings.BASE_DIR)
+        return f'{path}:{frame.lineno} ({frame.name})'
+    return '<outside the project>'
+
+
+class QueryRecorder:
+    """Records ``(sql, call site)`` for every statement run on ``using``."""
+
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, call_site()))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self, samples=3):
+        """The recorded SQL grouped by call site, busiest first."""
+        by_site = {}
+        for sql, site in self.queries:
+            by_site.setdefault(site, Counter())[sql] += 1
+        lines = []
+        for site, statements in sorted(by_site.items(), key=lambda item: -sum(item[1].values())):
+            lines.append(f'{sum(statements.values()):4d} x {site}')
+            for sql, count in statements.most_common(samples):
+                lines.append(f'         {count} x {sql[:200]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def page_size(size):
+    """Temporarily change the page size of the default pagination class."""
+    with mock.patch.object(PageNumberPagination, 'page_size', size):
+        yield
+
+
+class QueryBudgetMixin:
+    """Assertions for ``TestCase`` subclasses."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label=''):
+        with QueryRecorder() as recorder:
+            yield recorder
+        if len(recorder) > budget:
+            self.fail(
+                f'{label} ran {len(recorder)} queries, over its budget of {budget}:\n'
+                f'{recorder.report()}'
+            )
+
+    def assertConstantQueries(self, request, page_sizes, label=''):
+        """
+        Call ``request()`` once per page size and fail if the number of
+        queries changes between them. Returns the recorder of the largest
+        page size.
+        """
+        recorders = []
+        for size in page_sizes:
+            with page_size(size), QueryRecorder() as recorder:
+                request()
+            recorders.append((size, recorder))
+
+        counts = {size: len(recorder) for size, recorder in recorders}
+        if len(set(counts.values())) > 1:
+            largest, recorder = recorders[-1]
+            self.fail(
+                f'{label} query count grows with the page size {counts}; '
+                f'queries at page size {largest}:\n{recorder.report()}'
+            )
+        return recorders[-1][1]
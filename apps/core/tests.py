@@ -1,4 +1,1062 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import brotli
+import msgpack
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.urls import URLPattern, URLResolver, get_resolver, resolve
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework import renderers
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.benchmarks.load import percentile
+from apps.blogs.counters import recount_categories, recount_comments, recount_posts
+from apps.blogs.models import Bookmark, Category, Comment, Post, Reaction, Tag
+from apps.blogs.serializers import BookmarkSerializer, CategorySerializer, CommentSerializer, PostSerializer
+from apps.notifications import partitioning
+from apps.notifications.models import Notification, NotificationPreference, PushNotificationToken
+from apps.notifications.utils import fan_out_new_post
+
+from . import export
+from .asgi import SyncPool
+from .authentication import _token_cache, _user_cache
+from .compression import negotiate
+from .concurrency import ConcurrencyLimiter
+from .fieldsets import narrow
+from .deletion import recount_follows, run_account_deletion
+from .follow_graph import FollowGraph, build_csr, follow_graph
+from .metrics import collect, registry
+from .models import AccountDeletionJob, Follow, RevokedToken, User
+from .projection import get_projection
+from .query_plan import get_query_plan
+from .renderers import JSONRenderer
+from .revocation import RevocationStore, revocation_store
+from .serializers import UserSerializer
+from .testing import QueryBudgetMixin
+from .throttling import SQLiteBucketStore, UserRateThrottle, gcra, get_throttle_store
+
+# Every list below holds more rows than the larger page size, so a query
+# issued per row shows up as a difference between the two.
+PAGE_SIZES = (2, 5)
+ROWS = 7
+
+# Query budget of every GET route, measured after a warm-up request (the
+# authentication and content type caches are filled by then).
+READ_BUDGETS = {
+    'api/auth/me/': 0,
+    'api/auth/me/export/': 10,
+    'api/users/': 3,
+    'api/users/<int:id>/': 2,
+    'api/users/deletion-jobs/<uuid:job_id>/': 1,
+    'api/users/<int:id>/bookmarks/': 7,
+    'api/users/<int:id>/comments/': 5,
+    'api/users/<int:id>/posts/': 7,
+    'api/users/<int:id>/followers/': 4,
+    'api/users/<int:id>/following/': 4,
+    'api/users/<int:id>/is-following/': 2,
+    'api/users/relationships/': 0,
+    'api/users/suggestions/': 1,
+    'api/users/<int:id>/mutuals/': 1,
+    'api/users/<int:id>/degree/': 1,
+    'api/metrics/concurrency/': 0,
+    'api/posts/': 6,
+    'api/posts/<slug:slug>/': 7,
+    'api/posts/<int:id>/comments/': 4,
+    'api/posts/<int:id>/reactions/': 4,
+    'api/posts/categories/<slug:slug>/': 7,
+    'api/comments/<int:id>/': 5,
+    'api/comments/<int:id>/replies/': 4,
+    'api/comments/<int:id>/reactions/': 4,
+    'api/categories/': 1,
+    'api/categories/<slug:slug>/': 1,
+    'api/tags/': 1,
+    'api/search/posts/': 6,
+    'api/search/categories/': 2,
+    'api/search/comments/': 4,
+    'api/search/bookmarks/': 6,
+    'api/search/users/': 3,
+    'api/notifications/': 4,
+    'api/notifications/preferences/': 0,
+    'api/feeds/personalized/': 8,
+    'api/feeds/trending/': 7,
+    'api/feeds/recent/': 6,
+    'api/feeds/combined/': 9,
+    'metrics': 0,
+}
+
+# (method, route): query budget of routes that change something. Each is
+# called once inside a transaction that is rolled back afterwards.
+WRITE_BUDGETS = {
+    ('post', 'api/auth/register/'): 2,
+    ('post', 'api/auth/password-reset/'): 1,
+    ('post', 'api/auth/password-reset/confirm/'): 2,
+    ('post', 'api/auth/google_login/'): 0,
+    ('post', 'api/auth/login/'): 6,
+    ('post', 'api/auth/refresh/'): 7,
+    ('post', 'api/auth/logout/'): 4,
+    ('patch', 'api/users/<int:id>/update/'): 3,
+    ('delete', 'api/users/<int:id>/delete/'): 6,
+    ('post', 'api/users/<int:id>/follow/'): 11,
+    ('delete', 'api/users/<int:id>/follow/'): 5,
+    ('post', 'api/posts/'): 16,
+    ('patch', 'api/posts/<int:id>/update/'): 9,
+    ('delete', 'api/posts/<int:id>/delete/'): 4,
+    ('post', 'api/posts/<int:id>/comments/'): 6,
+    ('post', 'api/posts/<int:id>/reactions/'): 6,
+    ('post', 'api/posts/<int:id>/bookmark/'): 10,
+    ('delete', 'api/posts/<int:id>/bookmark/delete/'): 4,
+    ('patch', 'api/comments/<int:id>/update/'): 7,
+    ('delete', 'api/comments/<int:id>/delete/'): 5,
+    ('post', 'api/comments/<int:id>/replies/'): 10,
+    ('post', 'api/comments/<int:id>/reactions/'): 8,
+    ('post', 'api/categories/'): 3,
+    ('post', 'api/tags/'): 3,
+    ('post', 'api/notifications/<int:id>/read/'): 5,
+    ('put', 'api/notifications/preferences/'): 7,
+    ('post', 'api/notifications/push-token/'): 7,
+    ('delete', 'api/notifications/push-token/<str:token>/'): 2,
+}
+
+
+def iter_routes(patterns=None, prefix=''):
+    """Full route strings of every URL pattern, e.g. ``api/users/<int:id>/``."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route
+
+
+class SeededAPITestCase(TestCase):
+    """A viewer, their follows, posts, comments and the rest, for API tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='viewer@example.com', password='correct-horse', first_name='Viewer'
+        )
+        cls.others = [
+            User.objects.create_user(email=f'user{i}@example.com', password='x', first_name=f'User{i}')
+            for i in range(ROWS)
+        ]
+        cls.stranger = User.objects.create_user(email='stranger@example.com', password='x')
+
+        for other in cls.others:
+            Follow.objects.create(follower=cls.user, following=other)
+            Follow.objects.create(follower=other, following=cls.user)
+        # Friends of friends, for suggestions and mutuals.
+        for other in cls.others[1:]:
+            Follow.objects.create(follower=cls.others[0], following=other)
+            Follow.objects.create(follower=other, following=cls.stranger)
+
+        cls.category = Category.objects.create(name='Python', slug='python')
+        tags = [Tag.objects.create(name=f'tag{i}', slug=f'tag-{i}') for i in range(3)]
+        authors = [cls.user] * ROWS + cls.others
+        cls.posts = []
+        for i, author in enumerate(authors):
+            post = Post.objects.create(
+                author=author, category=cls.category, title=f'Post {i}', slug=f'post-{i}',
+                content='Some words. ' * 20
+            )
+            post.tags.set(tags[:2])
+            cls.posts.append(post)
+        cls.post = cls.posts[0]
+
+        cls.comments = [
+            Comment.objects.create(post=cls.post, user=other, content=f'Comment by {other.first_name}')
+            for other in cls.others
+        ]
+        cls.comment = cls.comments[0]
+        for other in cls.others:
+            Comment.objects.create(post=cls.post, user=other, parent=cls.comment, content='Reply')
+        for post in cls.posts[ROWS:]:
+            Comment.objects.create(post=post, user=cls.user, content='Nice')
+
+        post_type = ContentType.objects.get_for_model(Post)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        for other in cls.others:
+            Reaction.objects.create(user=other, content_type=post_type, object_id=cls.post.id)
+            Reaction.objects.create(user=other, content_type=comment_type, object_id=cls.comment.id)
+        for post in cls.posts[ROWS:ROWS + 3]:
+            Reaction.objects.create(user=cls.user, content_type=post_type, object_id=post.id)
+
+        for post in cls.posts[ROWS + 1:]:
+            Bookmark.objects.create(user=cls.user, post=post)
+
+        cls.notifications = [
+            Notification.objects.create(
+                user=cls.user, actor=other, action_type='reaction',
+                content_type=post_type, object_id=cls.post.id
+            )
+            for other in cls.others
+        ]
+        recount_follows([cls.user.id, cls.stranger.id] + [other.id for other in cls.others])
+        recount_posts([post.id for post in cls.posts])
+        recount_comments([comment.id for comment in cls.comments])
+        recount_categories([cls.category.id])
+
+        PushNotificationToken.objects.create(user=cls.user, token='device-token')
+        cls.job = AccountDeletionJob.objects.create(user_id=cls.stranger.id)
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.cookies['refresh_token'] = str(refresh)
+
+    def path_for(self, route, method='get'):
+        """``route`` with its converters filled in from the seeded data."""
+        section = route.split('/')[1] if route.startswith('api/') else ''
+        ids = {
+            'users': self.others[0].id,
+            'posts': self.post.id,
+            'comments': self.comment.id,
+            'notifications': self.notifications[0].id,
+        }
+        if route in ('api/users/<int:id>/bookmarks/', 'api/users/<int:id>/comments/',
+                     'api/users/<int:id>/posts/', 'api/users/<int:id>/update/',
+                     'api/users/<int:id>/delete/'):
+            ids['users'] = self.user.id
+        elif route == 'api/users/<int:id>/follow/':
+            ids['users'] = self.stranger.id if method == 'post' else self.others[0].id
+        elif route == 'api/posts/<int:id>/bookmark/':
+            ids['posts'] = self.posts[1].id
+        elif route == 'api/posts/<int:id>/bookmark/delete/':
+            ids['posts'] = self.posts[-1].id
+        elif route == 'api/comments/<int:id>/update/' or route == 'api/comments/<int:id>/delete/':
+            ids['comments'] = Comment.objects.filter(user=self.user).first().id
+
+        path = (
+            route.replace('<int:id>', str(ids.get(section, '')))
+            .replace('<slug:slug>', self.category.slug if 'categories' in route else self.post.slug)
+            .replace('<uuid:job_id>', str(self.job.id))
+            .replace('<str:token>', 'device-token')
+        )
+        if route == 'api/users/relationships/':
+            path += '?ids=' + ','.join(str(other.id) for other in self.others)
+        return '/' + path
+
+    def write_data(self, method, route):
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = PasswordResetTokenGenerator().make_token(self.user)
+        return {
+            'api/auth/register/': {'email': 'new@example.com', 'password': 'x-Secret-123'},
+            'api/auth/password-reset/': {'email': self.user.email},
+            'api/auth/password-reset/confirm/': {'uid': uid, 'token': token, 'new_password': 'x-Secret-456'},
+            'api/auth/login/': {'email': self.user.email, 'password': 'correct-horse'},
+            'api/users/<int:id>/update/': {'bio': 'Updated'},
+            'api/posts/': {
+                'title': 'New post', 'slug': 'new-post', 'content': 'Text',
+                'category_id': self.category.id, 'tags': ['tag0', 'fresh'],
+            },
+            'api/posts/<int:id>/update/': {'title': 'Renamed'},
+            'api/posts/<int:id>/comments/': {'content': 'Another comment'},
+            'api/posts/<int:id>/reactions/': {'reaction_type': 'upvote'},
+            'api/comments/<int:id>/update/': {'content': 'Edited'},
+            'api/comments/<int:id>/replies/': {'content': 'Another reply'},
+            'api/comments/<int:id>/reactions/': {'reaction_type': 'upvote'},
+            'api/categories/': {'name': 'Rust', 'slug': 'rust'},
+            'api/tags/': {'name': 'async', 'slug': 'async'},
+            'api/notifications/preferences/': [
+                {'action_type': 'follow', 'channel': 'push', 'enabled': False}
+            ],
+            'api/notifications/push-token/': {'token': 'another-device', 'device_type': 'web'},
+        }.get(route, {})
+
+    def request(self, method, route):
+        # Budgets are about queries, not rate limits.
+        get_throttle_store().clear()
+        path = self.path_for(route, method)
+        if method == 'get':
+            response = self.client.get(path)
+        else:
+            response = getattr(self.client, method)(path, self.write_data(method, route), format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+class EndpointQueryBudgetTests(QueryBudgetMixin, SeededAPITestCase):
+    def test_every_route_has_a_budget(self):
+        declared = set(READ_BUDGETS) | {route for _, route in WRITE_BUDGETS}
+        missing = [
+            route for route in iter_routes()
+            if not route.startswith('admin/') and route not in declared
+        ]
+        self.assertEqual(missing, [], 'Declare a query budget for these routes')
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_read_endpoints(self):
+        self.user.is_staff = True
+        self.user.save(update_fields=['is_staff'])
+        for route, budget in READ_BUDGETS.items():
+            with self.subTest(route=route):
+                response = self.request('get', route)
+                self.assertLess(response.status_code, 400)
+                self.assertConstantQueries(
+                    lambda: self.request('get', route), PAGE_SIZES, label=route
+                )
+                with self.assertQueryBudget(budget, label=route):
+                    self.request('get', route)
+
+    def test_write_endpoints(self):
+        for (method, route), budget in WRITE_BUDGETS.items():
+            with self.subTest(method=method, route=route), transaction.atomic():
+                with self.assertQueryBudget(budget, label=f'{method.upper()} {route}'):
+                    response = self.request(method, route)
+                self.assertLess(response.status_code, 500)
+                transaction.set_rollback(True)
+
+
+# List GETs served through apps.core.projection, with query strings that
+# exercise search, ordering and pagination.
+PROJECTED_PATHS = [
+    '/api/feeds/personalized/',
+    '/api/feeds/trending/',
+    '/api/feeds/recent/',
+    '/api/feeds/combined/',
+    '/api/search/posts/',
+    '/api/search/posts/?q=post&ordering=-comment_count',
+    '/api/search/posts/?tags=tag0&page=2',
+    '/api/search/comments/?q=comment',
+    '/api/search/categories/',
+    '/api/search/users/?q=user',
+    '/api/users/',
+    '/api/posts/categories/python/',
+    # Fieldsets from apps.core.fieldsets.
+    '/api/feeds/recent/?fields=id,title,author.first_name,tag_objects.name',
+    '/api/search/posts/?expand=content,author',
+    '/api/users/?expand=*',
+]
+
+
+class BurstRateThrottle(UserRateThrottle):
+    rate = '3/min'
+
+
+class SustainedRateThrottle(UserRateThrottle):
+    rate = '5/hour'
+
+
+class ThrottledView(APIView):
+    throttle_classes = [BurstRateThrottle, SustainedRateThrottle]
+
+    def get(self, request):
+        return Response({})
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SQLiteBucketStore(os.path.join(directory.name, 'throttle.sqlite3'))
+
+    def test_gcra(self):
+        now, tat = 1000.0, None
+        for _ in range(3):
+            allowed, wait, tat = gcra(tat, 1.0, 3.0, now)
+            self.assertEqual((allowed, wait), (True, 0.0))
+        # A burst of period / interval, then one more per interval.
+        self.assertEqual(gcra(tat, 1.0, 3.0, now), (False, 1.0, tat))
+        self.assertEqual(gcra(tat, 1.0, 3.0, now + 0.25), (False, 0.75, tat))
+        self.assertTrue(gcra(tat, 1.0, 3.0, now + 1)[0])
+        self.assertEqual(gcra(tat, 1.0, 3.0, now + 3), (True, 0.0, now + 4))
+
+    def test_store_burst_and_refill(self):
+        now = 1000.0
+        for _ in range(3):
+            self.assertEqual(self.store.acquire('key', 20.0, 60.0, now), (True, 0.0))
+        self.assertEqual(self.store.acquire('key', 20.0, 60.0, now + 5), (False, 15.0))
+        self.assertEqual(self.store.acquire('other', 20.0, 60.0, now + 5), (True, 0.0))
+        self.assertEqual(self.store.acquire('key', 20.0, 60.0, now + 20), (True, 0.0))
+        self.assertFalse(self.store.acquire('key', 20.0, 60.0, now + 20)[0])
+        for _ in range(3):
+            self.assertTrue(self.store.acquire('key', 20.0, 60.0, now + 120)[0])
+
+    def test_acquire_many_is_all_or_nothing(self):
+        now = 1000.0
+        for _ in range(2):
+            self.store.acquire('hourly', 1800.0, 3600.0, now)
+        limits = [('minute', 20.0, 60.0), ('hourly', 1800.0, 3600.0)]
+        self.assertEqual(self.store.acquire_many(limits, now), (False, 1800.0))
+        # The refused request took nothing from the bucket that had room.
+        for _ in range(3):
+            self.assertTrue(self.store.acquire('minute', 20.0, 60.0, now)[0])
+        self.assertFalse(self.store.acquire('minute', 20.0, 60.0, now)[0])
+
+    def test_view_throttles(self):
+        get_throttle_store().clear()
+        user = User.objects.create_user(email='throttled@example.com', password='x')
+        factory = APIRequestFactory()
+
+        def get():
+            request = factory.get('/')
+            force_authenticate(request, user)
+            return ThrottledView.as_view()(request)
+
+        for _ in range(3):
+            self.assertEqual(get().status_code, 200)
+        response = get()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+
+        # Each class has its own bucket, and the refused request charged neither.
+        request = factory.get('/')
+        request.user = user
+        keys = [throttle().get_bucket_key(request, None) for throttle in ThrottledView.throttle_classes]
+        self.assertEqual(len(set(keys)), 2)
+        store, now = get_throttle_store(), time.time()
+        self.assertEqual([store.acquire(keys[1], 720.0, 3600.0, now)[0] for _ in range(3)], [True, True, False])
+
+
+class AuthenticationCacheTests(TestCase):
+    def setUp(self):
+        _token_cache.clear()
+        _user_cache.clear()
+        get_throttle_store().clear()
+        self.user = User.objects.create_user(email='cached@example.com', password='correct-horse')
+        self.other = User.objects.create_user(email='followed@example.com', password='x')
+        self.access = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.cookies['access_token'] = str(self.access)
+
+    def me(self):
+        get_throttle_store().clear()
+        return self.client.get('/api/auth/me/')
+
+    def test_repeat_requests_skip_the_users_table(self):
+        self.assertEqual(self.me().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.me().status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if 'FROM "core_user"' in query['sql']])
+
+    def test_changes_are_seen_on_the_next_request(self):
+        self.me()
+        self.client.patch(f'/api/users/{self.user.id}/update/', {'bio': 'Updated'}, format='json')
+        self.assertEqual(self.me().json()['bio'], 'Updated')
+
+        self.client.post(f'/api/users/{self.other.id}/follow/')
+        self.assertEqual(self.me().json()['following_count'], 1)
+
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = PasswordResetTokenGenerator().make_token(self.user)
+        get_throttle_store().clear()
+        self.client.post(
+            '/api/auth/password-reset/confirm/',
+            {'uid': uid, 'token': token, 'new_password': 'x-Secret-456'},
+            format='json',
+        )
+        self.me()
+        cached = _user_cache.get(str(self.user.id))
+        self.assertTrue(cached.check_password('x-Secret-456'))
+
+        get_throttle_store().clear()
+        self.assertLess(self.client.delete(f'/api/users/{self.user.id}/delete/').status_code, 300)
+        self.assertEqual(self.me().status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=3600)
+    def test_cached_user_never_outlives_the_token(self):
+        self.access.set_exp(lifetime=timedelta(seconds=30))
+        self.client.cookies['access_token'] = str(self.access)
+        self.assertEqual(self.me().status_code, 200)
+        _, expires_at = _user_cache._entries[str(self.user.id)]
+        self.assertLessEqual(expires_at, self.access['exp'])
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        revocation_store.reset()
+        get_throttle_store().clear()
+        self.user = User.objects.create_user(email='revoked@example.com', password='x')
+        self.client = APIClient()
+
+    def refresh(self, token):
+        self.client.cookies['refresh_token'] = str(token)
+        return self.client.post('/api/auth/refresh/')
+
+    def test_logged_out_token_is_refused(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.cookies['access_token'] = str(refresh.access_token)
+        self.client.cookies['refresh_token'] = str(refresh)
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_rotated_token_is_single_use(self):
+        refresh = RefreshToken.for_user(self.user)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.cookies['refresh_token'].value
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    def test_revocations_by_other_workers_are_synced(self):
+        store = RevocationStore()
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(store.is_token_revoked(token))
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + timedelta(days=1))
+        # Until the next sync this worker's filter hasn't seen the row.
+        self.assertFalse(store.is_token_revoked(token))
+        with self.settings(TOKEN_REVOCATION_SYNC_INTERVAL=0):
+            self.assertTrue(store.is_token_revoked(token))
+
+    def test_filter_hits_are_confirmed_in_the_table(self):
+        store = RevocationStore()
+        token = RefreshToken.for_user(self.user)
+        store.is_token_revoked(RefreshToken.for_user(self.user))
+        with self.assertNumQueries(0):
+            self.assertFalse(store.is_token_revoked(token))
+        # Every bit set: the filter claims every token, so the table decides.
+        store._filter.bits[:] = b'\xff' * len(store._filter.bits)
+        with self.assertNumQueries(1):
+            self.assertFalse(store.is_token_revoked(token))
+
+
+class AccountDeletionTests(SeededAPITestCase):
+    def test_replies_by_other_users_are_deleted_with_their_dependents(self):
+        author = self.others[0]
+        comment_type = ContentType.objects.get_for_model(Comment)
+        reply = Comment.objects.get(parent=self.comment, user=self.others[1])
+        nested = Comment.objects.create(post=self.post, user=self.stranger, parent=reply, content='Nested')
+        for target in (reply, nested):
+            Reaction.objects.create(user=self.user, content_type=comment_type, object_id=target.id)
+            Notification.objects.create(
+                user=target.user, actor=self.user, action_type='reaction',
+                content_type=comment_type, object_id=target.id
+            )
+
+        job = AccountDeletionJob.objects.create(user_id=author.id)
+        with self.settings(ACCOUNT_DELETION_BATCH_SIZE=2):
+            run_account_deletion(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AccountDeletionJob.COMPLETED)
+        self.assertFalse(Comment.objects.filter(parent=self.comment).exists())
+        self.assertFalse(Comment.objects.filter(pk=nested.pk).exists())
+        comment_ids = Comment.objects.values('pk')
+        self.assertFalse(Reaction.objects.filter(content_type=comment_type).exclude(object_id__in=comment_ids).exists())
+        self.assertFalse(
+            Notification.objects.filter(content_type=comment_type).exclude(object_id__in=comment_ids).exists()
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, len(self.others) - 1)
+
+
+    def test_comments_on_deleted_posts_are_deleted_with_their_dependents(self):
+        author = self.others[1]
+        post = Post.objects.get(author=author)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        comment = Comment.objects.create(post=post, user=self.others[2], content='Comment')
+        reply = Comment.objects.create(post=post, user=self.stranger, parent=comment, content='Reply')
+        nested = Comment.objects.create(post=post, user=self.others[3], parent=reply, content='Nested')
+        for target in (comment, reply, nested):
+            Reaction.objects.create(user=self.user, content_type=comment_type, object_id=target.id)
+            Notification.objects.create(
+                user=target.user, actor=self.user, action_type='reaction',
+                content_type=comment_type, object_id=target.id
+            )
+
+        job = AccountDeletionJob.objects.create(user_id=author.id)
+        with self.settings(ACCOUNT_DELETION_BATCH_SIZE=1):
+            run_account_deletion(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AccountDeletionJob.COMPLETED)
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        comment_ids = Comment.objects.values('pk')
+        self.assertFalse(Reaction.objects.filter(content_type=comment_type).exclude(object_id__in=comment_ids).exists())
+        self.assertFalse(
+            Notification.objects.filter(content_type=comment_type).exclude(object_id__in=comment_ids).exists()
+        )
+
+
+class NewPostFanOutTests(SeededAPITestCase):
+    def test_posts_are_announced_once(self):
+        post = self.posts[0]
+        NotificationPreference.objects.bulk_create([
+            NotificationPreference(
+                user=follower, action_type='new_post',
+                channel=NotificationPreference.IN_APP, enabled=False,
+            )
+            for follower in self.others
+        ])
+        with mock.patch('apps.notifications.utils.send_bulk_push_notification', return_value=[]) as push:
+            self.assertEqual(fan_out_new_post(post.pk), 0)
+            # Republished: nothing was written in-app, but the post is marked.
+            self.assertEqual(fan_out_new_post(post.pk), 0)
+        push.assert_called_once()
+        self.assertCountEqual(push.call_args.args[0], [other.pk for other in self.others])
+        post.refresh_from_db()
+        self.assertIsNotNone(post.announced_at)
+        self.assertFalse(Notification.objects.filter(action_type='new_post').exists())
+
+
+@skipUnless(partitioning.is_supported(), "Notification partitioning requires PostgreSQL")
+class NotificationPartitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='partitioned@example.com', password='x')
+        partitioning.convert_to_partitioned(months_ahead=1)
+
+    def notify(self, created_at):
+        notification = Notification.objects.create(
+            user=self.user, actor=self.user, action_type='follow'
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        return notification
+
+    def count_in(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_rows_in_the_default_partition_move_to_new_partitions(self):
+        month = partitioning.month_start(date.today(), 6)
+        notification = self.notify(timezone.make_aware(datetime(month.year, month.month, 15)))
+        self.assertEqual(self.count_in(partitioning.DEFAULT_PARTITION), 1)
+
+        partitioning.ensure_partitions(months_ahead=6)
+
+        self.assertEqual(self.count_in(partitioning.DEFAULT_PARTITION), 0)
+        self.assertEqual(self.count_in(partitioning.partition_name(month)), 1)
+        self.assertTrue(Notification.objects.filter(pk=notification.pk).exists())
+        self.notify(timezone.now() + timedelta(days=3650))
+        self.assertEqual(self.count_in(partitioning.DEFAULT_PARTITION), 1)
+
+    def test_expired_rows_are_deleted_from_the_default_partition(self):
+        expired = self.notify(timezone.now() - timedelta(days=3650))
+        kept = self.notify(timezone.now() + timedelta(days=3650))
+        partitioning.drop_partitions_before(partitioning.month_start(date.today(), -1))
+        self.assertFalse(Notification.objects.filter(pk=expired.pk).exists())
+        self.assertTrue(Notification.objects.filter(pk=kept.pk).exists())
+
+
+class ProjectionTests(SeededAPITestCase):
+    def get(self, client, path):
+        get_throttle_store().clear()
+        return client.get(path)
+
+    def test_projected_serializers(self):
+        for serializer_class in (PostSerializer, CommentSerializer, UserSerializer, CategorySerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertIsNotNone(get_projection(serializer_class))
+
+    def test_responses_match_the_serializers(self):
+        for client in (self.client, APIClient()):
+            for path in PROJECTED_PATHS:
+                with self.subTest(path=path, authenticated=client is self.client):
+                    projected = self.get(client, path)
+                    with mock.patch('apps.core.projection.get_projection', return_value=None):
+                        expected = self.get(client, path)
+                    if client is self.client:
+                        self.assertEqual(projected.status_code, 200)
+                    self.assertEqual(projected.content, expected.content)
+
+
+class RendererTests(SeededAPITestCase):
+    def get(self, path, **extra):
+        get_throttle_store().clear()
+        return self.client.get(path, **extra)
+
+    def test_json_matches_drf(self):
+        for path in PROJECTED_PATHS + ['/api/auth/me/']:
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.content, renderers.JSONRenderer().render(response.data))
+                self.assertIn('Accept', response['Vary'])
+
+        renderer, drf = JSONRenderer(), renderers.JSONRenderer()
+        for value in (Decimal('1.10'), Decimal('1E+2'), Decimal('-0.5'), 2.5):
+            with self.subTest(value=value):
+                data = {'value': value, 'missing': None}
+                self.assertEqual(renderer.render(data), drf.render(data))
+        for value in (float('nan'), float('inf'), float('-inf'), Decimal('NaN'), Decimal('Infinity')):
+            with self.subTest(value=value):
+                data = {'value': [value], 'missing': None}
+                self.assertRaises(ValueError, drf.render, data)
+                self.assertRaises(ValueError, renderer.render, data)
+
+    def test_msgpack_content_negotiation(self):
+        for path in ('/api/feeds/recent/', '/api/users/'):
+            with self.subTest(path=path):
+                packed = self.get(path, HTTP_ACCEPT='application/msgpack')
+                self.assertEqual(packed['Content-Type'], 'application/msgpack')
+                self.assertIn('Accept', packed['Vary'])
+                self.assertEqual(msgpack.unpackb(packed.content), self.get(path).json())
+
+    def test_msgpack_request_body(self):
+        path = f'/api/users/{self.user.id}/update/'
+        response = self.client.patch(path, msgpack.packb({'bio': 'Packed'}), content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, 'Packed')
+
+        response = self.client.patch(path, b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressionTests(SeededAPITestCase):
+    def get(self, path, **extra):
+        get_throttle_store().clear()
+        return self.client.get(path, **extra)
+
+    def test_negotiate(self):
+        cases = {
+            'gzip, deflate, br': 'br',
+            'gzip': 'gzip',
+            'br;q=0.5, gzip': 'gzip',
+            'br;q=0, *': 'gzip',
+            '*': 'br',
+            'identity': None,
+            'gzip;q=0': None,
+            '': None,
+        }
+        for accept_encoding, encoding in cases.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(negotiate(accept_encoding), encoding)
+
+    def test_compressed_responses(self):
+        registry.reset()
+        expected = self.get('/api/feeds/recent/').content
+        self.assertGreater(len(expected), settings.COMPRESSION_MIN_SIZE)
+        for encoding, decompress in (('br', brotli.decompress), ('gzip', gzip.decompress)):
+            with self.subTest(encoding=encoding):
+                response = self.get('/api/feeds/recent/', HTTP_ACCEPT_ENCODING=encoding)
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(int(response['Content-Length']), len(response.content))
+                self.assertEqual(decompress(response.content), expected)
+        stats = {stats['encoding']: stats for stats in registry.snapshot()['compression']}
+        self.assertEqual(set(stats), {'br', 'gzip'})
+        self.assertEqual(stats['br']['input_bytes'], len(expected))
+        self.assertLess(stats['br']['output_bytes'], len(expected))
+
+    def test_small_bodies_are_not_compressed(self):
+        response = self.get('/api/auth/me/', HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertLess(len(response.content), settings.COMPRESSION_MIN_SIZE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_export(self):
+        response = self.get('/api/auth/me/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(json.loads(lines[-1]), {'section': 'end'})
+
+
+class ExportTests(SeededAPITestCase):
+    async def test_asgi_export_is_produced_as_it_is_sent(self):
+        produced = []
+        iter_chunks = export.iter_chunks
+
+        def counting_iter_chunks(*args):
+            for section, records in iter_chunks(*args):
+                produced.append(section)
+                yield section, records
+
+        await sync_to_async(get_throttle_store().clear)()
+        client = AsyncClient()
+        client.cookies['access_token'] = str(RefreshToken.for_user(self.user).access_token)
+        with mock.patch('apps.core.export.iter_chunks', counting_iter_chunks):
+            response = await client.get('/api/auth/me/export/')
+            self.assertTrue(response.is_async)
+            self.assertEqual(produced, [])
+
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(json.loads(await anext(chunks))['section'], 'profile')
+            self.assertEqual(produced, ['profile'])
+            lines = b''.join([chunk async for chunk in chunks]).splitlines()
+        self.assertEqual(json.loads(lines[-1]), {'section': 'end'})
+
+
+class FieldsetTests(SeededAPITestCase):
+    def get(self, path):
+        get_throttle_store().clear()
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_lists_render_cards(self):
+        post = self.get('/api/feeds/recent/').json()['results'][0]
+        self.assertNotIn('content', post)
+        self.assertEqual(post['excerpt'], 'Some words. ' * 19 + 'Some words.')
+        self.assertEqual(set(post['author']), {'id', 'first_name', 'last_name', 'profile_pic_url', 'is_following'})
+        self.assertEqual(set(post['tag_objects'][0]), {'id', 'name', 'slug'})
+
+        post = self.get(f'/api/posts/{self.post.slug}/').json()
+        self.assertIn('content', post)
+        self.assertIn('email', post['author'])
+
+    def test_fields_and_expand(self):
+        post = self.get('/api/feeds/recent/?fields=id,author.first_name,missing').json()['results'][0]
+        self.assertEqual(set(post), {'id', 'author'})
+        self.assertEqual(set(post['author']), {'first_name'})
+
+        post = self.get('/api/feeds/recent/?expand=content,author,tag_objects.created_at').json()['results'][0]
+        self.assertIn('content', post)
+        self.assertIn('about', post['author'])
+        self.assertIn('created_at', post['tag_objects'][0])
+
+        post = self.get(f'/api/posts/{self.post.slug}/?fields=id,title').json()
+        self.assertEqual(set(post), {'id', 'title'})
+
+    def test_unrequested_fields_are_not_selected_or_computed(self):
+        with self.assertNumQueries(2):
+            response = self.get('/api/feeds/recent/?fields=id,title')
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title'})
+        with CaptureQueriesContext(connection) as queries:
+            self.get('/api/feeds/recent/')
+        self.assertFalse(any('"content"' in query['sql'] for query in queries.captured_queries))
+
+    def test_fieldset_serializers_are_shared(self):
+        self.assertIs(narrow(PostSerializer, expand='*'), PostSerializer)
+        self.assertIs(narrow(PostSerializer, 'title,id'), narrow(PostSerializer, 'id,title,nope'))
+        self.assertIs(narrow(PostSerializer, card=True), narrow(PostSerializer, card=True))
+
+
+class QueryPlanTests(SeededAPITestCase):
+    def assertPlan(self, serializer_class, select_related, prefetch_related):
+        plan = get_query_plan(serializer_class)
+        self.assertEqual(plan.select_related, select_related)
+        self.assertEqual(plan.prefetch_related, prefetch_related)
+
+    def test_plans(self):
+        self.assertPlan(PostSerializer, ('author', 'category'), ('tags',))
+        self.assertPlan(CommentSerializer, ('post', 'user'), ())
+        self.assertPlan(BookmarkSerializer, ('post__author', 'post__category', 'user'), ('post__tags',))
+        self.assertPlan(UserSerializer, (), ())
+        self.assertPlan(narrow(BookmarkSerializer, 'id,post.title'), ('post',), ())
+        self.assertPlan(narrow(PostSerializer, 'id,title'), (), ())
+        self.assertIs(get_query_plan(PostSerializer), get_query_plan(PostSerializer))
+
+    def test_views_only_join_what_they_render(self):
+        path = f'/api/users/{self.user.id}/bookmarks/'
+        get_throttle_store().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{path}?fields=id,created_at')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('JOIN' in query['sql'] for query in queries.captured_queries))
+
+        get_throttle_store().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('JOIN "blogs_post"' in query['sql'] for query in queries.captured_queries))
+
+
+class AsyncViewTests(SeededAPITestCase):
+    def get(self, path):
+        get_throttle_store().clear()
+        return self.client.get(path)
+
+    def test_hot_reads_are_async(self):
+        paths = [
+            '/api/feeds/recent/', '/api/feeds/trending/', '/api/feeds/personalized/', '/api/feeds/combined/',
+            '/api/search/posts/', '/api/search/users/', '/api/notifications/',
+            f'/api/posts/{self.post.slug}/', f'/api/comments/{self.comment.id}/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertTrue(iscoroutinefunction(resolve(path).func))
+                self.assertEqual(self.get(path).status_code, 200)
+
+    def test_detail_views_count_views(self):
+        views_count = self.post.views_count
+        self.assertEqual(self.get(f'/api/posts/{self.post.slug}/').json()['views_count'], views_count + 1)
+        views_count = self.comment.views_count
+        self.assertEqual(self.get(f'/api/comments/{self.comment.id}/').json()['views_count'], views_count + 1)
+
+    def test_browsable_api(self):
+        for path in ('/api/feeds/trending/', '/api/feeds/personalized/', '/api/feeds/combined/', '/api/search/posts/'):
+            with self.subTest(path=path):
+                get_throttle_store().clear()
+                response = self.client.get(path, HTTP_ACCEPT='text/html')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+    def test_errors(self):
+        self.assertEqual(self.get('/api/posts/missing/').status_code, 404)
+        self.assertEqual(self.get('/api/feeds/recent/?page=99').status_code, 404)
+        self.assertEqual(self.get('/api/search/posts/?category=0').status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.get('/api/feeds/personalized/').status_code, 401)
+
+
+class MetricsTests(TestCase):
+    def test_token_is_required_unless_public(self):
+        with self.settings(METRICS_TOKEN='', METRICS_PUBLIC=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(METRICS_TOKEN='secret', METRICS_PUBLIC=False):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with self.settings(METRICS_TOKEN='', METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_files_of_exited_and_idle_workers(self):
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        limiter = {
+            'name': 'stale-test', 'limit': 4, 'queue': 8, 'active': 2, 'queue_depth': 3,
+            'max_queue_depth': 3, 'admitted': 10, 'queued': 5, 'shed': 1, 'timed_out': 1,
+        }
+        snapshot = {'routes': [], 'compression': [], 'concurrency': [limiter]}
+
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            for pid in (exited.pid, os.getppid()):
+                with open(os.path.join(directory, f'metrics-{pid}.json'), 'w') as f:
+                    json.dump(snapshot, f)
+            idle = os.path.join(directory, f'metrics-{os.getppid()}.json')
+            long_ago = time.time() - 10 * settings.METRICS_FLUSH_INTERVAL
+            os.utime(idle, (long_ago, long_ago))
+
+            merged = {limiter['name']: limiter for limiter in collect()['concurrency']}['stale-test']
+            self.assertFalse(os.path.exists(os.path.join(directory, f'metrics-{exited.pid}.json')))
+        self.assertEqual((merged['admitted'], merged['active'], merged['queue_depth']), (10, 0, 0))
+
+
+class LoadTestTests(TestCase):
+    def test_nearest_rank_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, f) for f in (0.5, 0.95, 0.99, 1.0)], [50, 95, 99, 100])
+        self.assertEqual([percentile([7], f) for f in (0.0, 0.5, 1.0)], [7, 7, 7])
+        self.assertEqual(percentile(list(range(1, 11)), 0.95), 10)
+
+
+class FollowGraphTests(TestCase):
+    # 1 -> 2, 1 -> 3, 2 -> 1, 2 -> 4, 3 -> 4, 3 -> 5, 4 -> 1
+    SOURCES = np.array([1, 1, 2, 2, 3, 3, 4])
+    TARGETS = np.array([2, 3, 1, 4, 4, 5, 1])
+
+    def graph(self):
+        graph = FollowGraph()
+        graph._load(self.SOURCES, self.TARGETS)
+        graph._built_at = graph._synced_at = time.monotonic()
+        return graph
+
+    def test_build_csr(self):
+        indptr, indices = build_csr(np.array([0, 0, 2]), np.array([2, 1, 0]), 3)
+        self.assertEqual(indptr.tolist(), [0, 2, 2, 3])
+        self.assertEqual(indices.tolist(), [1, 2, 0])
+
+    def test_adjacency_deltas(self):
+        forward = self.graph().forward
+        forward.add(1, 5)
+        forward.remove(1, 2)
+        forward.add(4, 2)
+        forward.remove(4, 2)
+        self.assertEqual(forward.neighbors(1).tolist(), [3, 5])
+        self.assertTrue(forward.has_edge(1, 5))
+        self.assertFalse(forward.has_edge(1, 2))
+        self.assertEqual(forward.delta_count(), 2)
+        self.assertEqual(sorted(forward.gather(np.array([1, 4])).tolist()), [1, 3, 5])
+        sources, targets = forward.edges()
+        self.assertEqual(
+            sorted(zip(sources.tolist(), targets.tolist())),
+            [(1, 3), (1, 5), (2, 1), (2, 4), (3, 4), (3, 5), (4, 1)],
+        )
+
+    def test_queries(self):
+        graph = self.graph()
+        self.assertEqual(graph.suggestions(1), [(4, 2), (5, 1)])
+        self.assertEqual(graph.suggestions(5), [])
+        self.assertEqual(graph.mutuals(1, 4).tolist(), [2, 3])
+        self.assertEqual(graph.degree(3), {'followers': 1, 'following': 2})
+        self.assertEqual(graph.degree(99), {'followers': 0, 'following': 0})
+        graph.add_follow(1, 4)
+        self.assertEqual(graph.suggestions(1), [(5, 1)])
+
+    def test_rebuild_keeps_changes_made_while_reading(self):
+        a, b, c = (User.objects.create_user(email=f'graph{i}@example.com', password='x') for i in range(3))
+        Follow.objects.create(follower=a, following=b)
+        Follow.objects.create(follower=a, following=c)
+        graph = FollowGraph()
+        self.assertEqual(graph.degree(a.id), {'followers': 0, 'following': 2})
+
+        build = FollowGraph._build
+
+        def build_while_unfollowing(sources, targets):
+            graph.remove_follow(a.id, b.id)
+            return build(sources, targets)
+
+        graph._built_at = 0.0
+        with mock.patch.object(FollowGraph, '_build', side_effect=build_while_unfollowing):
+            graph.degree(a.id)
+        self.assertEqual(graph.forward.neighbors(a.id).tolist(), [c.id])
+
+
+class SyncPoolTests(TestCase):
+    def test_oldest_request_first(self):
+        pool = SyncPool(1)
+        first, second, third = pool.executor(), pool.executor(), pool.executor()
+        started, release = threading.Event(), threading.Event()
+        first.submit(lambda: (started.set(), release.wait()))
+        started.wait()
+
+        ran = []
+        futures = [
+            executor.submit(ran.append, name)
+            for name, executor in (('third', third), ('second', second), ('first', first))
+        ]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(ran, ['first', 'second', 'third'])
+
+    def test_connections_are_checked_per_request(self):
+        pool = SyncPool(1)
+        first, second = pool.executor(), pool.executor()
+        with mock.patch('apps.core.asgi.close_old_connections') as close_old_connections:
+            for executor in (first, first, second, second, first):
+                executor.submit(lambda: None).result(timeout=5)
+        self.assertEqual(close_old_connections.call_count, 3)
+
+    def test_queued_requests_do_not_hold_threads(self):
+        # Admitted requests still get a thread while more wait for the limiter.
+        pool = SyncPool(1)
+        limiter = ConcurrencyLimiter('test', limit=1, queue=8, queue_timeout=5)
+
+        async def request():
+            self.assertTrue(await limiter.aacquire())
+            try:
+                await asyncio.get_running_loop().run_in_executor(pool.executor(), time.sleep, 0.01)
+            finally:
+                limiter.release()
+
+        async def requests():
+            await asyncio.wait_for(asyncio.gather(*(request() for _ in range(6))), 2)
+
+        asyncio.run(requests())
+        self.assertEqual((limiter.admitted, limiter.queued, limiter.shed, limiter.active), (6, 5, 0, 0))
+
+    def test_queue_timeout(self):
+        limiter = ConcurrencyLimiter('test', limit=1, queue=1, queue_timeout=0.05)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(asyncio.run(limiter.aacquire()))
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        self.assertEqual((limiter.timed_out, limiter.waiting, limiter.active), (2, 0, 0))
@@ -1,4 +1,4 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from .throttling import UserRateThrottle, AnonRateThrottle
 
 
 class AuthRateThrottle(UserRateThrottle):
@@ -22,3 +22,6 @@ class ReadOnlyRateThrottle(UserRateThrottle):
 class ReadOnlyAnonRateThrottle(AnonRateThrottle):
     rate = '30/min'
 
+
+class ExportRateThrottle(UserRateThrottle):
+    rate = '10/hour'
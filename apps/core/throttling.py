@@ -0,0 +1,274 @@
+"""
+Rate limiting backed by a store shared by every worker.
+
+DRF's throttles keep a list of request timestamps per client in the default
+cache, which is per-process here, so each worker enforced its own copy of
+every limit. These throttles use GCRA (the generic cell rate algorithm, a
+token bucket expressed as a single "theoretical arrival time" per key), so
+each key holds one number and a check is one read and one write in a store
+all workers share.
+
+The store is picked by ``THROTTLE_STORE_URL``:
+
+- ``sqlite:///path/to/file`` keeps buckets in a SQLite file, which is enough
+  for workers on a single host.
+- ``redis://host:port/db`` keeps them in Redis (or anything speaking its
+  protocol) for workers on several hosts. Needs the ``redis`` package.
+
+All bucket throttles that apply to a request are evaluated together in one
+atomic store operation by whichever of them DRF calls first: the request is
+allowed only if every limit allows it, and then all of them are charged. The
+time spent is recorded on the request (``throttle_duration``, in seconds,
+and ``throttle_limits``) and reported in its ``Server-Timing`` header.
+
+If the store can't be reached, requests are let through and the error is
+logged; a throttle outage should not take the API down with it.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteBucketStore:
+    # Expired buckets are purged every this many checks.
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._checks = 0
+
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS throttle_buckets "
+                "(key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def acquire(self, key, interval, period, now):
+        """
+        Take one request from ``key``'s bucket, which refills one request
+        every ``interval`` seconds and holds ``period / interval`` requests.
+        Returns ``(allowed, retry_after)``.
+        """
+        return self.acquire_many([(key, interval, period)], now)
+
+    def acquire_many(self, limits, now):
+        """
+        Take one request from every ``(key, interval, period)`` bucket, or
+        from none of them if any is empty. Keys must be distinct. Returns
+        ``(allowed, retry_after)`` with the longest wait among empty buckets.
+        """
+        keys = [key for key, _, _ in limits]
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            stored = dict(connection.execute(
+                f"SELECT key, tat FROM throttle_buckets WHERE key IN ({', '.join('?' * len(keys))})",
+                keys,
+            ).fetchall())
+            allowed, retry_after, updates = True, 0.0, []
+            for key, interval, period in limits:
+                key_allowed, wait, tat = gcra(stored.get(key), interval, period, now)
+                if not key_allowed:
+                    allowed = False
+                    retry_after = max(retry_after, wait)
+                updates.append((key, tat))
+            if allowed:
+                connection.executemany(
+                    "INSERT INTO throttle_buckets (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    updates,
+                )
+            self._checks += 1
+            if self._checks % self.PURGE_EVERY == 0:
+                connection.execute("DELETE FROM throttle_buckets WHERE tat < ?", (now,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def clear(self):
+        self._connection().execute("DELETE FROM throttle_buckets")
+
+
+class RedisBucketStore:
+    # Runs gcra() for every key inside Redis so all reads and writes happen
+    # in one atomic round trip. ARGV is ``now`` followed by an interval and
+    # period per key. Floats go back as strings; Redis would truncate them.
+    SCRIPT = """
+local now = tonumber(ARGV[1])
+local new_tats = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i])
+    local period = tonumber(ARGV[2 * i + 1])
+    local tat = tonumber(redis.call('GET', key))
+    if not tat or tat < now then
+        tat = now
+    end
+    new_tats[i] = tat + interval
+    local allow_at = new_tats[i] - period
+    if now < allow_at then
+        wait = math.max(wait, allow_at - now)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000))
+end
+return {1, '0'}
+"""
+
+    def __init__(self, url, prefix='throttle:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                "THROTTLE_STORE_URL points at Redis but the redis package is not installed"
+            ) from e
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def acquire(self, key, interval, period, now):
+        return self.acquire_many([(key, interval, period)], now)
+
+    def acquire_many(self, limits, now):
+        keys, args = [], [now]
+        for key, interval, period in limits:
+            keys.append(self.prefix + key)
+            args.extend((interval, period))
+        allowed, retry_after = self._script(keys=keys, args=args)
+        return bool(allowed), float(retry_after)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+def gcra(tat, interval, period, now):
+    """
+    One GCRA step. ``tat`` is the stored theoretical arrival time (None for a
+    new key). Returns ``(allowed, retry_after, new_tat)``.
+    """
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return False, allow_at - now, tat
+    return True, 0.0, new_tat
+
+
+def create_store(url):
+    if url.startswith('sqlite:///'):
+        return SQLiteBucketStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBucketStore(url)
+    raise ImproperlyConfigured(f"Unsupported THROTTLE_STORE_URL: {url}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_throttle_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(settings.THROTTLE_STORE_URL)
+    return _store
+
+
+def evaluate_throttles(request, view, throttles):
+    """
+    Check every bucket throttle in ``throttles`` for ``request`` in one store
+    operation. Returns ``(allowed, retry_after)``.
+    """
+    start = time.perf_counter()
+    limits = {}
+    for throttle in throttles:
+        if not isinstance(throttle, BucketRateThrottle) or throttle.rate is None:
+            continue
+        key = throttle.get_bucket_key(request, view)
+        if key is not None:
+            limits[key] = (key, throttle.duration / throttle.num_requests, throttle.duration)
+
+    allowed, retry_after = True, None
+    if limits:
+        try:
+            allowed, retry_after = get_throttle_store().acquire_many(
+                list(limits.values()), time.time()
+            )
+        except Exception:
+            logger.exception("Throttle store unavailable; allowing request")
+            allowed, retry_after = True, None
+
+    http_request = getattr(request, '_request', request)
+    http_request.throttle_duration = time.perf_counter() - start
+    http_request.throttle_limits = len(limits)
+    return allowed, (retry_after if not allowed else None)
+
+
+class BucketRateThrottle(throttling.SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` evaluated with GCRA against the shared store.
+    Subclasses set ``rate`` or ``scope`` and ``get_cache_key`` as with DRF.
+
+    The first bucket throttle DRF calls for a request evaluates all of the
+    view's bucket throttles at once and reports the combined result; the
+    rest see that the request was already accounted for and allow it.
+    """
+
+    def get_bucket_key(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return None
+        # DRF keys only by scope, so every UserRateThrottle subclass shared a
+        # key; each throttle class gets its own bucket here.
+        return f'{type(self).__name__}:{key}'
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if getattr(request, '_throttles_evaluated', False):
+            return True
+        request._throttles_evaluated = True
+
+        get_throttles = getattr(view, 'get_throttles', None)
+        throttles = get_throttles() if get_throttles else [self]
+        allowed, self.retry_after = evaluate_throttles(request, view, throttles)
+        return allowed
+
+    def wait(self):
+        if self.retry_after is None:
+            return None
+        return math.ceil(self.retry_after)
+
+
+class AnonRateThrottle(BucketRateThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(BucketRateThrottle, throttling.UserRateThrottle):
+    pass
@@ -17,11 +17,13 @@ urlpatterns = [
     path('auth/refresh/', views.CookieTokenRefreshView.as_view(), name='token-refresh'),
     path('auth/logout/', views.LogoutView.as_view(), name='logout'),
     path('auth/me/', views.MeView.as_view(), name='me'),
+    path('auth/me/export/', views.ExportDataView.as_view(), name='export-data'),
 
     path('users/', views.ListUsersView.as_view(), name='list-users'),
     path('users/<int:id>/', views.RetrieveUser.as_view(), name='retrieve-user'),
     path('users/<int:id>/update/', views.UpdateUser.as_view(), name='update-user'),
     path('users/<int:id>/delete/', views.DeleteUser.as_view(), name='delete-user'),
+    path('users/deletion-jobs/<uuid:job_id>/', views.AccountDeletionJobView.as_view(), name='account-deletion-job'),
     path('users/<int:id>/bookmarks/', ListUserBookmarksView.as_view(), name='user-bookmarks'),
     path('users/<int:id>/comments/', ListUserCommentsView.as_view(), name='user-comments'),
     path('users/<int:id>/posts/', ListUserPostsView.as_view(), name='user-posts'),
@@ -29,4 +31,10 @@ urlpatterns = [
     path('users/<int:id>/followers/', views.ListFollowersView.as_view(), name='list-followers'),
     path('users/<int:id>/following/', views.ListFollowingView.as_view(), name='list-following'),
     path("users/<int:id>/is-following/", views.IsFollowingView.as_view(), name='is-following'),
+    path('users/relationships/', views.RelationshipsView.as_view(), name='relationships'),
+    path('users/suggestions/', views.FollowSuggestionsView.as_view(), name='follow-suggestions'),
+    path('users/<int:id>/mutuals/', views.MutualFollowersView.as_view(), name='mutual-followers'),
+    path('users/<int:id>/degree/', views.FollowDegreeView.as_view(), name='follow-degree'),
+
+    path('metrics/concurrency/', views.ConcurrencyMetricsView.as_view(), name='concurrency-metrics'),
 ]
\ No newline at end of file
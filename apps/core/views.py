@@ -1,32 +1,47 @@
 from django.conf import settings
 from django.db.models import F
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-from .models import User, Follow
+from .models import AccountDeletionJob, User, Follow
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework import generics
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.core.mail import send_mail
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .authentication import invalidate_cached_user
+from .concurrency import get_concurrency_metrics
+from .deletion import start_account_deletion
+from .export import astream, ndjson_stream, parse_cursor, zip_stream
+from .follow_graph import follow_graph
+from .fieldsets import SparseFieldsMixin
+from .projection import ProjectedListMixin
+from .query_plan import QueryPlanMixin
+from .relationships import get_relationships
+from .google_auth import get_google_verifier
 from .permissions import IsProfileOwner
-from .throttles import AuthRateThrottle, AuthAnonRateThrottle, UserActionRateThrottle, ReadOnlyRateThrottle
+from .throttles import AuthRateThrottle, AuthAnonRateThrottle, UserActionRateThrottle, ReadOnlyRateThrottle, ReadOnlyAnonRateThrottle, ExportRateThrottle
 from apps.notifications.utils import create_notification
 from apps.notifications.models import Notification
 
 
+from rest_framework_simplejwt.exceptions import TokenError
+from .revocation import revocation_store
 from .serializers import (
     UserSerializer,
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer,
-    FollowSerializer
+    FollowSerializer,
+    UserSummarySerializer,
+    AccountDeletionJobSerializer,
+    CookieTokenRefreshSerializer
 )
 
 # Create your views here.
@@ -83,7 +98,7 @@ class RegisterUser(generics.CreateAPIView):
         except Exception:
             pass 
 
-class ListUsersView(generics.ListAPIView):
+class ListUsersView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     throttle_classes = [ReadOnlyRateThrottle]
@@ -98,7 +113,7 @@ class UpdateUser(generics.UpdateAPIView):
     lookup_field = 'pk'
     lookup_url_kwarg='id'
 
-class RetrieveUser(generics.RetrieveAPIView):
+class RetrieveUser(SparseFieldsMixin, QueryPlanMixin, generics.RetrieveAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
@@ -109,6 +124,10 @@ class RetrieveUser(generics.RetrieveAPIView):
 
 
 class DeleteUser(generics.DestroyAPIView):
+    """
+    Deactivates the account immediately and deletes it and everything it
+    owns in the background. Responds with the job to poll for progress.
+    """
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated,IsProfileOwner]
@@ -116,6 +135,39 @@ class DeleteUser(generics.DestroyAPIView):
     lookup_field = 'pk'
     lookup_url_kwarg='id'
 
+    def destroy(self, request, *args, **kwargs):
+        job = start_account_deletion(self.get_object())
+
+        response = Response(
+            AccountDeletionJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+        response.delete_cookie(
+            key="refresh_token",
+            samesite="None",
+            path='/'
+        )
+        response.delete_cookie(
+            key="access_token",
+            samesite="None",
+            path='/'
+        )
+        return response
+
+
+class AccountDeletionJobView(generics.RetrieveAPIView):
+    """
+    Progress of an account deletion. The account can no longer log in by
+    then, so the unguessable job id is what grants access.
+    """
+    queryset = AccountDeletionJob.objects.all()
+    serializer_class = AccountDeletionJobSerializer
+    permission_classes = [AllowAny]
+    throttle_classes = [ReadOnlyAnonRateThrottle]
+
+    lookup_field = 'pk'
+    lookup_url_kwarg = 'job_id'
+
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -124,6 +176,36 @@ class MeView(APIView):
         return Response(serializer.data)
 
 
+class ExportDataView(APIView):
+    """
+    Streams everything the current user owns as NDJSON, or as a zip with
+    ``?archive=zip``. Resume an interrupted NDJSON download with
+    ``?after=<cursor of the last line received>``.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ExportRateThrottle]
+
+    def get(self, request):
+        after = request.query_params.get('after')
+        try:
+            cursor = parse_cursor(after) if after else None
+        except ValueError:
+            return Response(
+                {"error": "after must be a cursor from a previous export"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.query_params.get('archive') == 'zip':
+            stream, content_type, extension = zip_stream(request.user, cursor), 'application/zip', 'zip'
+        else:
+            stream, content_type, extension = ndjson_stream(request.user, cursor), 'application/x-ndjson', 'ndjson'
+        if isinstance(request._request, ASGIRequest):
+            stream = astream(stream)
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="swirl-export-{request.user.pk}.{extension}"'
+        return response
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def google_login(request):
@@ -132,11 +214,7 @@ def google_login(request):
     if not token:
         return Response({"error": "Token not provided","status":False}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        id_info = id_token.verify_oauth2_token(
-        token, 
-        google_requests.Request(), 
-        settings.GOOGLE_OAUTH_CLIENT_ID
-    )   
+        id_info = get_google_verifier().verify(token)
         email = id_info['email']
         first_name = id_info.get('given_name', '')
         last_name = id_info.get('family_name', '')
@@ -243,6 +321,13 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        refresh_token = request.COOKIES.get("refresh_token")
+        if refresh_token:
+            try:
+                revocation_store.revoke_token(RefreshToken(refresh_token))
+            except TokenError:
+                pass
+
         response = Response({
             "status": True,
             "message": "Logged out successfully"
@@ -335,6 +420,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         return response
 
 class CookieTokenRefreshView(TokenRefreshView):
+    serializer_class = CookieTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         refresh_token = request.COOKIES.get("refresh_token")
 
@@ -402,6 +489,9 @@ class FollowUserView(APIView):
         User.objects.filter(
                 pk=request.user.id,
                 ).update(following_count=F("following_count") + 1)
+        # Counter updates bypass save(), so refresh the cached rows by hand.
+        invalidate_cached_user(user_id)
+        invalidate_cached_user(request.user.id)
 
         create_notification(
             user=user_to_follow,
@@ -431,6 +521,8 @@ class FollowUserView(APIView):
             pk=request.user.id,
             following_count__gt=0
             ).update(following_count=F("following_count") - 1)
+            invalidate_cached_user(user_id)
+            invalidate_cached_user(request.user.id)
 
             return Response(
                 {"message": "Successfully unfollowed user"},
@@ -443,7 +535,7 @@ class FollowUserView(APIView):
             )
 
 
-class ListFollowersView(generics.ListAPIView):
+class ListFollowersView(SparseFieldsMixin, QueryPlanMixin, generics.ListAPIView):
     serializer_class = FollowSerializer
     permission_classes = [IsAuthenticated]
     throttle_classes = [ReadOnlyRateThrottle]
@@ -451,10 +543,10 @@ class ListFollowersView(generics.ListAPIView):
     def get_queryset(self):
         user_id = self.kwargs['id']
         user = get_object_or_404(User, pk=user_id)
-        return Follow.objects.filter(following=user).select_related('follower', 'following')
+        return Follow.objects.filter(following=user)
 
 
-class ListFollowingView(generics.ListAPIView):
+class ListFollowingView(SparseFieldsMixin, QueryPlanMixin, generics.ListAPIView):
     serializer_class = FollowSerializer
     permission_classes = [IsAuthenticated]
     throttle_classes = [ReadOnlyRateThrottle]
@@ -462,7 +554,7 @@ class ListFollowingView(generics.ListAPIView):
     def get_queryset(self):
         user_id = self.kwargs['id']
         user = get_object_or_404(User, pk=user_id)
-        return Follow.objects.filter(follower=user).select_related('follower', 'following')
+        return Follow.objects.filter(follower=user)
 
 class IsFollowingView(APIView):
     permission_classes = [IsAuthenticated]
@@ -484,3 +576,110 @@ class IsFollowingView(APIView):
         )
 
 
+class RelationshipsView(APIView):
+    """
+    Follow state between the current user and up to
+    ``RELATIONSHIP_LOOKUP_MAX_IDS`` users, e.g. ``?ids=1,2,3``.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ReadOnlyRateThrottle]
+
+    def get(self, request):
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            ids = {int(value) for value in raw_ids.split(',') if value.strip()}
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma-separated list of user ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not ids:
+            return Response(
+                {"error": "ids is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > settings.RELATIONSHIP_LOOKUP_MAX_IDS:
+            return Response(
+                {"error": f"At most {settings.RELATIONSHIP_LOOKUP_MAX_IDS} ids can be looked up at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        relationships = get_relationships(request.user.id, ids)
+        return Response(
+            {
+                "results": {str(user_id): state for user_id, state in relationships.items()}
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class FollowSuggestionsView(APIView):
+    """
+    "Who to follow": users followed by the people the current user follows,
+    ranked by how many of them do. ``?limit=`` caps the list (default 20).
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ReadOnlyRateThrottle]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+
+        suggestions = follow_graph.suggestions(request.user.id, limit=max(limit, 1))
+        users = User.objects.filter(
+            id__in=[user_id for user_id, _ in suggestions],
+            is_active=True
+        ).in_bulk()
+
+        results = []
+        context = {'request': request, 'following_ids': set()}
+        for user_id, mutual_count in suggestions:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            data = UserSummarySerializer(user, context=context).data
+            data['mutual_count'] = mutual_count
+            results.append(data)
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class MutualFollowersView(APIView):
+    """Users the current user follows who also follow user ``id``."""
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ReadOnlyRateThrottle]
+    max_results = 20
+
+    def get(self, request, **kwargs):
+        target_user = get_object_or_404(User, pk=self.kwargs['id'])
+        mutual_ids = follow_graph.mutuals(request.user.id, target_user.id).tolist()
+
+        users = User.objects.filter(id__in=mutual_ids[:self.max_results], is_active=True)
+        context = {'request': request, 'following_ids': set(mutual_ids)}
+        return Response(
+            {
+                "count": len(mutual_ids),
+                "results": UserSummarySerializer(users, many=True, context=context).data
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class FollowDegreeView(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ReadOnlyRateThrottle]
+
+    def get(self, request, **kwargs):
+        target_user = get_object_or_404(User, pk=self.kwargs['id'])
+        return Response(follow_graph.degree(target_user.id), status=status.HTTP_200_OK)
+
+
+class ConcurrencyMetricsView(APIView):
+    """Concurrency limiter state (queue depth, shed counts) for this worker."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"limiters": get_concurrency_metrics()}, status=status.HTTP_200_OK)
@@ -1,48 +1,57 @@
-from rest_framework import generics, permissions
+from rest_framework import permissions
 from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 
 from apps.blogs.models import Post
 from apps.blogs.serializers import PostSerializer
+from apps.core.async_views import AsyncListAPIView
+from apps.core.concurrency import ConcurrencyLimitMixin
+from apps.core.fieldsets import SparseFieldsMixin
 from apps.core.models import Follow
+from apps.core.projection import ProjectedListMixin
+from apps.core.query_plan import QueryPlanMixin
 from .throttles import FeedRateThrottle, FeedAnonRateThrottle
 
 
-class PersonalizedFeedView(generics.ListAPIView):
+class PersonalizedFeedView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [FeedRateThrottle]
 
-    def get_queryset(self):
+    async def aget_queryset(self):
         user = self.request.user
         
-        following_ids = Follow.objects.filter(follower=user).values_list('following_id', flat=True)
+        following_ids = [
+            following_id async for following_id in
+            Follow.objects.filter(follower=user).values_list('following_id', flat=True)
+        ]
         
-        following_ids = list(following_ids) + [user.id]
+        following_ids.append(user.id)
         
         queryset = Post.objects.filter(
             author_id__in=following_ids,
             status='draft',
             is_deleted=False
-        ).select_related('author', 'category').prefetch_related('tags')
+        )
         
-        if not queryset.exists():
-            queryset = Post.objects.is_draft().select_related('author', 'category').prefetch_related('tags')
+        if not await queryset.aexists():
+            queryset = Post.objects.is_draft()
         
         return queryset.order_by('-created_at')
 
 
-class TrendingFeedView(generics.ListAPIView):
+class TrendingFeedView(ConcurrencyLimitMixin, SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    concurrency_class = 'feed'
     
     def get_throttles(self):
         if self.request.user.is_authenticated:
             return [FeedRateThrottle()]
         return [FeedAnonRateThrottle()]
 
-    def get_queryset(self):
+    async def aget_queryset(self):
         period = self.request.query_params.get('period', '24h')
         
         now = timezone.now()
@@ -59,14 +68,14 @@ class TrendingFeedView(generics.ListAPIView):
             status='draft',
             is_deleted=False,
             created_at__gte=threshold
-        ).select_related('author', 'category').prefetch_related('tags')
+        )
     
         queryset = queryset.extra(
             select={'engagement_score': 'reaction_count + comment_count + bookmark_count + views_count'}
         ).order_by('-engagement_score', '-created_at')
         
-        if not queryset.exists():
-            queryset = Post.objects.is_draft().select_related('author', 'category').prefetch_related('tags')
+        if not await queryset.aexists():
+            queryset = Post.objects.is_draft()
             queryset = queryset.extra(
                 select={'engagement_score': 'reaction_count + comment_count + bookmark_count + views_count'}
             ).order_by('-engagement_score', '-created_at')
@@ -74,7 +83,7 @@ class TrendingFeedView(generics.ListAPIView):
         return queryset
 
 
-class RecentFeedView(generics.ListAPIView):
+class RecentFeedView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
@@ -84,21 +93,25 @@ class RecentFeedView(generics.ListAPIView):
         return [FeedAnonRateThrottle()]
 
     def get_queryset(self):
-        queryset = Post.objects.is_draft().select_related('author', 'category').prefetch_related('tags')
+        queryset = Post.objects.is_draft()
         
         return queryset.order_by('-created_at')
 
 
-class CombinedFeedView(generics.ListAPIView):
+class CombinedFeedView(ConcurrencyLimitMixin, SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [FeedRateThrottle]
+    concurrency_class = 'feed'
 
-    def get_queryset(self):
+    async def aget_queryset(self):
         user = self.request.user
         
-        following_ids = Follow.objects.filter(follower=user).values_list('following_id', flat=True)
-        following_ids = list(following_ids) + [user.id]
+        following_ids = [
+            following_id async for following_id in
+            Follow.objects.filter(follower=user).values_list('following_id', flat=True)
+        ]
+        following_ids.append(user.id)
         
         personalized_posts = Post.objects.filter(
             author_id__in=following_ids,
@@ -115,15 +128,15 @@ class CombinedFeedView(generics.ListAPIView):
             select={'engagement_score': 'reaction_count + comment_count + bookmark_count'}
         ).order_by('-engagement_score')[:10]
         
-        personalized_ids = list(personalized_posts.values_list('id', flat=True))
-        trending_ids = list(trending_posts.values_list('id', flat=True))
+        personalized_ids = [post_id async for post_id in personalized_posts.values_list('id', flat=True)]
+        trending_ids = [post_id async for post_id in trending_posts.values_list('id', flat=True)]
 
         if personalized_ids or trending_ids:
             all_posts = Post.objects.is_draft().filter(
                 Q(id__in=personalized_ids) | Q(id__in=trending_ids),
-            ).select_related('author', 'category').prefetch_related('tags')
+            )
         else:
-            all_posts = Post.objects.is_draft().select_related('author', 'category').prefetch_related('tags')
+            all_posts = Post.objects.is_draft()
         
         return all_posts.order_by('-created_at')
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationPreference
 
 
 @admin.register(Notification)
@@ -9,3 +9,9 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'actor__email']
     readonly_fields = ['created_at']
 
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'action_type', 'channel', 'enabled', 'updated_at']
+    list_filter = ['action_type', 'channel', 'enabled']
+    search_fields = ['user__email']
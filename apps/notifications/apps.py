@@ -7,6 +7,8 @@ class NotificationsConfig(AppConfig):
     
     def ready(self):
         """Initialize Firebase when app is ready."""
+        from . import signals  # noqa: F401
+
         try:
             from config.firebase_config import initialize_firebase
             initialize_firebase()
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.notifications import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the notifications table to monthly range partitions (PostgreSQL "
+        "only) and create partitions for the coming months."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.NOTIFICATION_PARTITION_MONTHS_AHEAD,
+            help="Number of future monthly partitions to keep prepared.",
+        )
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            raise CommandError("Notification partitioning requires PostgreSQL.")
+
+        if partitioning.convert_to_partitioned(options['months_ahead']):
+            self.stdout.write(self.style.SUCCESS("Converted notifications table to partitions"))
+        else:
+            partitioning.ensure_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS("Notification partitions are up to date"))
@@ -0,0 +1,69 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.notifications import partitioning
+from apps.notifications.retention import get_retention_cutoffs, prune_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete read notifications and sign up/log in notifications past their "
+        "retention period, in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--read-days',
+            type=int,
+            default=settings.NOTIFICATION_READ_RETENTION_DAYS,
+            help="Delete read notifications older than this many days.",
+        )
+        parser.add_argument(
+            '--auth-days',
+            type=int,
+            default=settings.NOTIFICATION_AUTH_RETENTION_DAYS,
+            help="Delete sign up/log in notifications older than this many days.",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help="Maximum number of rows removed per DELETE statement.",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only count the notifications that would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if partitioning.is_partitioned() and not dry_run:
+            partitioning.ensure_partitions(settings.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+            cutoff = partitioning.month_start(
+                date.today(), -settings.NOTIFICATION_PARTITION_RETENTION_MONTHS
+            )
+            for name in partitioning.drop_partitions_before(cutoff):
+                self.stdout.write(f"Dropped partition {name}")
+
+        read_before, auth_before = get_retention_cutoffs(
+            options['read_days'], options['auth_days']
+        )
+        total = prune_notifications(
+            read_before,
+            auth_before,
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            dry_run=dry_run,
+        )
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} notifications"))
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.notifications.services import send_notification_digests
+
+
+class Command(BaseCommand):
+    help = "Email each user one digest of their unread notifications from the last interval."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help="Digest window in hours (defaults to NOTIFICATION_DIGEST_INTERVAL).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help="Number of digests handed to the mail connection per send_messages call.",
+        )
+
+    def handle(self, *args, **options):
+        interval = (
+            timedelta(hours=options['hours'])
+            if options['hours'] is not None
+            else settings.NOTIFICATION_DIGEST_INTERVAL
+        )
+        since = timezone.now() - interval
+        sent = send_notification_digests(since, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} notification digests"))
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0003_notification_email_sent_notification_push_sent_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='action_type',
+            field=models.CharField(choices=[('follow', 'Follow'), ('comment', 'Comment'), ('reply', 'Reply'), ('reaction', 'Reaction'), ('bookmark', 'Bookmark'), ('new_post', 'New Post'), ('sign_up', 'Sign Up'), ('log_in', 'Log In')], help_text='Type of action that triggered the notification', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['content_type', 'object_id'], name='notificatio_content_702c56_idx'),
+        ),
+    ]
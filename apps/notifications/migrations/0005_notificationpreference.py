@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 17:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_new_post_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_type', models.CharField(choices=[('follow', 'Follow'), ('comment', 'Comment'), ('reply', 'Reply'), ('reaction', 'Reaction'), ('bookmark', 'Bookmark'), ('new_post', 'New Post'), ('sign_up', 'Sign Up'), ('log_in', 'Log In')], max_length=20)),
+                ('channel', models.CharField(choices=[('in_app', 'In-App'), ('push', 'Push'), ('email', 'Email'), ('digest', 'Digest')], max_length=20)),
+                ('enabled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'action_type', 'channel')},
+            },
+        ),
+    ]
@@ -13,9 +13,11 @@ class Notification(models.Model):
         ('reply', 'Reply'),
         ('reaction', 'Reaction'),
         ('bookmark', 'Bookmark'),
+        ('new_post', 'New Post'),
         ('sign_up', 'Sign Up'),
         ('log_in', 'Log In'),
     ]
+    AUTH_ACTION_TYPES = ('sign_up', 'log_in')
     
     user = models.ForeignKey(
         User,
@@ -52,6 +54,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['content_type', 'object_id']),
         ]
 
     def __str__(self):
@@ -93,3 +96,38 @@ class PushNotificationToken(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.device_type}"
+
+
+
+class NotificationPreference(models.Model):
+    """
+    A user's choice for one action type on one delivery channel.
+    Channels without a row are enabled.
+    """
+    IN_APP = 'in_app'
+    PUSH = 'push'
+    EMAIL = 'email'
+    DIGEST = 'digest'
+    CHANNELS = [
+        (IN_APP, 'In-App'),
+        (PUSH, 'Push'),
+        (EMAIL, 'Email'),
+        (DIGEST, 'Digest'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_preferences'
+    )
+    action_type = models.CharField(max_length=20, choices=Notification.ACTION_TYPES)
+    channel = models.CharField(max_length=20, choices=CHANNELS)
+    enabled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'action_type', 'channel')
+
+    def __str__(self):
+        state = 'on' if self.enabled else 'off'
+        return f"{self.user_id} {self.action_type}/{self.channel}: {state}"
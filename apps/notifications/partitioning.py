@@ -0,0 +1,242 @@
+"""
+Optional monthly range partitioning of the notifications table on PostgreSQL.
+
+Once converted, ``notifications_notification`` is partitioned by
+``created_at`` into one table per month (``notifications_notification_pYYYYMM``)
+plus a default partition that only catches rows outside the prepared range.
+Old months are then removed by dropping their partition, which is instant
+and leaves no dead tuples behind, instead of deleting rows one by one.
+
+Django keeps treating ``id`` as the primary key; the database primary key is
+``(id, created_at)`` because PostgreSQL requires the partition key in every
+unique constraint on a partitioned table.
+"""
+from datetime import date
+import logging
+
+from django.db import connection, transaction
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+TABLE = Notification._meta.db_table
+LEGACY_TABLE = f'{TABLE}_unpartitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def month_start(day, offset=0):
+    month_index = day.year * 12 + day.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def ensure_partitions(months_ahead=3, start=None):
+    """
+    Create monthly partitions from ``start`` (default: this month) through
+    ``months_ahead`` months from now. Existing partitions are left alone.
+
+    PostgreSQL refuses to create a partition while the default partition
+    holds rows in its range, so those rows are moved: the default partition
+    is detached, the new partition created, the rows re-inserted through the
+    parent and the default partition attached again.
+    """
+    today = date.today()
+    month = month_start(start or today)
+    last = month_start(today, months_ahead)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if not table_exists(name):
+            create_partition(name, month, month_start(month, 1))
+        created.append(name)
+        month = month_start(month, 1)
+    return created
+
+
+def table_exists(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [connection.ops.quote_name(name)])
+        return cursor.fetchone()[0]
+
+
+def create_partition(name, start, end):
+    qn = connection.ops.quote_name
+    create = (
+        f"CREATE TABLE {qn(name)} PARTITION OF {qn(TABLE)} FOR VALUES FROM (%s) TO (%s)"
+    )
+    in_range = "created_at >= %s AND created_at < %s"
+    with transaction.atomic(), connection.cursor() as cursor:
+        stranded = False
+        if table_exists(DEFAULT_PARTITION):
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {qn(DEFAULT_PARTITION)} WHERE {in_range})",
+                [start, end],
+            )
+            stranded = cursor.fetchone()[0]
+        if not stranded:
+            cursor.execute(create, [start, end])
+            return
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(DEFAULT_PARTITION)}")
+        cursor.execute(create, [start, end])
+        cursor.execute(
+            f"INSERT INTO {qn(TABLE)} OVERRIDING SYSTEM VALUE "
+            f"SELECT * FROM {qn(DEFAULT_PARTITION)} WHERE {in_range}",
+            [start, end],
+        )
+        moved = cursor.rowcount
+        cursor.execute(f"DELETE FROM {qn(DEFAULT_PARTITION)} WHERE {in_range}", [start, end])
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(DEFAULT_PARTITION)} DEFAULT"
+        )
+    logger.info(f"Moved {moved} notifications from the default partition into {name}")
+
+
+def list_partitions():
+    """Monthly partitions as ``(name, month)`` pairs, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{TABLE}_p'
+    partitions = []
+    for name in names:
+        suffix = name[len(prefix):] if name.startswith(prefix) else ''
+        if len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def drop_partitions_before(cutoff):
+    """
+    Drop every monthly partition whose whole range ends on or before
+    ``cutoff``, and delete rows older than ``cutoff`` from the default
+    partition. Returns the names of the dropped partitions.
+    """
+    qn = connection.ops.quote_name
+    dropped = []
+    for name, month in list_partitions():
+        if month_start(month, 1) > cutoff:
+            break
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+                cursor.execute(f"DROP TABLE {qn(name)}")
+        logger.info(f"Dropped notification partition {name}")
+        dropped.append(name)
+
+    if table_exists(DEFAULT_PARTITION):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {qn(DEFAULT_PARTITION)} WHERE created_at < %s", [cutoff]
+            )
+            if cursor.rowcount:
+                logger.info(
+                    f"Deleted {cursor.rowcount} expired notifications from {DEFAULT_PARTITION}"
+                )
+    return dropped
+
+
+def convert_to_partitioned(months_ahead=3):
+    """
+    Rebuild the notifications table as a partitioned table and copy the
+    existing rows into it. Takes an exclusive lock on the table for the
+    duration of the copy, so run it in a maintenance window.
+    """
+    if not is_supported():
+        raise RuntimeError("Notification partitioning requires PostgreSQL")
+    if is_partitioned():
+        return False
+
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(LEGACY_TABLE)}")
+            cursor.execute(
+                f"CREATE TABLE {qn(TABLE)} ("
+                f"LIKE {qn(LEGACY_TABLE)} INCLUDING DEFAULTS INCLUDING IDENTITY"
+                f") PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(TABLE + '_pkey_part')} "
+                f"PRIMARY KEY (id, created_at)"
+            )
+            cursor.execute(
+                f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT"
+            )
+
+            cursor.execute(f"SELECT MIN(created_at) FROM {qn(LEGACY_TABLE)}")
+            oldest = cursor.fetchone()[0]
+            ensure_partitions(months_ahead, start=oldest.date() if oldest else None)
+
+            cursor.execute(
+                f"INSERT INTO {qn(TABLE)} OVERRIDING SYSTEM VALUE "
+                f"SELECT * FROM {qn(LEGACY_TABLE)}"
+            )
+
+            # A serial id keeps using the legacy sequence, which has to move
+            # over before the legacy table is dropped; an identity id got a
+            # fresh sequence that has to skip past the copied ids.
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [LEGACY_TABLE])
+            legacy_sequence = cursor.fetchone()[0]
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+            sequence = cursor.fetchone()[0]
+            if sequence is None and legacy_sequence is not None:
+                cursor.execute(f"ALTER SEQUENCE {legacy_sequence} OWNED BY {qn(TABLE)}.id")
+            elif sequence is not None:
+                cursor.execute(
+                    f"SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {qn(TABLE)}",
+                    [sequence],
+                )
+
+            cursor.execute(f"DROP TABLE {qn(LEGACY_TABLE)}")
+
+            for field in Notification._meta.concrete_fields:
+                if not field.is_relation:
+                    continue
+                target = field.target_field
+                cursor.execute(
+                    f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT "
+                    f"{qn(f'{TABLE}_{field.column}_fk_part')} "
+                    f"FOREIGN KEY ({qn(field.column)}) "
+                    f"REFERENCES {qn(target.model._meta.db_table)} ({qn(target.column)}) "
+                    f"DEFERRABLE INITIALLY DEFERRED"
+                )
+                cursor.execute(
+                    f"CREATE INDEX {qn(f'{TABLE}_{field.column}_part_idx')} "
+                    f"ON {qn(TABLE)} ({qn(field.column)})"
+                )
+
+        with connection.schema_editor(atomic=False) as editor:
+            for index in Notification._meta.indexes:
+                editor.add_index(Notification, index)
+
+    logger.info("Converted notifications table to monthly partitions")
+    return True
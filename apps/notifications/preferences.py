@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import NotificationPreference
+
+CACHE_KEY = 'notification_preferences:{}'
+
+
+def get_disabled_channels(user_id):
+    """
+    ``(action_type, channel)`` pairs the user has switched off, served from
+    the cache so deciding what to deliver rarely touches the database.
+    """
+    key = CACHE_KEY.format(user_id)
+    disabled = cache.get(key)
+    if disabled is None:
+        disabled = frozenset(
+            NotificationPreference.objects.filter(
+                user_id=user_id,
+                enabled=False
+            ).values_list('action_type', 'channel')
+        )
+        cache.set(key, disabled, settings.NOTIFICATION_PREFERENCES_CACHE_TIMEOUT)
+    return disabled
+
+
+def is_channel_enabled(user_id, action_type, channel):
+    return (action_type, channel) not in get_disabled_channels(user_id)
+
+
+def get_users_with_channels_disabled(user_ids, action_type, channels):
+    """
+    For a batch of users, map each of ``channels`` to the ids that switched
+    it off for ``action_type``, with a single query.
+    """
+    disabled = {channel: set() for channel in channels}
+    rows = NotificationPreference.objects.filter(
+        user_id__in=user_ids,
+        action_type=action_type,
+        channel__in=channels,
+        enabled=False
+    ).values_list('user_id', 'channel')
+    for user_id, channel in rows:
+        disabled[channel].add(user_id)
+    return disabled
+
+
+def invalidate_preferences(user_id):
+    cache.delete(CACHE_KEY.format(user_id))
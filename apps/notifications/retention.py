@@ -0,0 +1,85 @@
+import time
+import logging
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def get_expired_notifications_filter(read_before, auth_before):
+    """
+    Read notifications older than ``read_before`` and sign up/log in
+    notifications older than ``auth_before``, whether read or not.
+    """
+    return (
+        Q(is_read=True, created_at__lt=read_before) |
+        Q(action_type__in=Notification.AUTH_ACTION_TYPES, created_at__lt=auth_before)
+    )
+
+
+def prune_notifications(read_before, auth_before, chunk_size=1000, pause=0.0, dry_run=False):
+    """
+    Delete expired notifications in primary key windows of ``chunk_size``.
+
+    Walking the table by id keeps every DELETE on the primary key index and
+    bounded to at most ``chunk_size`` rows, so each statement commits on its
+    own and holds row locks only briefly. ``pause`` seconds are slept between
+    windows to leave room for regular traffic. Returns the number of rows
+    deleted (or that would be deleted with ``dry_run``).
+    """
+    expired = get_expired_notifications_filter(read_before, auth_before)
+    cutoff = max(read_before, auth_before)
+
+    # Ids grow with created_at, so nothing past the newest row older than the
+    # latest cutoff can be expired.
+    upper_pk = (
+        Notification.objects.filter(created_at__lt=cutoff)
+        .order_by('-pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if upper_pk is None:
+        return 0
+
+    def next_expired_pk(start):
+        return (
+            Notification.objects.filter(expired, pk__gte=start, pk__lte=upper_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+
+    total = 0
+    window_start = next_expired_pk(0)
+    while window_start is not None:
+        window_end = window_start + chunk_size
+        window = Notification.objects.filter(
+            expired,
+            pk__gte=window_start,
+            pk__lt=window_end,
+        )
+        if dry_run:
+            total += window.count()
+        else:
+            deleted, _ = window.delete()
+            total += deleted
+            if pause:
+                time.sleep(pause)
+        # Jump straight to the next expired row so runs of retained
+        # notifications don't cost one empty window each.
+        window_start = next_expired_pk(window_end)
+
+    logger.info(f"Pruned {total} notifications")
+    return total
+
+
+def get_retention_cutoffs(read_days, auth_days, now=None):
+    now = now or timezone.now()
+    return (
+        now - timedelta(days=read_days),
+        now - timedelta(days=auth_days),
+    )
@@ -1,5 +1,7 @@
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
-from .models import Notification, PushNotificationToken
+from .models import Notification, NotificationPreference, PushNotificationToken
+from .utils import attach_notification_targets
 from apps.core.serializers import UserSummarySerializer
 
 
@@ -7,7 +9,8 @@ class NotificationSerializer(serializers.ModelSerializer):
     user = UserSummarySerializer(read_only=True)
     actor = UserSummarySerializer(read_only=True)
     target_object_id = serializers.IntegerField(source='object_id', read_only=True)
-    target_content_type = serializers.CharField(source='content_type.model', read_only=True)
+    target_content_type = serializers.SerializerMethodField()
+    target = serializers.SerializerMethodField()
     
     class Meta:
         model = Notification
@@ -18,6 +21,7 @@ class NotificationSerializer(serializers.ModelSerializer):
             'action_type',
             'target_object_id',
             'target_content_type',
+            'target',
             'is_read',
             'email_sent',
             'push_sent',
@@ -34,6 +38,17 @@ class NotificationSerializer(serializers.ModelSerializer):
             'created_at'
         ]
 
+    def get_target_content_type(self, obj):
+        if obj.content_type_id is None:
+            return None
+        return ContentType.objects.get_for_id(obj.content_type_id).model
+
+    def get_target(self, obj):
+        # List views attach summaries for the whole page up front.
+        if not hasattr(obj, 'target_summary'):
+            attach_notification_targets([obj])
+        return obj.target_summary
+
 
 class PushNotificationTokenSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,3 +59,9 @@ class PushNotificationTokenSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['action_type', 'channel', 'enabled']
@@ -1,30 +1,54 @@
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from functools import lru_cache
+from itertools import groupby
+from django.contrib.contenttypes.models import ContentType
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import select_template
 from django.conf import settings
+from django.utils import timezone
 from django.utils.html import strip_tags
 from firebase_admin import messaging
 import logging
 
 logger = logging.getLogger(__name__)
 
+DIGEST_MAX_ITEMS = 20
+# FCM accepts at most 500 tokens per multicast message
+PUSH_MULTICAST_LIMIT = 500
 
-def send_email_notification(notification):
+
+@lru_cache(maxsize=None)
+def get_email_template(name):
+    """
+    Compiled email template for ``name``, falling back to the default one.
+    Compiled once per process and reused for every email.
+    """
+    return select_template([
+        f'notifications/emails/{name}.html',
+        'notifications/emails/default.html',
+    ])
+
+
+def build_email_message(subject, html_message, recipient, connection=None):
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient],
+        connection=connection,
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def send_email_notification(notification, connection=None):
     try:
         user = notification.user
-        actor = notification.actor
         action_type = notification.get_action_type_display()
         
         subject = get_notification_subject(notification)
         message = get_notification_message(notification)
         
-        send_mail(
-            subject=subject,
-            message=strip_tags(message),
-            html_message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
+        build_email_message(subject, message, user.email, connection).send(fail_silently=False)
         
         logger.info(f"Email notification sent to {user.email} for {action_type}")
         return True
@@ -34,6 +58,105 @@ def send_email_notification(notification):
         return False
 
 
+def send_notification_digests(since, until=None, batch_size=200):
+    """
+    Send one digest email per user covering their unread notifications
+    created in ``[since, until)``.
+
+    Every digest in the run goes out through a single mail connection with
+    ``send_messages``, ``batch_size`` users at a time, and the notifications
+    each batch covers are flagged ``email_sent`` with one UPDATE.
+    Returns the number of digests sent.
+    """
+    from apps.notifications.models import Notification, NotificationPreference
+    from apps.notifications.preferences import get_disabled_channels
+
+    until = until or timezone.now()
+    notifications = (
+        Notification.objects.filter(
+            is_read=False,
+            email_sent=False,
+            created_at__gte=since,
+            created_at__lt=until,
+        )
+        .exclude(action_type__in=Notification.AUTH_ACTION_TYPES)
+        .select_related('user', 'actor')
+        .order_by('user_id', '-created_at')
+    )
+
+    template = get_email_template('digest')
+    connection = get_connection(fail_silently=False)
+    sent_count = 0
+    messages, notification_ids = [], []
+
+    def flush():
+        nonlocal sent_count
+        if not messages:
+            return
+        try:
+            sent_count += connection.send_messages(messages) or 0
+        except Exception as e:
+            logger.error(f"Error sending notification digests: {e}")
+        else:
+            Notification.objects.filter(pk__in=notification_ids).update(email_sent=True)
+        messages.clear()
+        notification_ids.clear()
+
+    connection.open()
+    try:
+        rows = notifications.iterator(chunk_size=batch_size * DIGEST_MAX_ITEMS)
+        for user_id, user_notifications in groupby(rows, key=lambda n: n.user_id):
+            disabled = get_disabled_channels(user_id)
+            user_notifications = [
+                n for n in user_notifications
+                if (n.action_type, NotificationPreference.DIGEST) not in disabled
+            ]
+            if not user_notifications:
+                continue
+            user = user_notifications[0].user
+            html_message = template.render(
+                get_digest_context(user, user_notifications)
+            )
+            messages.append(build_email_message(
+                get_digest_subject(user_notifications),
+                html_message,
+                user.email,
+                connection,
+            ))
+            notification_ids.extend(n.pk for n in user_notifications)
+            if len(messages) >= batch_size:
+                flush()
+        flush()
+    finally:
+        connection.close()
+
+    logger.info(f"Sent {sent_count} notification digests")
+    return sent_count
+
+
+def get_digest_subject(notifications):
+    count = len(notifications)
+    if count == 1:
+        return get_notification_subject(notifications[0])
+    return f"You have {count} new notifications on Swirl"
+
+
+def get_digest_context(user, notifications):
+    items = [
+        {
+            'text': get_notification_body(notification),
+            'url': get_notification_url(notification),
+        }
+        for notification in notifications[:DIGEST_MAX_ITEMS]
+    ]
+    return {
+        'user_name': user.first_name,
+        'items': items,
+        'remaining_count': max(len(notifications) - DIGEST_MAX_ITEMS, 0),
+        'notifications_url': f"{settings.FRONTEND_URL}/notifications",
+    }
+
+
 def get_notification_subject(notification):
     actor_name = notification.actor.get_full_name() or notification.actor.email
     
@@ -43,6 +166,7 @@ def get_notification_subject(notification):
         'reply': f"{actor_name} replied to your comment",
         'reaction': f"{actor_name} reacted to your post",
         'bookmark': f"{actor_name} bookmarked your post",
+        'new_post': f"{actor_name} published a new post",
         'sign_up': "Welcome to Swirl!",
         'log_in': "Welcome back to Swirl!",
     }
@@ -64,24 +188,17 @@ def get_notification_message(notification):
         'notification': notification,
     }
     
-    try:
-        message = render_to_string(
-            f'notifications/emails/{notification.action_type}.html',
-            context
-        )
-    except:
-        message = render_to_string('notifications/emails/default.html', context)
-    
-    return message
+    return get_email_template(notification.action_type).render(context)
 
 
 def get_notification_url(notification):
-    if notification.target_object:
-        if hasattr(notification.target_object, 'get_absolute_url'):
-            return notification.target_object.get_absolute_url()
-        if notification.content_type.model == 'post':
+    if notification.content_type_id and notification.object_id:
+        # get_for_id is served from the content type cache, so building a
+        # link never loads the target row itself.
+        model = ContentType.objects.get_for_id(notification.content_type_id).model
+        if model == 'post':
             return f"{settings.FRONTEND_URL}/posts/{notification.object_id}"
-        elif notification.content_type.model == 'comment':
+        elif model == 'comment':
             return f"{settings.FRONTEND_URL}/comments/{notification.object_id}"
     
     return f"{settings.FRONTEND_URL}/notifications"
@@ -109,7 +226,7 @@ def send_push_notification(notification):
                 body=body,
             ),
             data={
-                'notification_id': str(notification.id),
+                'notification_id': str(notification.id or ''),
                 'action_type': notification.action_type,
                 'type': 'notification',
             },
@@ -137,6 +254,53 @@ def send_push_notification(notification):
         return False
 
 
+def send_bulk_push_notification(user_ids, title, body, data):
+    """
+    Send the same push notification to every active device of ``user_ids``.
+
+    Tokens are loaded with one query and sent in multicast batches of
+    ``PUSH_MULTICAST_LIMIT``; tokens FCM reports as unregistered are
+    deactivated with one UPDATE. Returns the ids of users reached on at
+    least one device.
+    """
+    from apps.notifications.models import PushNotificationToken
+
+    tokens = list(
+        PushNotificationToken.objects.filter(
+            user_id__in=user_ids,
+            is_active=True
+        ).values_list('token', 'user_id')
+    )
+    if not tokens:
+        return set()
+
+    reached, stale_tokens = set(), []
+    for start in range(0, len(tokens), PUSH_MULTICAST_LIMIT):
+        batch = tokens[start:start + PUSH_MULTICAST_LIMIT]
+        message = messaging.MulticastMessage(
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+            tokens=[token for token, _ in batch],
+        )
+        try:
+            response = messaging.send_each_for_multicast(message)
+        except Exception as e:
+            logger.error(f"Error sending bulk push notification: {e}")
+            continue
+
+        for (token, user_id), resp in zip(batch, response.responses):
+            if resp.success:
+                reached.add(user_id)
+            elif getattr(resp.exception, 'code', None) == 'registration-token-not-registered':
+                stale_tokens.append(token)
+
+    if stale_tokens:
+        PushNotificationToken.objects.filter(token__in=stale_tokens).update(is_active=False)
+
+    logger.info(f"Bulk push notification reached {len(reached)} users")
+    return reached
+
+
 def get_notification_body(notification):
     actor_name = notification.actor.get_full_name() or notification.actor.email
     
@@ -146,6 +310,7 @@ def get_notification_body(notification):
         'reply': f"{actor_name} replied to your comment",
         'reaction': f"{actor_name} reacted to your post",
         'bookmark': f"{actor_name} bookmarked your post",
+        'new_post': f"{actor_name} published a new post",
         'sign_up': "Welcome to Swirl! Get started by exploring posts.",
         'log_in': "Welcome back! Check out what's new.",
     }
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import NotificationPreference
+from .preferences import invalidate_preferences
+
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def clear_cached_preferences(sender, instance, **kwargs):
+    invalidate_preferences(instance.user_id)
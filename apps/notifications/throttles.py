@@ -1,4 +1,4 @@
-from rest_framework.throttling import UserRateThrottle
+from apps.core.throttling import UserRateThrottle
 
 
 class NotificationReadRateThrottle(UserRateThrottle):
@@ -16,3 +16,10 @@ class NotificationMarkReadRateThrottle(UserRateThrottle):
     """
     rate = '60/min'
 
+
+class NotificationPreferenceRateThrottle(UserRateThrottle):
+    """
+    Rate limit for reading and updating notification preferences.
+    30 requests per minute.
+    """
+    rate = '30/min'
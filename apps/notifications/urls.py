@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='list-notifications'),
     path('<int:id>/read/', views.MarkNotificationReadView.as_view(), name='mark-notification-read'),
+    path('preferences/', views.NotificationPreferenceView.as_view(), name='notification-preferences'),
     path('push-token/', views.RegisterPushTokenView.as_view(), name='register-push-token'),
     path('push-token/<str:token>/', views.UnregisterPushTokenView.as_view(), name='unregister-push-token'),
 ]
@@ -1,38 +1,209 @@
+from collections import defaultdict
+from itertools import islice
+import logging
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification
-from .services import send_email_notification, send_push_notification
+from django.utils import timezone
+from django.utils.text import Truncator
+from apps.core.tasks import run_after_commit
+from .models import Notification, NotificationPreference
+from .preferences import get_disabled_channels, get_users_with_channels_disabled
+from .services import (
+    get_notification_subject,
+    send_bulk_push_notification,
+    send_email_notification,
+    send_push_notification,
+)
 
+logger = logging.getLogger(__name__)
 
-def create_notification(user, actor, action_type, target_object=None, send_push=True):
+FAN_OUT_CHUNK_SIZE = 1000
+
+COMMENT_EXCERPT_LENGTH = 100
+
+# Columns loaded for each kind of notification target and how they are
+# turned into the compact summary returned with the notification.
+TARGET_SUMMARIES = {
+    'blogs.post': (
+        ('id', 'title', 'slug'),
+        lambda row: row,
+    ),
+    'blogs.comment': (
+        ('id', 'content', 'post_id', 'post__slug'),
+        lambda row: {
+            'id': row['id'],
+            'excerpt': Truncator(row['content']).chars(COMMENT_EXCERPT_LENGTH),
+            'post_id': row['post_id'],
+            'post_slug': row['post__slug'],
+        },
+    ),
+    'core.user': (
+        ('id', 'first_name', 'last_name', 'profile_pic_url'),
+        lambda row: row,
+    ),
+}
+
+
+def create_notification(user, actor, action_type, target_object=None, send_push=True, send_email=False):
     if user == actor and target_object is not None:
         return None
+
+    # Skip every channel the user opted out of before doing any work for it.
+    disabled = get_disabled_channels(user.pk)
+    store = (action_type, NotificationPreference.IN_APP) not in disabled
+    send_push = send_push and (action_type, NotificationPreference.PUSH) not in disabled
+    send_email = send_email and (action_type, NotificationPreference.EMAIL) not in disabled
+    if not (store or send_push or send_email):
+        return None
     
     try:
-        if target_object is None:
-            notification = Notification.objects.create(
-                user=user,
-                actor=actor,
-                action_type=action_type,
-                content_type=None,
-                object_id=None
-            )
-        else:
-            content_type = ContentType.objects.get_for_model(target_object)
-            notification = Notification.objects.create(
-                user=user,
-                actor=actor,
-                action_type=action_type,
-                content_type=content_type,
-                object_id=target_object.pk
-            )
+        notification = Notification(
+            user=user,
+            actor=actor,
+            action_type=action_type,
+            content_type=None,
+            object_id=None
+        )
+        if target_object is not None:
+            notification.content_type = ContentType.objects.get_for_model(target_object)
+            notification.object_id = target_object.pk
+        if store:
+            notification.save()
         
-        if send_push:
-            push_sent = send_push_notification(notification)
-            if push_sent:
-                notification.push_sent = True
-                notification.save(update_fields=['push_sent'])
+        update_fields = []
+        if send_push and send_push_notification(notification):
+            notification.push_sent = True
+            update_fields.append('push_sent')
+        if send_email and send_email_notification(notification):
+            notification.email_sent = True
+            update_fields.append('email_sent')
+        if store and update_fields:
+            notification.save(update_fields=update_fields)
         
-        return notification
+        return notification if store else None
     except Exception as e:
         print(f"Error creating notification: {e}")
         return None
+
+
+def attach_notification_targets(notifications):
+    """
+    Attach a compact summary of each notification's target as
+    ``target_summary``, loading targets with one ``id__in`` query per target
+    model regardless of how many notifications point at it.
+    """
+    ids_by_content_type = defaultdict(set)
+    for notification in notifications:
+        if notification.content_type_id and notification.object_id:
+            ids_by_content_type[notification.content_type_id].add(notification.object_id)
+
+    summaries = {}
+    for content_type_id, object_ids in ids_by_content_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        fields, summarize = TARGET_SUMMARIES.get(
+            model._meta.label_lower,
+            (('id',), lambda row: row),
+        )
+        for row in model._base_manager.filter(pk__in=object_ids).values(*fields):
+            summaries[(content_type_id, row['id'])] = summarize(row)
+
+    for notification in notifications:
+        notification.target_summary = summaries.get(
+            (notification.content_type_id, notification.object_id)
+        )
+    return notifications
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def fan_out_new_post(post_id, chunk_size=FAN_OUT_CHUNK_SIZE):
+    """
+    Notify every follower of a post's author that the post was published.
+
+    Follower ids are streamed from ``Follow`` ``chunk_size`` at a time; each
+    chunk becomes one ``bulk_create`` and one batched push, so memory stays
+    flat however many followers the author has. Returns the number of
+    notifications created.
+    """
+    from apps.blogs.models import Post
+    from apps.core.models import Follow
+
+    # Claim the announcement with a conditional UPDATE so racing publishes
+    # (or a republish after going back to draft) notify exactly once, even
+    # when no follower keeps in-app notifications and no row is written.
+    claimed = Post.objects.filter(pk=post_id, announced_at__isnull=True).update(
+        announced_at=timezone.now()
+    )
+    if not claimed:
+        return 0
+    post = Post.objects.select_related('author').get(pk=post_id)
+
+    content_type = ContentType.objects.get_for_model(Post)
+    post_notifications = Notification.objects.filter(
+        action_type='new_post',
+        content_type=content_type,
+        object_id=post.pk
+    )
+
+    follower_ids = (
+        Follow.objects.filter(following_id=post.author_id)
+        .order_by()
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    push_preview = Notification(actor=post.author, action_type='new_post')
+    title = get_notification_subject(push_preview)
+    data = {
+        'action_type': 'new_post',
+        'post_id': str(post.pk),
+        'type': 'notification',
+    }
+
+    total = 0
+    for chunk in chunked(follower_ids, chunk_size):
+        opted_out = get_users_with_channels_disabled(
+            chunk,
+            'new_post',
+            [NotificationPreference.IN_APP, NotificationPreference.PUSH]
+        )
+        recipients = [
+            follower_id for follower_id in chunk
+            if follower_id not in opted_out[NotificationPreference.IN_APP]
+        ]
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=follower_id,
+                    actor_id=post.author_id,
+                    action_type='new_post',
+                    content_type=content_type,
+                    object_id=post.pk,
+                )
+                for follower_id in recipients
+            ],
+            batch_size=chunk_size,
+        )
+        total += len(recipients)
+
+        push_recipients = [
+            follower_id for follower_id in chunk
+            if follower_id not in opted_out[NotificationPreference.PUSH]
+        ]
+        if not push_recipients:
+            continue
+        reached = send_bulk_push_notification(push_recipients, title, post.title, data)
+        if reached:
+            post_notifications.filter(user_id__in=reached).update(push_sent=True)
+
+    logger.info(f"Fanned out post {post.pk} to {total} followers")
+    return total
+
+
+def notify_followers_of_new_post(post):
+    """Fan a newly published post out to the author's followers after commit."""
+    run_after_commit(fan_out_new_post, post.pk)
@@ -1,14 +1,28 @@
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 
-from .models import Notification, PushNotificationToken
-from .serializers import NotificationSerializer, PushNotificationTokenSerializer
-from .throttles import NotificationReadRateThrottle, NotificationMarkReadRateThrottle
+from apps.core.async_views import AsyncListAPIView
+from apps.core.models import Follow
+from apps.core.query_plan import QueryPlanMixin
+from .models import Notification, NotificationPreference, PushNotificationToken
+from .preferences import get_disabled_channels
+from .serializers import (
+    NotificationSerializer,
+    NotificationPreferenceSerializer,
+    PushNotificationTokenSerializer,
+)
+from .throttles import (
+    NotificationReadRateThrottle,
+    NotificationMarkReadRateThrottle,
+    NotificationPreferenceRateThrottle,
+)
+from .utils import attach_notification_targets
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(QueryPlanMixin, AsyncListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [NotificationReadRateThrottle]
@@ -16,7 +30,27 @@ class NotificationListView(generics.ListAPIView):
     def get_queryset(self):
         return Notification.objects.filter(
             user=self.request.user
-        ).select_related('user', 'actor').order_by('-created_at')
+        ).order_by('-created_at')
+
+    async def apaginate_queryset(self, queryset):
+        page = await super().apaginate_queryset(queryset)
+        if page is not None:
+            await sync_to_async(attach_notification_targets)(page)
+            user_ids = {n.user_id for n in page} | {n.actor_id for n in page}
+            self.following_ids = {
+                following_id async for following_id in
+                Follow.objects.filter(
+                    follower=self.request.user,
+                    following_id__in=user_ids
+                ).values_list('following_id', flat=True)
+            }
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'following_ids'):
+            context['following_ids'] = self.following_ids
+        return context
 
 
 class MarkNotificationReadView(APIView):
@@ -83,3 +117,39 @@ class UnregisterPushTokenView(APIView):
                 {"error": "Token not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class NotificationPreferenceView(APIView):
+    """
+    GET returns every action type / channel pair with its current state.
+    PUT takes a list of ``{"action_type", "channel", "enabled"}`` entries to change.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [NotificationPreferenceRateThrottle]
+
+    def get(self, request, **kwargs):
+        disabled = get_disabled_channels(request.user.pk)
+        preferences = [
+            {
+                'action_type': action_type,
+                'channel': channel,
+                'enabled': (action_type, channel) not in disabled,
+            }
+            for action_type, _ in Notification.ACTION_TYPES
+            for channel, _ in NotificationPreference.CHANNELS
+        ]
+        return Response(preferences, status=status.HTTP_200_OK)
+
+    def put(self, request, **kwargs):
+        serializer = NotificationPreferenceSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        for preference in serializer.validated_data:
+            NotificationPreference.objects.update_or_create(
+                user=request.user,
+                action_type=preference['action_type'],
+                channel=preference['channel'],
+                defaults={'enabled': preference['enabled']}
+            )
+
+        return self.get(request)
@@ -1,14 +1,20 @@
 from rest_framework import generics, filters, permissions
 from django.db.models import Q
+from django.shortcuts import aget_object_or_404
 
 from apps.blogs.models import Post, Comment, Bookmark, Category
 from apps.blogs.serializers import PostSerializer, CommentSerializer, BookmarkSerializer, CategorySerializer
+from apps.core.async_views import AsyncListAPIView
+from apps.core.concurrency import ConcurrencyLimitMixin
+from apps.core.fieldsets import SparseFieldsMixin
 from apps.core.models import User
+from apps.core.projection import ProjectedListMixin
+from apps.core.query_plan import QueryPlanMixin
 from apps.core.serializers import UserSerializer
 from .throttles import SearchRateThrottle, SearchAnonRateThrottle
 
 
-class PostSearchView(generics.ListAPIView):
+class PostSearchView(ConcurrencyLimitMixin, SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     """
     Search endpoint for posts with advanced filtering options.
     
@@ -23,6 +29,7 @@ class PostSearchView(generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    concurrency_class = 'search'
     
     def get_throttles(self):
         if self.request.user.is_authenticated:
@@ -33,8 +40,8 @@ class PostSearchView(generics.ListAPIView):
     ordering_fields = ['created_at', 'updated_at', 'title', 'reaction_count', 'comment_count', 'bookmark_count']
     ordering = ['-created_at']
 
-    def get_queryset(self):
-        queryset = Post.objects.active().select_related('author', 'category').prefetch_related('tags')
+    async def aget_queryset(self):
+        queryset = Post.objects.active()
         
         search_query = self.request.query_params.get('q', None)
         status = self.request.query_params.get('status', None)
@@ -59,7 +66,7 @@ class PostSearchView(generics.ListAPIView):
         if category:
             try:
                 category_id = int(category)
-                category = generics.get_object_or_404(Category, pk=category_id)
+                category = await aget_object_or_404(Category, pk=category_id)
                 queryset = queryset.filter(category=category)
             except ValueError:
                 pass        
@@ -73,7 +80,7 @@ class PostSearchView(generics.ListAPIView):
         return queryset
 
 
-class CommentSearchView(generics.ListAPIView):
+class CommentSearchView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     """
     Search endpoint for comments with advanced filtering options.
     
@@ -97,7 +104,7 @@ class CommentSearchView(generics.ListAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        queryset = Comment.objects.all().select_related('user', 'post', 'parent')
+        queryset = Comment.objects.all()
         
         search_query = self.request.query_params.get('q', None)
         post_id = self.request.query_params.get('post', None)
@@ -127,7 +134,7 @@ class CommentSearchView(generics.ListAPIView):
         return queryset
 
 
-class BookmarkSearchView(generics.ListAPIView):
+class BookmarkSearchView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     """
     Search endpoint for user bookmarks with advanced filtering options.
     
@@ -143,8 +150,6 @@ class BookmarkSearchView(generics.ListAPIView):
     def get_queryset(self):
         queryset = Bookmark.objects.filter(user=self.request.user)
         
-        queryset = queryset.select_related('user', 'post', 'post__author', 'post__category').prefetch_related('post__tags')
-        
         search_query = self.request.query_params.get('q', None)
         
         if search_query:
@@ -162,7 +167,7 @@ class BookmarkSearchView(generics.ListAPIView):
         
         return queryset
 
-class CategorySearchView(generics.ListAPIView):
+class CategorySearchView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     throttle_classes = [SearchRateThrottle]
@@ -182,7 +187,7 @@ class CategorySearchView(generics.ListAPIView):
         
         return queryset
 
-class UserSearchView(generics.ListAPIView):
+class UserSearchView(SparseFieldsMixin, QueryPlanMixin, ProjectedListMixin, AsyncListAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
     throttle_classes = [SearchRateThrottle]
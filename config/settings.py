@@ -33,6 +33,7 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS').split(',')
 
 GOOGLE_OAUTH_CLIENT_ID = config('GOOGLE_OAUTH_CLIENT_ID')
 GOOGLE_OAUTH_CLIENT_SECRET = config('GOOGLE_OAUTH_CLIENT_SECRET')
+GOOGLE_OAUTH_CERTS_URL = config('GOOGLE_OAUTH_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
 
 
 # Application definition
@@ -52,18 +53,22 @@ INSTALLED_APPS = [
     'apps.search',
     'apps.notifications',
     'apps.feeds',
+    'apps.benchmarks',
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.ServerTimingMiddleware',
 ]
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -71,6 +76,30 @@ DEFAULT_FROM_EMAIL = "no-reply@example.com"
 
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 
+# Per-worker thread pool for sync views, middleware and ORM queries under ASGI
+# (apps.core.asgi); also the most database connections a worker holds
+ASGI_SYNC_THREADS = config('ASGI_SYNC_THREADS', default=8, cast=int)
+
+# Per-worker thread pool used by apps.core.tasks
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=2, cast=int)
+# Run background tasks inline (useful for local debugging)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Unread notifications are batched into one digest email per user over this window
+NOTIFICATION_DIGEST_INTERVAL = timedelta(
+    hours=config('NOTIFICATION_DIGEST_INTERVAL_HOURS', default=24, cast=int)
+)
+
+# How long a user's notification preferences stay cached, in seconds
+NOTIFICATION_PREFERENCES_CACHE_TIMEOUT = 300
+
+# Retention periods enforced by `manage.py prune_notifications`
+NOTIFICATION_READ_RETENTION_DAYS = config('NOTIFICATION_READ_RETENTION_DAYS', default=90, cast=int)
+NOTIFICATION_AUTH_RETENTION_DAYS = config('NOTIFICATION_AUTH_RETENTION_DAYS', default=30, cast=int)
+# Only used once the table is partitioned with `manage.py partition_notifications` (PostgreSQL)
+NOTIFICATION_PARTITION_MONTHS_AHEAD = 3
+NOTIFICATION_PARTITION_RETENTION_MONTHS = config('NOTIFICATION_PARTITION_RETENTION_MONTHS', default=12, cast=int)
+
 FIREBASE_CREDENTIALS_PATH = BASE_DIR / 'firebase-credentials.json'
 # Option 2: Or use environment variable (for production)
 # FIREBASE_CREDENTIALS_JSON = config('FIREBASE_CREDENTIALS_JSON', default=None)
@@ -93,7 +122,7 @@ ROOT_URLCONF = 'config.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -176,12 +205,23 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.core.renderers.JSONRenderer",
+        "apps.core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "rest_framework.parsers.JSONParser",
+        "apps.core.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS":
-        "rest_framework.pagination.PageNumberPagination",
+        "apps.core.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "apps.core.throttling.AnonRateThrottle",
+        "apps.core.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/hour",
@@ -189,6 +229,61 @@ REST_FRAMEWORK = {
     },
 }
 
+# Shared store for the GCRA throttles in apps.core.throttling: a SQLite file
+# for workers on one host, or a redis:// URL for several hosts
+THROTTLE_STORE_URL = config('THROTTLE_STORE_URL', default=f"sqlite:///{BASE_DIR / 'throttle.sqlite3'}")
+
+# Per-worker concurrency limits for expensive endpoints (apps.core.concurrency):
+# requests running at once, how many may wait and for how long (seconds), the
+# PostgreSQL statement timeout (ms) and how long the last good response is
+# kept to serve when a request is shed (seconds)
+CONCURRENCY_LIMITS = {
+    'search': {'limit': 4, 'queue': 8, 'queue_timeout': 2, 'statement_timeout': 5000, 'fallback_ttl': 60},
+    'feed': {'limit': 4, 'queue': 8, 'queue_timeout': 2, 'statement_timeout': 5000, 'fallback_ttl': 60},
+}
+
+# Bulk follow-state lookups (/api/users/relationships/): most ids per request
+# and how long a viewer's results stay cached, in seconds
+RELATIONSHIP_LOOKUP_MAX_IDS = 300
+RELATIONSHIP_CACHE_TIMEOUT = config('RELATIONSHIP_CACHE_TIMEOUT', default=30, cast=int)
+
+# In-memory follow graph (apps.core.follow_graph): how often each worker pulls
+# follows made by other workers, and reloads the whole graph, in seconds
+FOLLOW_GRAPH_SYNC_INTERVAL = 10
+FOLLOW_GRAPH_REBUILD_INTERVAL = 10 * 60
+
+# Rows deleted per transaction by the background account deletion job
+ACCOUNT_DELETION_BATCH_SIZE = config('ACCOUNT_DELETION_BATCH_SIZE', default=500, cast=int)
+
+# Request metrics served at /metrics (apps.core.metrics). With METRICS_DIR set,
+# every worker writes its totals there at most every METRICS_FLUSH_INTERVAL
+# seconds and a scrape sums them (one directory per host: stale files are
+# found by pid); METRICS_TOKEN is required as a bearer token to read them
+# unless METRICS_PUBLIC is set
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+
+# Response compression (apps.core.compression). Bodies under
+# COMPRESSION_MIN_SIZE bytes are sent uncompressed; the levels are tuned for
+# compressing on every request, not once ahead of time
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=4, cast=int)
+
+# In-process cache used by CookieJWTAuthentication. User rows are cleared on
+# save/delete in the worker that made the change; other workers pick the
+# change up within AUTH_USER_CACHE_TIMEOUT seconds.
+AUTH_CACHE_MAX_ENTRIES = 10000
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int)
+
+# Refresh token revocation (apps.core.revocation): how often each worker pulls
+# tokens revoked by other workers into its Bloom filter, and rebuilds it, in seconds
+TOKEN_REVOCATION_SYNC_INTERVAL = 5
+TOKEN_REVOCATION_REBUILD_INTERVAL = 60 * 60
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = 0.001
+
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_CLAIM": "user_id",
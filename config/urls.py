@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from apps.core.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
     path('api/', include('apps.core.urls')),
     path('api/', include('apps.blogs.urls')),
     path('api/search/', include('apps.search.urls')),